@@ -1,6 +1,12 @@
 from flask import Flask, request, jsonify
+import csv
 import datetime
+import hashlib
 import random 
+import re
+import time
+
+from klok import VersneldeKlok
 
 app = Flask(__name__)
 
@@ -8,6 +14,105 @@ app = Flask(__name__)
 current_value = 0
 random_mode = False 
 
+# Storing simuleren (zie /storing)
+vertraging = 0.0   # Vaste extra wachttijd per request (s)
+jitter = 0.0       # Bijkomende willekeurige wachttijd tussen 0 en jitter (s)
+foutkans = 0.0     # Kans (0..1) dat een request een fout teruggeeft
+fout_code = 503    # HTTP-statuscode van die fout
+
+# Historiek: wat /testdata live teruggaf, per minuut (de rest wordt verzonnen)
+geserveerd = {}
+MAX_LIMIT = 100    # Net als Elia: meer records per pagina mag niet
+
+# Replay (zie /replay): een prijsreeks afspelen in plaats van current_value
+replay_reeks = None  # Reeks die nu afgespeeld wordt (None = replay uit)
+replay_klok = None   # VersneldeKlok: de tijd zoals de reeks die ziet
+PUBLICATIE = 15      # Zoveel seconden na het einde van een minuut staat het record er (zoals bij Elia)
+
+class Reeks:
+    """ Prijzen per minuut (opgenomen of verzonnen), op te zoeken per tijdstip. """
+
+    def __init__(self, prijzen):
+        self.prijzen = prijzen  # {epoch-seconden van het begin van de minuut: prijs}
+        self.begin = min(prijzen)
+        self.eind = max(prijzen) + 60
+
+    @classmethod
+    def synthetisch(cls, start, minuten, zaad=1):
+        """ Random walk rond de alarmgrenzen met af en toe een sprong (zoals echte onbalansprijzen). """
+        rng = random.Random(zaad)
+        begin = int(start.timestamp()) // 60 * 60
+        prijzen, prijs = {}, 50.0
+        for i in range(minuten):
+            if rng.random() < 0.02:
+                prijs = rng.uniform(-800, 800)
+            else:
+                prijs = max(-1000.0, min(1000.0, prijs + rng.gauss(0, 25)))
+            prijzen[begin + i * 60] = round(prijs, 2)
+        return cls(prijzen)
+
+    @classmethod
+    def uit_csv(cls, pad):
+        """
+        Een opname als CSV met (minstens) de kolommen 'datetime' en
+        'imbalanceprice', bv. een export van de Elia open data (';' of ',').
+        """
+        with open(pad, newline="", encoding="utf-8-sig") as f:
+            dialect = csv.Sniffer().sniff(f.readline(), delimiters=";,")
+            f.seek(0)
+            prijzen = {}
+            for rij in csv.DictReader(f, dialect=dialect):
+                rij = {k.strip().lower(): v for k, v in rij.items() if k}
+                if not rij.get("datetime") or not rij.get("imbalanceprice"):
+                    continue
+                tijdstip = datetime.datetime.fromisoformat(rij["datetime"].replace("Z", "+00:00"))
+                prijzen[int(tijdstip.timestamp()) // 60 * 60] = float(rij["imbalanceprice"])
+        return cls(prijzen)
+
+    def prijs_op(self, tijdstip):
+        """ Prijs van de minuut waarin 'tijdstip' valt (datetime of epoch-seconden), of None. """
+        if isinstance(tijdstip, datetime.datetime):
+            tijdstip = tijdstip.timestamp()
+        return self.prijzen.get(int(tijdstip) // 60 * 60)
+
+    def __len__(self):
+        return len(self.prijzen)
+
+def nu():
+    """ De huidige tijd: echt, of in replay-modus de tijd van de afgespeelde reeks. """
+    if replay_klok is not None:
+        return replay_klok.nu().astimezone()
+    return datetime.datetime.now().astimezone()
+
+@app.route("/replay")
+def start_replay():
+    """Speel een prijsreeks af (opname of synthetisch), in echte tijd of N keer sneller."""
+    global replay_reeks, replay_klok
+    if request.args.get("stop"):
+        replay_reeks = replay_klok = None
+        return "⏹️ Replay gestopt: terug naar de vaste/random waarde."
+
+    try:
+        bron = request.args.get("bron", "synthetisch")
+        snelheid = float(request.args.get("snelheid", 1))
+        start = request.args.get("start")
+        start = datetime.datetime.fromisoformat(start) if start else None
+        if bron == "synthetisch":
+            dagen = float(request.args.get("dagen", 1))
+            begin = start or datetime.datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+            reeks = Reeks.synthetisch(begin, int(dagen * 1440), int(request.args.get("zaad", 1)))
+        else:
+            reeks = Reeks.uit_csv(bron)
+    except (ValueError, OSError, csv.Error) as e:
+        return jsonify({"error": str(e)}), 400
+
+    # De klok start aan het begin van de reeks (of op 'start' als die later ligt)
+    begin = max(reeks.begin, start.timestamp() if start else reeks.begin)
+    replay_reeks = reeks
+    replay_klok = VersneldeKlok(datetime.datetime.fromtimestamp(begin).astimezone(), snelheid)
+    return (f"▶️ Replay: {len(reeks)} minuten vanaf {replay_klok.nu().astimezone():%Y-%m-%d %H:%M}, "
+            f"{snelheid:g}x de echte tijd")
+
 @app.route("/setvalue")
 def set_value():
     """Stel handmatig een vaste waarde in (en zet random uit)."""
@@ -32,21 +137,143 @@ def toggle_random():
         random_mode = False
         return f"🛑 Random modus UIT: Prijs blijft staan op {current_value}."
 
+@app.route("/storing")
+def storing():
+    """Stel vertraging en fouten in om de robuustheid van de bot te testen."""
+    global vertraging, jitter, foutkans, fout_code
+    try:
+        vertraging = float(request.args.get("vertraging", vertraging))
+        jitter = float(request.args.get("jitter", jitter))
+        foutkans = float(request.args.get("foutkans", foutkans))
+        fout_code = int(request.args.get("code", fout_code))
+    except ValueError:
+        pass
+    return f"🧪 Storing: vertraging {vertraging}s (+ tot {jitter}s), foutkans {foutkans:.0%} (HTTP {fout_code})"
+
+def simuleer_storing():
+    """ Wacht en/of geeft een fout-antwoord terug, volgens de /storing instellingen. """
+    wacht = vertraging + random.uniform(0, jitter)
+    if wacht > 0:
+        time.sleep(wacht)
+    if foutkans > 0 and random.random() < foutkans:
+        return jsonify({"error": "Gesimuleerde storing"}), fout_code
+    return None
+
+def prijs_op(minuut):
+    """
+    De prijs van een (afgelopen) minuut: uit de replay-reeks, of wat live
+    geserveerd is, anders vast per minuut verzonnen.
+    """
+    if replay_reeks is not None:
+        return replay_reeks.prijs_op(minuut)
+    if minuut in geserveerd:
+        return geserveerd[minuut]
+    return round(random.Random(int(minuut.timestamp()) // 60).uniform(-100, 500), 2)
+
+def lees_bereik(where):
+    """
+    Haalt het tijdsbereik uit een where-clausule zoals de bot die stuurt:
+    datetime >= date'2024-05-01T10:00:00+02:00' AND datetime < date'...'
+    Geeft (van, tot) terug (None = open kant).
+    """
+    van = tot = None
+    for teken, waarde in re.findall(r"datetime\s*(>=|<)\s*date'([^']+)'", where):
+        tijdstip = datetime.datetime.fromisoformat(waarde.replace("Z", "+00:00"))
+        if teken == ">=":
+            van = tijdstip
+        else:
+            tot = tijdstip
+    return van, tot
+
+def historiek(where):
+    """ Eén record per minuut in het gevraagde bereik (hoogstens tot nu, hoogstens 31 dagen). """
+    laatste = nu().replace(second=0, microsecond=0)
+    van, tot = lees_bereik(where)
+    tot = min(tot or laatste + datetime.timedelta(minutes=1), laatste + datetime.timedelta(minutes=1))
+    van = max(van or tot - datetime.timedelta(days=1), tot - datetime.timedelta(days=31))
+
+    minuut = van.astimezone().replace(second=0, microsecond=0)
+    if minuut < van:
+        minuut += datetime.timedelta(minutes=1)
+    records = []
+    while minuut < tot:
+        prijs = prijs_op(minuut)
+        if prijs is not None:
+            records.append({"imbalanceprice": prijs, "datetime": minuut.isoformat()})
+        minuut += datetime.timedelta(minutes=1)
+    return records
+
+def pas_query_toe(records):
+    """
+    Doet wat de echte Elia API (Explore v2.1) doet met de query parameters:
+    - order_by=datetime DESC  -> nieuwste eerst
+    - offset=N                -> de eerste N records overslaan (paginering)
+    - limit=N                 -> maximaal N records
+    - select=veld1,veld2      -> enkel deze velden
+    """
+    order_by = request.args.get("order_by", "")
+    if order_by:
+        veld, _, richting = order_by.partition(" ")
+        records = sorted(records, key=lambda r: r.get(veld), reverse=richting.upper() == "DESC")
+
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", type=int)
+    if limit is not None:
+        records = records[offset:offset + limit]
+    else:
+        records = records[offset:]
+
+    select = request.args.get("select")
+    if select:
+        velden = [v.strip() for v in select.split(",")]
+        records = [{v: r[v] for v in velden if v in r} for r in records]
+    return records
+
+def conditioneel_antwoord(data, laatst_gewijzigd):
+    """ JSON-antwoord met ETag / Last-Modified, of een lege 304 als de client al up-to-date is. """
+    response = jsonify(data)
+    response.set_etag(hashlib.md5(response.get_data()).hexdigest())
+    response.last_modified = laatst_gewijzigd
+    return response.make_conditional(request)
+
 @app.route("/testdata")
 def testdata():
     """Dit is de link die de bot aanroept."""
     global current_value
+
+    fout = simuleer_storing()
+    if fout:
+        return fout
     
+    if request.args.get("limit", 10, type=int) > MAX_LIMIT:
+        return jsonify({"error": f"limit mag hoogstens {MAX_LIMIT} zijn"}), 400
+
+    # Met een where-clausule: de historiek (zoals de bot die gebruikt om gaten aan te vullen)
+    where = request.args.get("where")
+    if where:
+        records = historiek(where)
+        return jsonify({"total_count": len(records), "results": pas_query_toe(records)})
+
+    if replay_reeks is not None:
+        # Het laatst gepubliceerde record van de reeks (PUBLICATIE s na het einde van de minuut)
+        minuut = (nu() - datetime.timedelta(seconds=60 + PUBLICATIE)).replace(second=0, microsecond=0)
+        prijs = replay_reeks.prijs_op(minuut)
+        records = [{"imbalanceprice": prijs, "datetime": minuut.isoformat()}] if prijs is not None else []
+        return conditioneel_antwoord({"results": pas_query_toe(records)}, minuut)
+
     if random_mode:
         # Verzin een nieuwe prijs tussen -100 en 500
         current_value = round(random.uniform(-100, 500), 2)
 
-    return jsonify({
-        "results": [{
-            "imbalanceprice": current_value,
-            "datetime": datetime.datetime.now().isoformat()
-        }]
-    })
+    # Net als Elia: één record per minuut (tijdstip afgerond op de minuut)
+    minuut = datetime.datetime.now().astimezone().replace(second=0, microsecond=0)
+    geserveerd[minuut] = current_value
+    records = [{
+        "imbalanceprice": current_value,
+        "datetime": minuut.isoformat()
+    }]
+
+    return conditioneel_antwoord({"results": pas_query_toe(records)}, minuut)
 
 if __name__ == "__main__":
     print("🚀 Fake API gestart op poort 5000")
@@ -67,4 +294,33 @@ HOW TO USE THIS FAKE API
     http://localhost:5000/random?enable=true
   - Disable RANDOM mode:
     http://localhost:5000/random?enable=false
+
+4. The /testdata endpoint honours the same query parameters as Elia
+   (select, order_by, limit) and answers with ETag / Last-Modified,
+   so conditional requests (304 Not Modified) can be tested locally.
+
+5. HISTORY: with a 'where' parameter /testdata returns one record per
+   minute in the requested range (what was served live, otherwise a fixed
+   made-up price per minute), with offset/limit paging (limit <= 100).
+   The bot uses this to backfill the minutes it missed:
+    http://localhost:5000/testdata?where=datetime >= date'2024-05-01T10:00:00+02:00' AND datetime < date'2024-05-01T11:40:00+02:00'&order_by=datetime ASC&limit=100&offset=0
+
+6. REPLAY a price series instead of the fixed/random value, at real
+   time or N times faster (history follows the series as well):
+  - One synthetic day from midnight, 60x faster (1 minute = 1 second):
+    http://localhost:5000/replay?bron=synthetisch&dagen=1&zaad=1&snelheid=60
+  - A recording (CSV with 'datetime' and 'imbalanceprice', e.g. an Elia export):
+    http://localhost:5000/replay?bron=opname.csv&snelheid=1
+  - Stop the replay:
+    http://localhost:5000/replay?stop=1
+   Combine with /storing for latency and errors. The bot itself can follow
+   an accelerated replay with klok.VersneldeKlok (see benchmark.py replay).
+
+7. SIMULATE AN OUTAGE (latency and errors):
+  - Slow API (2s + up to 3s extra):
+    http://localhost:5000/storing?vertraging=2&jitter=3
+  - 50% of the requests fail with HTTP 503:
+    http://localhost:5000/storing?foutkans=0.5&code=503
+  - Back to normal:
+    http://localhost:5000/storing?vertraging=0&jitter=0&foutkans=0
 '''
\ No newline at end of file
@@ -0,0 +1,156 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+import requests
+
+import config
+from elia_api import bereik_url
+from telegram_verzender import TokenBucket
+
+# =============================================================================
+# GATEN AANVULLEN (MINUTEN ACHTERAF OPHALEN UIT DE ELIA-HISTORIEK)
+# =============================================================================
+
+class GatenAanvuller:
+    """
+    Haalt minuten op die de live poller gemist heeft (bot uit, Elia even
+    onbereikbaar). Dat gebeurt met bereik-aanvragen op dezelfde dataset:
+    - aaneengesloten ontbrekende minuten worden stukken van AANVUL_PAGINA
+    - elk stuk is één (of bij meer records enkele) pagina('s)
+    - de stukken lopen tegelijk in een kleine pool, binnen een token bucket,
+      zodat de live poller nooit op ons moet wachten
+
+    De aanvuller schrijft zelf niets weg en evalueert geen alarmen: hij geeft
+    enkel [(minuut van de dag, prijs), ...] terug.
+    """
+
+    def __init__(self, elia):
+        self.elia = elia  # EliaClient: we gebruiken zijn URL, sessie, tijdzone en stroomonderbreker
+        self.emmer = TokenBucket(config.AANVUL_PER_SECONDE)
+        self.pool = ThreadPoolExecutor(max_workers=config.AANVUL_WERKERS, thread_name_prefix="aanvul")
+        self.lock = threading.Lock()
+
+        # Minuten van afgelopen dagen die Elia zelf niet heeft: niet elke ronde opnieuw vragen
+        self.niet_bij_elia = {}  # datum -> {minuut, ...}
+
+        # Tellers
+        self.aanroepen = 0
+        self.fouten = 0
+        self.aangevuld = 0
+
+    # --- Welke minuten ontbreken er? ---
+
+    def verwachte_minuten(self, dag):
+        """
+        Alle minuten van de dag die echt bestaan (minuut van de dag, lokale tijd).
+        Op de dag van de zomertijd ontbreekt 02:00-02:59, bij wintertijd valt
+        het dubbele uur samen.
+        """
+        tz = self.elia.tz
+        begin = tz.localize(datetime.combine(dag, time()))
+        eind = tz.localize(datetime.combine(dag + timedelta(days=1), time()))
+        minuten = set()
+        for i in range(int((eind - begin).total_seconds()) // 60):
+            lokaal = (begin + timedelta(minutes=i)).astimezone(tz)
+            minuten.add(lokaal.hour * 60 + lokaal.minute)
+        return minuten
+
+    def ontbrekende_minuten(self, dag, aanwezig, tot_minuut=None):
+        """ Gesorteerde lijst van de minuten van 'dag' die niet in 'aanwezig' zitten (vandaag: tot 'tot_minuut'). """
+        ontbrekend = self.verwachte_minuten(dag) - set(aanwezig) - self.niet_bij_elia.get(dag, set())
+        if tot_minuut is not None:
+            ontbrekend = {m for m in ontbrekend if m < tot_minuut}
+        return sorted(ontbrekend)
+
+    @staticmethod
+    def bereiken(minuten, lengte=None):
+        """ Gesorteerde minuten -> [(eerste, laatste + 1), ...]: aaneengesloten en hoogstens 'lengte' lang. """
+        lengte = lengte or config.AANVUL_PAGINA
+        bereiken = []
+        for minuut in minuten:
+            if bereiken and minuut == bereiken[-1][1] and minuut - bereiken[-1][0] < lengte:
+                bereiken[-1][1] = minuut + 1
+            else:
+                bereiken.append([minuut, minuut + 1])
+        return [tuple(bereik) for bereik in bereiken]
+
+    # --- Ophalen ---
+
+    def _tijdstip(self, dag, minuut):
+        """ Minuut van de dag -> tijdzone-bewuste datetime (1440 = middernacht van de volgende dag). """
+        dag, minuut = dag + timedelta(days=minuut // 1440), minuut % 1440
+        return self.elia.tz.localize(datetime.combine(dag, time(minuut // 60, minuut % 60)))
+
+    def _haal_bereik(self, dag, van, tot):
+        """ Eén bereik ophalen, pagina per pagina. Geeft [(minuut, prijs), ...] of None bij een fout. """
+        url_van, url_tot = self._tijdstip(dag, van), self._tijdstip(dag, tot)
+        gevonden, offset = [], 0
+        while True:
+            self.emmer.neem()
+            try:
+                response = self.elia.session.get(bereik_url(self.elia.url, url_van, url_tot, offset),
+                                                 timeout=config.ELIA_POLL_BUDGET)
+                response.raise_for_status()
+                records = response.json().get('results') or []
+            except (requests.exceptions.RequestException, ValueError) as e:
+                with self.lock:
+                    self.aanroepen += 1
+                    self.fouten += 1
+                logging.warning(f"⚠️ Aanvullen {dag} {van // 60:02}:{van % 60:02}: {e}")
+                return None
+            with self.lock:
+                self.aanroepen += 1
+
+            for record in records:
+                prijs, tijdstip = record.get('imbalanceprice'), record.get('datetime')
+                if prijs is None or tijdstip is None:
+                    continue
+                lokaal = datetime.fromisoformat(tijdstip).astimezone(self.elia.tz)
+                if lokaal.date() == dag:
+                    gevonden.append((lokaal.hour * 60 + lokaal.minute, prijs))
+
+            # Een volle pagina kan betekenen dat er nog meer is (tenzij het bereik al vol zit)
+            if len(records) < config.AANVUL_PAGINA or offset + len(records) >= tot - van:
+                return gevonden
+            offset += len(records)
+
+    def haal(self, dag, ontbrekend):
+        """
+        Haalt de ontbrekende minuten van één dag op (bereiken tegelijk).
+        Geeft [(minuut, prijs), ...] gesorteerd terug, enkel minuten uit 'ontbrekend'.
+        """
+        gevraagd = set(ontbrekend)
+        futures = [self.pool.submit(self._haal_bereik, dag, van, tot) for van, tot in self.bereiken(ontbrekend)]
+
+        per_minuut, alles_gelukt = {}, True
+        for future in futures:
+            resultaat = future.result()
+            if resultaat is None:
+                alles_gelukt = False
+                continue
+            for minuut, prijs in resultaat:
+                if minuut in gevraagd:
+                    per_minuut[minuut] = prijs
+
+        # Een afgelopen dag die volledig gevraagd is: wat Elia niet heeft, vragen we niet opnieuw
+        if alles_gelukt and dag < datetime.now(self.elia.tz).date():
+            self.niet_bij_elia.setdefault(dag, set()).update(gevraagd - per_minuut.keys())
+
+        with self.lock:
+            self.aangevuld += len(per_minuut)
+        return sorted(per_minuut.items())
+
+    def vergeet_voor(self, dag):
+        """ Dagen buiten het venster hoeven we niet meer te onthouden. """
+        for oud in [d for d in self.niet_bij_elia if d < dag]:
+            del self.niet_bij_elia[oud]
+
+    def tellers(self):
+        with self.lock:
+            return {
+                'aanroepen': self.aanroepen,
+                'fouten': self.fouten,
+                'aangevuld': self.aangevuld,
+            }
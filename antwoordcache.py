@@ -0,0 +1,59 @@
+import threading
+from collections import OrderedDict
+
+# =============================================================================
+# LRU CACHE VOOR ANTWOORDEN VAN DE WEBSERVER
+# =============================================================================
+
+class AntwoordCache:
+    """
+    Onthoudt de laatst gebruikte antwoorden (LRU) op basis van een sleutel,
+    bv. ('maand', '2024-05', versie). De 'versie' in de sleutel zorgt voor de
+    ongeldigheid: verandert de data, dan verandert de sleutel en valt het oude
+    antwoord vanzelf uit de cache.
+    """
+
+    def __init__(self, maxgrootte=256):
+        self.maxgrootte = maxgrootte
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Tellers (om de grootte te kunnen afstellen)
+        self.hits = 0
+        self.misses = 0
+        self.niet_gewijzigd = 0  # Aantal 304-antwoorden
+        self.verwijderd = 0      # Door de LRU eruit gegooid
+
+    def haal(self, sleutel):
+        with self.lock:
+            if sleutel in self.items:
+                self.items.move_to_end(sleutel)
+                self.hits += 1
+                return self.items[sleutel]
+            self.misses += 1
+            return None
+
+    def zet(self, sleutel, waarde):
+        with self.lock:
+            self.items[sleutel] = waarde
+            self.items.move_to_end(sleutel)
+            while len(self.items) > self.maxgrootte:
+                self.items.popitem(last=False)
+                self.verwijderd += 1
+
+    def tel_niet_gewijzigd(self):
+        with self.lock:
+            self.niet_gewijzigd += 1
+
+    def tellers(self):
+        with self.lock:
+            totaal = self.hits + self.misses
+            return {
+                'items': len(self.items),
+                'maxgrootte': self.maxgrootte,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / totaal, 3) if totaal else None,
+                'niet_gewijzigd_304': self.niet_gewijzigd,
+                'verwijderd': self.verwijderd,
+            }
@@ -0,0 +1,1117 @@
+"""
+Benchmarks voor de bot en de website.
+
+Gebruik:
+    python3 benchmark.py live      # Live buffer: JSON-bestand vs. ring in gedeeld geheugen
+    python3 benchmark.py ring      # Live buffer: lezen terwijl de ring rond gaat (controle: geen halve records)
+    python3 benchmark.py db        # Dashboard-leesopdrachten terwijl de bot wegschrijft
+    python3 benchmark.py schema    # Grootte en snelheid van metingen_detail, oud vs. nieuw schema
+    python3 benchmark.py historiek # /maand en /jaar bij 1, 5 en 10 jaar historiek
+    python3 benchmark.py web       # Dashboard verversen: hele pagina vs. /api/live?since=
+    python3 benchmark.py verbindingen # Webserver: verbinding per thread vs. leespool (nieuwe thread per verzoek)
+    python3 benchmark.py opstart   # Webserver zonder pandas: opstarttijd, geheugen en tijd per aanvraag
+    python3 benchmark.py drempels  # Alarmen: bandentabel + bisect vs. de oude if-cascade
+    python3 benchmark.py abonnees  # Persoonlijke alarmen: gesorteerde index vs. alle abonnees overlopen
+    python3 benchmark.py replay    # Hele pijplijn van de bot op een afgespeelde reeks (--dagen 30, --http)
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import sqlite3
+import logging
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from datetime import datetime
+
+# =============================================================================
+# HULPJES
+# =============================================================================
+
+def tijd_str(minuut):
+    return f"{minuut // 60:02}:{minuut % 60:02}"
+
+def percentiel(waarden, p):
+    waarden = sorted(waarden)
+    return waarden[min(len(waarden) - 1, int(len(waarden) * p))] if waarden else None
+
+def toon(titel, resultaten):
+    print(f"\n=== {titel} ===")
+    breedte = max(len(naam) for naam in resultaten)
+    for naam, waarde in resultaten.items():
+        print(f"  {naam:<{breedte}} : {waarde}")
+
+# =============================================================================
+# LIVE BUFFER: JSON vs RING
+# =============================================================================
+
+def bench_live(args):
+    """
+    Simuleert een volledige dag (1440 minuten). Na elke minuut schrijft de bot
+    en laadt één bezoeker de pagina. We meten per minuut de schrijf- en leestijd.
+
+    - JSON: de bot herschrijft de hele buffer (sinds de laatste flush) en de
+      website parset die in een DataFrame, voegt samen met de DB-rijen en
+      verwijdert dubbels (zoals vroeger).
+    - Ring: de bot voegt één record toe, de website leest enkel wat nieuw is.
+    """
+    import pandas as pd
+    import live_buffer
+
+    map_ = tempfile.mkdtemp()
+    prijzen = [round(random.uniform(-100, 300), 2) for _ in range(1440)]
+    datum = '2024-01-01'
+
+    # --- JSON (oude manier) ---
+    pad_json = os.path.join(map_, 'energy_live.json')
+    buffer = []
+    db_rijen = []
+    schrijf_json = lees_json = 0.0
+    for minuut, prijs in enumerate(prijzen):
+        if minuut % 15 == 0:
+            db_rijen.extend(buffer)  # 'flush' naar de DB
+            buffer = []
+        buffer.append((datum, tijd_str(minuut), prijs))
+
+        start = time.perf_counter()
+        with open(pad_json, 'w') as f:
+            json.dump(buffer, f)
+        schrijf_json += time.perf_counter() - start
+
+        start = time.perf_counter()
+        df = pd.DataFrame([r[1:] for r in db_rijen], columns=['tijd', 'waarde'])
+        with open(pad_json, 'r') as f:
+            df_buffer = pd.DataFrame(json.load(f), columns=['datum', 'tijd', 'waarde'])[['tijd', 'waarde']]
+        df = pd.concat([df, df_buffer], ignore_index=True).drop_duplicates(subset=['tijd'], keep='last')
+        lees_json += time.perf_counter() - start
+
+    # --- RING (nieuwe manier) ---
+    pad_ring = os.path.join(map_, 'energy_live.ring')
+    schrijver = live_buffer.LiveBufferSchrijver(pad_ring, capaciteit=2048)
+    lezer = live_buffer.LiveBufferLezer(pad_ring)
+    minuten = {}
+    stats = {'aantal': 0, 'gem': 0.0, 'min': 0.0, 'max': 0.0}
+    schrijf_ring = lees_ring = 0.0
+    for minuut, prijs in enumerate(prijzen):
+        stats['aantal'] += 1
+        start = time.perf_counter()
+        schrijver.voeg_toe(datum, tijd_str(minuut), prijs)
+        schrijver.zet_stats(datum, stats)
+        schrijf_ring += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _, m, p in lezer.nieuwe_records():
+            minuten[m] = p
+        lezer.stats()
+        lees_ring += time.perf_counter() - start
+    schrijver.sluit()
+
+    assert len(minuten) == 1440 and list(minuten.values()) == prijzen
+
+    toon("Live buffer (1 dag, per minuut)", {
+        'JSON schrijven (µs)': round(schrijf_json / 1440 * 1e6, 1),
+        'JSON lezen + pandas (µs)': round(lees_json / 1440 * 1e6, 1),
+        'Ring schrijven (µs)': round(schrijf_ring / 1440 * 1e6, 1),
+        'Ring lezen (µs)': round(lees_ring / 1440 * 1e6, 1),
+        'Ring bestandsgrootte (bytes)': os.path.getsize(pad_ring),
+    })
+
+# =============================================================================
+# LIVE BUFFER: LEZEN TERWIJL DE RING ROND GAAT
+# =============================================================================
+
+RING_DATUM = '2024-05-01'
+
+def _ring_schrijver(pad, capaciteit, stop, geschreven):
+    """ Apart proces (geen GIL tussen schrijver en lezer): schrijft zo snel mogelijk record n met prijs n. """
+    from live_buffer import LiveBufferSchrijver
+    schrijver = LiveBufferSchrijver(pad, capaciteit)
+    n = schrijver.volgnummer
+    while not stop.is_set():
+        n += 1
+        schrijver.voeg_toe(RING_DATUM, tijd_str(n % 1440), float(n))
+    geschreven.value = n
+    schrijver.sluit()
+
+def bench_ring(args):
+    """
+    Een kleine ring (64 records) die honderden keren per seconde rond gaat,
+    met een lezer die intussen continu leest. Record n heeft prijs n en minuut
+    n % 1440: een record met de inhoud van twee verschillende n (een halve
+    schrijfactie) valt zo meteen op. Overgeslagen records (de lezer was te
+    traag) mogen, halve records niet.
+    """
+    from live_buffer import LiveBufferSchrijver, LiveBufferLezer, datum_als_getal
+
+    map_ = tempfile.mkdtemp(dir='.')
+    pad = os.path.join(map_, 'ring.bin')
+    capaciteit = 64
+    LiveBufferSchrijver(pad, capaciteit).sluit()  # Ring aanmaken vóór de lezer start
+
+    context = multiprocessing.get_context('spawn')
+    stop, geschreven = context.Event(), context.Value('q', 0)
+    proces = context.Process(target=_ring_schrijver, args=(pad, capaciteit, stop, geschreven))
+    proces.start()
+
+    lezer = LiveBufferLezer(pad)
+    gelezen = kapot = lezingen = 0
+    einde = time.perf_counter() + 3
+    while time.perf_counter() < einde:
+        lezingen += 1
+        for datum, minuut, prijs in lezer.nieuwe_records():
+            gelezen += 1
+            if datum != datum_als_getal(RING_DATUM) or prijs != int(prijs) or int(prijs) % 1440 != minuut:
+                kapot += 1
+    stop.set()
+    proces.join()
+    os.remove(pad)
+    os.rmdir(map_)
+
+    assert kapot == 0, f"{kapot} halve records gelezen"
+    toon("Live buffer: lezen terwijl de ring rond gaat (3 s, 64 records)", {
+        'Records geschreven': f"{geschreven.value:,} ({geschreven.value // capaciteit:,}x rond)",
+        'Leesbeurten': f"{lezingen:,}",
+        'Records gelezen': f"{gelezen:,}",
+        'Halve records': kapot,
+    })
+
+# =============================================================================
+# DATABASE: LEZEN TIJDENS SCHRIJVEN
+# =============================================================================
+
+DB_DAGEN = [f"2024-01-{d:02}" for d in range(1, 29)]
+
+def maak_oude_db(pad, dagen):
+    """ Database met het OUDE schema (datum TEXT, tijd TEXT, waarde + index op datum). """
+    conn = sqlite3.connect(pad)
+    conn.execute("CREATE TABLE dagstatistieken (datum TEXT PRIMARY KEY, laagste REAL, hoogste REAL, gemiddelde REAL, "
+                 "mediaan REAL, aantal INTEGER, aantal_negatief INTEGER, aantal_duur INTEGER, "
+                 "tijdstip_laagste TEXT, tijdstip_hoogste TEXT)")
+    conn.execute("CREATE TABLE metingen_detail (datum TEXT, tijd TEXT, waarde REAL)")
+    conn.execute("CREATE INDEX idx_detail_datum ON metingen_detail (datum)")
+    for datum in dagen:
+        conn.executemany("INSERT INTO metingen_detail VALUES (?, ?, ?)",
+                         [(datum, tijd_str(m), round(random.uniform(-100, 300), 2)) for m in range(1440)])
+    conn.commit()
+    conn.close()
+
+def _db_schrijver(pad, nieuw, stop, teller):
+    """ Proces dat (veel vaker dan de bot: 20x per seconde) een buffer wegschrijft. """
+    import config
+    import database_manager
+    logging.disable(logging.INFO)
+
+    datum = DB_DAGEN[-1]
+    dag_data = {'datum': datum, 'laagste': 0.0, 'hoogste': 1.0, 'gemiddelde': 0.5, 'mediaan': 0.5,
+                'aantal': 15, 'aantal_negatief': 0, 'aantal_duur': 0, 'tijd_laag': '00:00', 'tijd_hoog': '00:01'}
+    config.DB_BESTAND = pad
+    while not stop.is_set():
+        buffer = [(datum, tijd_str((teller.value * 15 + i) % 1440), random.uniform(-100, 300)) for i in range(15)]
+        if nieuw:
+            database_manager.sla_buffer_en_dag_op(dag_data, buffer)
+        else:
+            # Oude manier: elke keer een nieuwe verbinding, standaard rollback journal
+            conn = sqlite3.connect(pad)
+            conn.executemany('INSERT INTO metingen_detail (datum, tijd, waarde) VALUES (?, ?, ?)', buffer)
+            conn.execute('INSERT OR REPLACE INTO dagstatistieken (datum, aantal) VALUES (?, ?)', (datum, 15))
+            conn.commit()
+            conn.close()
+        teller.value += 1
+        time.sleep(0.05)
+
+def bench_db(args):
+    """
+    Een apart proces doet 20x per seconde wat de bot elke 15 minuten doet (een
+    buffer + dagstatistieken wegschrijven), terwijl enkele 'bezoekers' het
+    dashboard opvragen. We meten hoe lang de leesopdrachten duren.
+
+    - Oud : per opdracht een nieuwe verbinding, standaard rollback journal
+    - Nieuw: database_manager (WAL, blijvende verbindingen, read-only lezers)
+    """
+    import config
+    import database_manager
+
+    duur = 3.0
+    aantal_lezers = 2
+
+    # --- Lezen: de oude manier (zoals de webserver het vroeger deed) en de nieuwe ---
+    def oud_lees(pad, datum):
+        conn = sqlite3.connect(pad)
+        conn.execute("SELECT tijd, waarde FROM metingen_detail WHERE datum = ? ORDER BY tijd ASC", (datum,)).fetchall()
+        conn.execute("SELECT gemiddelde FROM dagstatistieken WHERE datum = ?", (datum,)).fetchone()
+        conn.close()
+
+    def nieuw_lees(pad, datum):
+        conn = database_manager.verbinding(alleen_lezen=True)
+        conn.execute("SELECT minuut, waarde FROM metingen_detail WHERE dag = ? ORDER BY minuut",
+                     (database_manager.dag_van(datum),)).fetchall()
+        conn.execute("SELECT gemiddelde FROM dagstatistieken WHERE datum = ?", (datum,)).fetchone()
+
+    def meet(nieuw, lees, pad):
+        stop = threading.Event()
+        latenties = []
+        fouten = [0]
+
+        # De schrijver is (zoals de bot) een APART proces
+        stop_schrijver = multiprocessing.Event()
+        schrijfacties = multiprocessing.Value('i', 0)
+        schrijver = multiprocessing.Process(target=_db_schrijver, args=(pad, nieuw, stop_schrijver, schrijfacties))
+        schrijver.start()
+        time.sleep(0.2)
+
+        def lezer():
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    lees(pad, random.choice(DB_DAGEN))
+                    latenties.append(time.perf_counter() - start)
+                except sqlite3.OperationalError:
+                    fouten[0] += 1
+            database_manager.sluit_verbinding()
+
+        threads = [threading.Thread(target=lezer) for _ in range(aantal_lezers)]
+        for t in threads:
+            t.start()
+        time.sleep(duur)
+        stop.set()
+        for t in threads:
+            t.join()
+        stop_schrijver.set()
+        schrijver.join()
+        return {
+            'leesopdrachten/s': round(len(latenties) / duur),
+            'lezen p50 (ms)': round(percentiel(latenties, 0.5) * 1000, 2),
+            'lezen p99 (ms)': round(percentiel(latenties, 0.99) * 1000, 2),
+            'lezen max (ms)': round(max(latenties) * 1000, 2),
+            'schrijfacties/s': round(schrijfacties.value / (duur + 0.2)),
+            'lock-fouten': fouten[0],
+        }
+
+    map_ = tempfile.mkdtemp(dir='.')
+    oud_pad = os.path.join(map_, 'oud.db')
+    nieuw_pad = os.path.join(map_, 'nieuw.db')
+    maak_oude_db(oud_pad, DB_DAGEN)
+    maak_oude_db(nieuw_pad, DB_DAGEN)
+
+    oude_db = config.DB_BESTAND
+    config.DB_BESTAND = nieuw_pad
+    try:
+        logging.disable(logging.INFO)
+        database_manager.init_database()  # WAL-modus + nieuw schema
+        database_manager.sluit_verbinding()
+        logging.disable(logging.NOTSET)
+        toon(f"Database oud ({aantal_lezers} lezers + 1 schrijver, {duur:.0f}s)", meet(False, oud_lees, oud_pad))
+        toon(f"Database nieuw ({aantal_lezers} lezers + 1 schrijver, {duur:.0f}s)", meet(True, nieuw_lees, nieuw_pad))
+    finally:
+        config.DB_BESTAND = oude_db
+        for naam in os.listdir(map_):
+            os.remove(os.path.join(map_, naam))
+        os.rmdir(map_)
+
+# =============================================================================
+# DATABASE: OUD vs NIEUW SCHEMA VAN METINGEN_DETAIL
+# =============================================================================
+
+def bench_schema(args):
+    """
+    Eén jaar minuutdata in het oude schema, daarna de automatische migratie
+    (init_database) naar het WITHOUT ROWID schema. We vergelijken de
+    bestandsgrootte en de tijd om een dag en een maand op te vragen.
+    """
+    from datetime import date, timedelta
+    import config
+    import database_manager
+
+    dagen = [(date(2023, 1, 1) + timedelta(days=i)).isoformat() for i in range(365)]
+    map_ = tempfile.mkdtemp(dir='.')
+    pad = os.path.join(map_, 'schema.db')
+    maak_oude_db(pad, dagen)
+
+    def meet(sql, params_lijst):
+        conn = sqlite3.connect(pad)
+        start = time.perf_counter()
+        for params in params_lijst:
+            rijen = conn.execute(sql, params).fetchall()
+        duur = (time.perf_counter() - start) / len(params_lijst)
+        conn.close()
+        return round(duur * 1000, 2), len(rijen)
+
+    steekproef = random.sample(dagen, 50)
+    maanden = [f"2023-{m:02}" for m in range(1, 13)]
+    oud_grootte = os.path.getsize(pad)
+    oud_dag = meet("SELECT tijd, waarde FROM metingen_detail WHERE datum = ? ORDER BY tijd ASC",
+                   [(d,) for d in steekproef])
+    oud_maand = meet("SELECT datum, tijd, waarde FROM metingen_detail WHERE datum BETWEEN ? AND ?",
+                     [(f"{m}-01", f"{m}-31") for m in maanden])
+    oud_gem = meet("SELECT AVG(waarde) FROM metingen_detail WHERE datum BETWEEN ? AND ?",
+                   [(f"{m}-01", f"{m}-31") for m in maanden])
+
+    oude_db = config.DB_BESTAND
+    config.DB_BESTAND = pad
+    try:
+        start = time.perf_counter()
+        database_manager.init_database()
+        migratie = time.perf_counter() - start
+        database_manager.sluit_verbinding()
+    finally:
+        config.DB_BESTAND = oude_db
+
+    nieuw_grootte = os.path.getsize(pad)
+    nieuw_dag = meet("SELECT minuut, waarde FROM metingen_detail WHERE dag = ? ORDER BY minuut",
+                     [(database_manager.dag_van(d),) for d in steekproef])
+    nieuw_maand = meet("SELECT dag, minuut, waarde FROM metingen_detail WHERE dag BETWEEN ? AND ?",
+                       [(int(m.replace('-', '')) * 100 + 1, int(m.replace('-', '')) * 100 + 31) for m in maanden])
+    nieuw_gem = meet("SELECT AVG(waarde) FROM metingen_detail WHERE dag BETWEEN ? AND ?",
+                     [(int(m.replace('-', '')) * 100 + 1, int(m.replace('-', '')) * 100 + 31) for m in maanden])
+    assert oud_dag[1] == nieuw_dag[1] and oud_maand[1] == nieuw_maand[1]
+
+    for naam in os.listdir(map_):
+        os.remove(os.path.join(map_, naam))
+    os.rmdir(map_)
+
+    toon(f"metingen_detail ({len(dagen)} dagen, {len(dagen) * 1440} minuten)", {
+        'Oud: bestandsgrootte (MB)': round(oud_grootte / 1e6, 1),
+        'Nieuw: bestandsgrootte (MB)': round(nieuw_grootte / 1e6, 1),
+        'Migratie (s)': round(migratie, 1),
+        'Oud: 1 dag opvragen (ms)': oud_dag[0],
+        'Nieuw: 1 dag opvragen (ms)': nieuw_dag[0],
+        'Oud: 1 maand opvragen (ms)': oud_maand[0],
+        'Nieuw: 1 maand opvragen (ms)': nieuw_maand[0],
+        'Oud: maandgemiddelde in SQL (ms)': oud_gem[0],
+        'Nieuw: maandgemiddelde in SQL (ms)': nieuw_gem[0],
+    })
+
+# =============================================================================
+# DATABASE: MAAND- EN JAARPAGINA BIJ GROEIENDE HISTORIEK
+# =============================================================================
+
+def bench_historiek(args):
+    """
+    Vult dagstatistieken met 1, 5 en 10 jaar aan dagen en meet de queries van
+    /maand en /jaar: vroeger met strftime() (volledige scan + aggregatie),
+    nu met een BETWEEN op de primaire sleutel en de voorberekende maandtotalen.
+    """
+    from datetime import date, timedelta
+    import config
+    import database_manager
+
+    def meet(conn, sql, params, herhalingen=50):
+        start = time.perf_counter()
+        for _ in range(herhalingen):
+            conn.execute(sql, params).fetchall()
+        return round((time.perf_counter() - start) / herhalingen * 1000, 3)
+
+    oud_maand = "SELECT * FROM dagstatistieken WHERE strftime('%Y-%m', datum) = ? ORDER BY datum ASC"
+    oud_jaar = """
+        SELECT strftime('%Y-%m', datum) as maand, AVG(gemiddelde), MIN(laagste), MAX(hoogste),
+               SUM(aantal_negatief), SUM(aantal_duur)
+        FROM dagstatistieken WHERE strftime('%Y', datum) = ? GROUP BY maand ORDER BY maand ASC
+    """
+    nieuw_maand = "SELECT * FROM dagstatistieken WHERE datum BETWEEN ? AND ? ORDER BY datum ASC"
+    nieuw_jaar = """
+        SELECT maand, som_gemiddelde / aantal_dagen, laagste, hoogste, som_negatief, som_duur
+        FROM maandstatistieken WHERE maand BETWEEN ? AND ? AND aantal_dagen > 0 ORDER BY maand ASC
+    """
+
+    map_ = tempfile.mkdtemp(dir='.')
+    oude_db = config.DB_BESTAND
+    resultaten = {}
+    logging.disable(logging.INFO)
+    try:
+        for jaren in (1, 5, 10):
+            config.DB_BESTAND = os.path.join(map_, f'historiek_{jaren}.db')
+            database_manager.init_database()
+            conn = database_manager.verbinding()
+            eerste = date(2024 - jaren + 1, 1, 1)
+            conn.executemany("INSERT INTO dagstatistieken VALUES (?, ?, ?, ?, ?, 1440, ?, ?, '00:00', '00:00')", [
+                ((eerste + timedelta(days=i)).isoformat(), random.uniform(-300, 0), random.uniform(100, 500),
+                 random.uniform(0, 150), random.uniform(0, 150), random.randint(0, 300), random.randint(0, 300))
+                for i in range((date(2025, 1, 1) - eerste).days)])
+            for i in range(0, (date(2025, 1, 1) - eerste).days, 28):
+                database_manager.werk_totalen_bij(conn, (eerste + timedelta(days=i)).isoformat())
+            conn.commit()
+
+            resultaten[f'{jaren} jaar: /maand oud (ms)'] = meet(conn, oud_maand, ('2024-06',))
+            resultaten[f'{jaren} jaar: /maand nieuw (ms)'] = meet(conn, nieuw_maand, ('2024-06-01', '2024-06-31'))
+            resultaten[f'{jaren} jaar: /jaar oud (ms)'] = meet(conn, oud_jaar, ('2024',))
+            resultaten[f'{jaren} jaar: /jaar nieuw (ms)'] = meet(conn, nieuw_jaar, ('2024-01', '2024-12'))
+            database_manager.sluit_verbinding()
+    finally:
+        logging.disable(logging.NOTSET)
+        config.DB_BESTAND = oude_db
+        for naam in os.listdir(map_):
+            os.remove(os.path.join(map_, naam))
+        os.rmdir(map_)
+
+    toon("Maand- en jaarpagina (enkel de query)", resultaten)
+
+# =============================================================================
+# WEBSERVER: VOLLEDIGE HERLAADBEURT vs. /api/live?since=
+# =============================================================================
+
+def bench_web(args):
+    """
+    Een dashboard dat elke minuut ververst: vroeger de hele pagina opnieuw
+    (Jinja + de volledige dag als JSON), nu enkel de nieuwe minuut via de API.
+    Gemeten met de Flask test client (dus zonder netwerk), voor een volle dag.
+    """
+    from datetime import datetime
+    import config
+    import database_manager
+
+    map_ = tempfile.mkdtemp(dir='.')
+    oude_db = config.DB_BESTAND
+    config.DB_BESTAND = os.path.join(map_, 'web.db')
+    logging.disable(logging.INFO)
+    try:
+        vandaag = datetime.now().strftime('%Y-%m-%d')
+        nu = datetime.now().hour * 60 + datetime.now().minute
+        database_manager.init_database()
+        database_manager.sla_buffer_en_dag_op(
+            {'datum': vandaag, 'laagste': 0.0, 'hoogste': 1.0, 'gemiddelde': 0.5, 'mediaan': 0.5, 'aantal': nu + 1,
+             'aantal_negatief': 0, 'aantal_duur': 0, 'tijd_laag': '00:00', 'tijd_hoog': '00:01'},
+            [(vandaag, tijd_str(m), round(random.uniform(-100, 300), 2)) for m in range(nu + 1)])
+        database_manager.sluit_verbinding()
+
+        import webserver
+        client = webserver.app.test_client()
+
+        def meet(url, herhalingen=50):
+            client.get(url)  # Opwarmen
+            start = time.perf_counter()
+            cpu_start = time.process_time()
+            for _ in range(herhalingen):
+                antwoord = client.get(url)
+            return ((time.perf_counter() - start) / herhalingen * 1000,
+                    (time.process_time() - cpu_start) / herhalingen * 1000,
+                    len(antwoord.data))
+
+        pagina = meet('/')
+        api = meet(f'/api/live?datum={vandaag}&since={tijd_str(max(0, nu - 1))}')
+    finally:
+        logging.disable(logging.NOTSET)
+        config.DB_BESTAND = oude_db
+        for naam in os.listdir(map_):
+            os.remove(os.path.join(map_, naam))
+        os.rmdir(map_)
+
+    toon(f"Verversen van het dashboard ({nu + 1} minuten vandaag)", {
+        'Hele pagina: tijd (ms)': round(pagina[0], 2),
+        'Hele pagina: CPU (ms)': round(pagina[1], 2),
+        'Hele pagina: bytes': pagina[2],
+        '/api/live?since=: tijd (ms)': round(api[0], 2),
+        '/api/live?since=: CPU (ms)': round(api[1], 2),
+        '/api/live?since=: bytes': api[2],
+    })
+
+# =============================================================================
+# WEBSERVER: VERBINDING PER THREAD vs. LEESPOOL
+# =============================================================================
+
+def bench_verbindingen(args):
+    """
+    De webserver draait met threaded=True of gevent: elk verzoek krijgt een
+    nieuwe thread (of greenlet). Hier net zo: 8 verzoeken tegelijk, elk in een
+    verse thread, via de Flask test client naar /api/live van een afgesloten
+    dag (geen ring, geen cache: elk verzoek gaat naar SQLite).
+
+    - Per thread: verbinding() opent per (nieuwe) thread een verbinding
+    - Leespool  : verzoeken lenen een verbinding uit LeesPool
+    """
+    import config
+    import database_manager
+
+    map_ = tempfile.mkdtemp(dir='.')
+    oude_db, oude_ring = config.DB_BESTAND, config.LIVE_BUFFER_PAD
+    config.DB_BESTAND = os.path.join(map_, 'web.db')
+    config.LIVE_BUFFER_PAD = os.path.join(map_, 'geen.ring')
+    datum = DB_DAGEN[-1]
+    logging.disable(logging.INFO)
+    try:
+        database_manager.init_database()
+        database_manager.sla_buffer_en_dag_op(
+            {'datum': datum, 'laagste': 0.0, 'hoogste': 1.0, 'gemiddelde': 0.5, 'mediaan': 0.5, 'aantal': 1440,
+             'aantal_negatief': 0, 'aantal_duur': 0, 'tijd_laag': '00:00', 'tijd_hoog': '00:01'},
+            [(datum, tijd_str(m), round(random.uniform(-100, 300), 2)) for m in range(1440)])
+        database_manager.sluit_verbinding()
+
+        import webserver
+        client = webserver.app.test_client()
+        url = f'/api/live?datum={datum}&since=20:00'
+        pool = database_manager.lees_pool
+
+        def meet(grootte, rondes=250, tegelijk=8):
+            pool.sluit()
+            pool.grootte = grootte
+            latenties = []
+
+            def verzoek():
+                start = time.perf_counter()
+                assert client.get(url).status_code == 200
+                latenties.append(time.perf_counter() - start)
+
+            cpu_start = time.process_time()
+            for _ in range(rondes):
+                threads = [threading.Thread(target=verzoek) for _ in range(tegelijk)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            cpu = (time.process_time() - cpu_start) / len(latenties) * 1000
+            return percentiel(latenties, 0.5) * 1000, percentiel(latenties, 0.95) * 1000, cpu
+
+        per_thread = meet(0)  # 0 = geen pool: leen_verbinding() doet niets
+        met_pool = meet(config.DB_LEES_VERBINDINGEN)
+        tellers = pool.tellers()
+        pool.sluit()
+    finally:
+        logging.disable(logging.NOTSET)
+        config.DB_BESTAND, config.LIVE_BUFFER_PAD = oude_db, oude_ring
+        for naam in os.listdir(map_):
+            os.remove(os.path.join(map_, naam))
+        os.rmdir(map_)
+
+    toon("Webserver: verbinding per thread vs. leespool (2000 verzoeken, 8 tegelijk)", {
+        'Per thread: p50 / p95 (ms)': f"{per_thread[0]:.2f} / {per_thread[1]:.2f}",
+        'Per thread: CPU per verzoek (ms)': round(per_thread[2], 2),
+        'Per thread: verbindingen geopend': 2000,
+        'Leespool: p50 / p95 (ms)': f"{met_pool[0]:.2f} / {met_pool[1]:.2f}",
+        'Leespool: CPU per verzoek (ms)': round(met_pool[2], 2),
+        'Leespool: verbindingen geopend': tellers['geopend'],
+    })
+
+# =============================================================================
+# WEBSERVER ZONDER PANDAS: OPSTART EN AANVRAGEN
+# =============================================================================
+
+OPSTART_SCRIPT = """
+import sys, time, resource
+start = time.perf_counter()
+{voor}
+import webserver
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+def meet_opstart(voor='', herhalingen=5):
+    """ Koude start van de webserver in een apart proces: (mediaan seconden, max RSS in MB). """
+    tijden, rss = [], []
+    for _ in range(herhalingen):
+        uitvoer = subprocess.run([sys.executable, '-c', OPSTART_SCRIPT.format(voor=voor)],
+                                 cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 capture_output=True, text=True, check=True).stdout.split()
+        tijden.append(float(uitvoer[-2]))
+        rss.append(int(uitvoer[-1]) / 1024)
+    return percentiel(tijden, 0.5), max(rss)
+
+def bench_opstart(args):
+    """
+    De webserver gebruikte pandas voor read_sql_query, het samenvoegen met de
+    live buffer en gem/min/max. Nu doet SQLite of één doorloop over de rijen
+    dat werk. We meten de koude start (met en zonder 'import pandas' erbij,
+    wat de oude webserver altijd deed) en de tijd per aanvraag tegenover
+    dezelfde berekening met pandas, op een maand aan data.
+    """
+    import config
+    import database_manager
+
+    zonder = meet_opstart()
+    try:
+        import pandas as pd
+        met = meet_opstart('import pandas')
+    except ImportError:
+        pd = met = None
+
+    map_ = tempfile.mkdtemp(dir='.')
+    oude_db = config.DB_BESTAND
+    config.DB_BESTAND = os.path.join(map_, 'opstart.db')
+    logging.disable(logging.INFO)
+    try:
+        datum = DB_DAGEN[-1]
+        database_manager.init_database()
+        for dag in DB_DAGEN:
+            prijzen = [round(random.uniform(-100, 300), 2) for _ in range(1440)]
+            database_manager.sla_buffer_en_dag_op(
+                {'datum': dag, 'laagste': min(prijzen), 'hoogste': max(prijzen), 'gemiddelde': sum(prijzen) / 1440,
+                 'mediaan': 0.0, 'aantal': 1440, 'aantal_negatief': 0, 'aantal_duur': 0,
+                 'tijd_laag': '00:00', 'tijd_hoog': '00:01'},
+                [(dag, tijd_str(m), p) for m, p in enumerate(prijzen)])
+        database_manager.sluit_verbinding()
+
+        import webserver
+
+        def meet(functie, herhalingen=50):
+            functie()  # Opwarmen
+            start = time.perf_counter()
+            for _ in range(herhalingen):
+                functie()
+            return round((time.perf_counter() - start) / herhalingen * 1000, 2)
+
+        resultaten = {
+            'Koude start zonder pandas (s)': round(zonder[0], 2),
+            'Max RSS zonder pandas (MB)': round(zonder[1], 1),
+        }
+        if met:
+            resultaten['Koude start met pandas (s)'] = round(met[0], 2)
+            resultaten['Max RSS met pandas (MB)'] = round(met[1], 1)
+
+        resultaten['Dag zonder pandas (ms)'] = meet(lambda: webserver.haal_live_data(datum))
+        resultaten['Maand zonder pandas (ms)'] = meet(lambda: webserver.haal_maand_data(datum[:7]))
+
+        if pd:
+            conn = database_manager.verbinding()
+
+            def dag_pandas():
+                # Zoals vroeger: DataFrame, kwartieren via str.endswith, gem/min/max
+                minuten = dict(database_manager.haal_dag_op(datum))
+                df = pd.DataFrame({'tijd': [tijd_str(m) for m in sorted(minuten)],
+                                   'waarde': [minuten[m] for m in sorted(minuten)]})
+                tele = df[df['tijd'].str.endswith(('14', '29', '44', '59'))]
+                return (df['waarde'].mean(), df['waarde'].min(), df['waarde'].max(), tele['waarde'].mean(),
+                        df['tijd'].tolist(), df['waarde'].tolist(), tele['tijd'].tolist(), tele['waarde'].tolist())
+
+            def maand_pandas():
+                df = pd.read_sql_query("SELECT * FROM dagstatistieken WHERE datum BETWEEN ? AND ? ORDER BY datum ASC",
+                                       conn, params=(datum[:7] + '-01', datum[:7] + '-31'))
+                df['normaal'] = df['aantal'] - df['aantal_negatief'] - df['aantal_duur']
+                df['gemist'] = (1440 - df['aantal']).clip(lower=0)
+                return df.to_dict(orient='list')
+
+            resultaten['Dag met pandas (ms)'] = meet(dag_pandas)
+            resultaten['Maand met pandas (ms)'] = meet(maand_pandas)
+    finally:
+        logging.disable(logging.NOTSET)
+        database_manager.sluit_verbinding()
+        config.DB_BESTAND = oude_db
+        for naam in os.listdir(map_):
+            os.remove(os.path.join(map_, naam))
+        os.rmdir(map_)
+
+    toon(f"Webserver zonder pandas ({len(DB_DAGEN)} dagen in de DB)", resultaten)
+
+# =============================================================================
+# ALARMEN: DREMPELMOTOR vs. DE OUDE IF-CASCADE
+# =============================================================================
+
+def oude_prijsstatus(prijs, status, meld, config):
+    """ beheer_prijsstatus zoals vroeger (zonder logging), als referentie (ook voor test_drempelmotor.py). """
+    if prijs < config.GRENS_EXTREEM_LAAG and not status['extreem_laag']:
+        meld("EXTREEM LAGE PRIJS", "🧊")
+        status.update({'extreem_laag': True, 'zeer_laag': True, 'onder_min_50': True, 'onder_0': True,
+                       'onder_50': True, 'zeer_hoog': False})
+        return status
+    if prijs < config.GRENS_ZEER_LAAG and not status['zeer_laag']:
+        meld("ZÉÉR LAGE PRIJS", "❄️")
+        status.update({'zeer_laag': True, 'onder_min_50': True, 'onder_0': True, 'onder_50': True, 'zeer_hoog': False})
+        return status
+    if prijs > config.GRENS_ZEER_HOOG and not status['zeer_hoog']:
+        meld("ZÉÉR HOGE PRIJS", "🚨")
+        status.update({'zeer_hoog': True, 'extreem_laag': False, 'zeer_laag': False, 'onder_min_50': False,
+                       'onder_0': False, 'onder_50': False})
+        return status
+    if prijs < config.GRENS_LAAG_MIN_50 and not status['onder_min_50']:
+        meld("Prijs onder -50", "🌟")
+        status.update({'onder_min_50': True, 'onder_0': True, 'onder_50': True, 'zeer_hoog': False})
+        return status
+    if prijs < config.GRENS_NEGATIEF and not status['onder_0']:
+        meld("Prijs onder 0", "✅")
+        status.update({'onder_0': True, 'onder_50': True, 'zeer_hoog': False})
+        return status
+    if config.GRENS_NEGATIEF < prijs < config.GRENS_GOEDKOOP and not status['onder_50']:
+        meld("Prijs onder 50", "⚠️")
+        status.update({'onder_50': True, 'zeer_hoog': False})
+        return status
+
+    if prijs >= config.GRENS_HERSTEL and status['onder_50']:
+        meld("Prijs weer boven 50", "📈")
+        status.update({'onder_50': False, 'onder_0': False, 'onder_min_50': False})
+    elif prijs >= config.GRENS_NEGATIEF and status['onder_0']:
+        meld("Prijs weer positief", "⚠️")
+        status.update({'onder_0': False, 'onder_min_50': False})
+    elif prijs >= config.GRENS_LAAG_MIN_50 and status['onder_min_50']:
+        meld("Prijs weer boven -50", "☑️")
+        status.update({'onder_min_50': False})
+    return status
+
+def synthetische_prijzen(aantal, zaad=1):
+    """ Random walk rond de grenzen, met af en toe een sprong (zoals echte onbalansprijzen). """
+    rng = random.Random(zaad)
+    prijzen = []
+    prijs = 50.0
+    for _ in range(aantal):
+        if rng.random() < 0.02:
+            prijs = rng.uniform(-800, 800)
+        else:
+            prijs = max(-1000.0, min(1000.0, prijs + rng.gauss(0, 25)))
+        prijzen.append(round(prijs))
+    return prijzen
+
+def bench_drempels(args):
+    """
+    Speelt 'aantal' synthetische prijzen af door de oude if-cascade en door
+    de drempelmotor en meet de tijd per meting. Dat beide exact dezelfde
+    meldingen en status geven, controleert test_drempelmotor.py.
+    """
+    import config
+    from drempelmotor import DrempelMotor
+
+    motor = DrempelMotor()
+    prijzen = synthetische_prijzen(args.aantal)
+
+    niets = lambda titel, icoon: None
+    status = dict.fromkeys(motor.namen, False)
+    start = time.perf_counter()
+    for prijs in prijzen:
+        status = oude_prijsstatus(prijs, status, niets, config)
+    oud_tijd = time.perf_counter() - start
+
+    verwerk = motor.verwerk
+    toestand = motor.begin
+    start = time.perf_counter()
+    for prijs in prijzen:
+        toestand, melding = verwerk(toestand, prijs)
+    nieuw_tijd = time.perf_counter() - start
+
+    # Ondergrens: dezelfde lus met een aanroep die niets doet
+    niets_doen = lambda toestand, prijs: (toestand, None)
+    start = time.perf_counter()
+    for prijs in prijzen:
+        toestand, melding = niets_doen(toestand, prijs)
+    leeg_tijd = time.perf_counter() - start
+
+    toon(f"Alarmen ({args.aantal:,} prijzen)", {
+        'Zones / bereikbare toestanden': f"{len(motor.grenzen) + 1} / {len(motor.tabel)}",
+        'Grenzen per toestand (gem.)': round(sum(len(motor.opzoek[t][0]) for t in motor.tabel) / len(motor.tabel), 1),
+        'Lege functie-aanroep (ns, ondergrens)': round(leeg_tijd / args.aantal * 1e9),
+        'If-cascade (ns per meting)': round(oud_tijd / args.aantal * 1e9),
+        'Drempelmotor (ns per meting)': round(nieuw_tijd / args.aantal * 1e9),
+        'Versnelling': f"{oud_tijd / nieuw_tijd:.1f}x",
+    })
+
+# =============================================================================
+# PERSOONLIJKE ALARMEN: INDEX vs. ALLE ABONNEES OVERLOPEN
+# =============================================================================
+
+def bench_abonnees(args):
+    """
+    10, 1.000 en 10.000 abonnees met elk twee alarmen. Per prijs: de index
+    (enkel de grenzen tussen vorige en nieuwe prijs) tegenover alle alarmen
+    overlopen. De index moet exact dezelfde meldingen geven.
+    """
+    from persoonlijke_alarmen import PersoonlijkeAlarmen
+
+    prijzen = synthetische_prijzen(20_000, zaad=2)
+    rng = random.Random(3)
+    resultaten = {}
+    for abonnees in (10, 1_000, 10_000):
+        index = PersoonlijkeAlarmen(marge=10)
+        alarmen = []
+        for chat_id in range(abonnees):
+            for richting in ('onder', 'boven'):
+                grens = float(rng.randrange(-600, 600, 5))
+                index.voeg_toe(chat_id, richting, grens)
+                alarmen.append([chat_id, richting, grens, False])
+
+        def alles_overlopen(prijs):
+            afgegaan = []
+            for alarm in alarmen:
+                _, richting, grens, actief = alarm
+                if richting == 'onder':
+                    nieuw = True if not actief and prijs < grens else False if actief and prijs >= grens + 10 else None
+                else:
+                    nieuw = True if not actief and prijs > grens else False if actief and prijs <= grens - 10 else None
+                if nieuw is not None:
+                    alarm[3] = nieuw
+                    if nieuw:
+                        afgegaan.append(tuple(alarm[:3]))
+            return afgegaan
+
+        start = time.perf_counter()
+        uit_index = [sorted(index.verwerk(prijs)[0]) for prijs in prijzen]
+        index_tijd = time.perf_counter() - start
+
+        start = time.perf_counter()
+        uit_scan = [sorted(alles_overlopen(prijs)) for prijs in prijzen]
+        scan_tijd = time.perf_counter() - start
+
+        assert uit_index == uit_scan, "Index en volledige scan geven andere meldingen"
+        meldingen = sum(map(len, uit_index))
+        resultaten[f"{abonnees:>6} abonnees: index (µs per prijs)"] = round(index_tijd / len(prijzen) * 1e6, 1)
+        resultaten[f"{abonnees:>6} abonnees: alles overlopen (µs per prijs)"] = round(scan_tijd / len(prijzen) * 1e6, 1)
+        resultaten[f"{abonnees:>6} abonnees: meldingen (identiek)"] = f"{meldingen:,}"
+
+    toon(f"Persoonlijke alarmen ({len(prijzen):,} prijzen, 2 alarmen per abonnee)", resultaten)
+
+# =============================================================================
+# REPLAY: DE HELE PIJPLIJN VAN DE BOT OP EEN AFGESPEELDE PRIJSREEKS
+# =============================================================================
+
+class OpnameVerzender:
+    """
+    Neemt de plaats in van de TelegramVerzender: verstuurt niets, maar
+    onthoudt per bericht hoe lang het na het ophalen van de prijs vertrok.
+    """
+
+    def __init__(self, latentie_van):
+        self.latentie_van = latentie_van  # bericht -> seconden sinds de prijs opgehaald werd (of None)
+        self.latenties = []
+        self.berichten = 0
+        self.fotos = 0
+        self.lock = threading.Lock()
+
+    def stuur_bericht(self, bericht, chat_id, retries=3):
+        latentie = self.latentie_van(bericht)
+        with self.lock:
+            self.berichten += 1
+            if latentie is not None:
+                self.latenties.append(latentie)
+        return True
+
+    def stuur_foto(self, foto, chat_id):
+        with self.lock:
+            self.fotos += 1
+        return 'replay-file-id'
+
+    def verdeel(self, chat_ids, taak, omschrijving="Melding"):
+        for chat_id in list(chat_ids):
+            taak(chat_id)
+        return []
+
+    def verdeel_bericht(self, bericht, chat_ids):
+        return self.verdeel(chat_ids, lambda chat_id: self.stuur_bericht(bericht, chat_id))
+
+REPLAY_START = (2024, 5, 1)  # Vaste startdag: elke run speelt dezelfde reeks af
+
+def speel_af(opties, resultaat):
+    """
+    Draait in een vers proces (CPU en RSS zijn dan enkel die van de bot).
+    Start de echte pijplijn (start_pijplijn) met:
+    - een gesimuleerde klok en de reeks rechtstreeks als bron, of (http)
+      een versnelde klok en de EliaClient tegen Fake_API in replay-modus
+    - een tijdelijke database en live buffer
+    - OpnameVerzender in plaats van Telegram
+    Meet prijs -> melding en poll -> SQLite per record, CPU en max RSS.
+    """
+    import re
+    import resource
+
+    os.environ.update({'TELEGRAM_BOT_TOKEN': 'replay', 'TELEGRAM_CHAT_IDS': '1',
+                       'ELIA_API_URL': opties['url'] or 'http://127.0.0.1:9/replay'})
+    import config
+    config.DB_BESTAND = os.path.join(opties['map'], 'replay.db')
+    config.LIVE_BUFFER_PAD = os.path.join(opties['map'], 'replay.ring')
+    config.AANVUL_DAGEN = 0  # Geen echte historiek aanvullen
+    logging.disable(logging.WARNING)
+
+    import database_manager
+    import raspberryonbalansprijs as bot
+    from elia_api import LaatstePrijs
+    from klok import SimulatieKlok, VersneldeKlok
+    from Fake_API import Reeks, PUBLICATIE
+
+    database_manager.init_database()
+    tz = bot.BELGIUM_TZ
+    start = tz.localize(datetime(*REPLAY_START))
+    minuten = opties['dagen'] * 1440
+    eind = start.timestamp() + minuten * 60 + 60 + PUBLICATIE
+
+    # Abonnees met persoonlijke alarmen (elk één 'onder' en één 'boven')
+    rng = random.Random(4)
+    for chat_id in range(100, 100 + opties['abonnees']):
+        bot.persoonlijke_alarmen.voeg_toe(chat_id, 'onder', float(rng.randrange(-600, 100, 5)))
+        bot.persoonlijke_alarmen.voeg_toe(chat_id, 'boven', float(rng.randrange(0, 700, 5)))
+
+    # --- Klok en bron ---
+    wachtrijen = (bot.prijs_wachtrij, bot.meldingen_wachtrij, bot.opslag_wachtrij, bot.live_wachtrij)
+    klaar = threading.Event()
+
+    def leeg():
+        while any(len(wachtrij) for wachtrij in wachtrijen):
+            time.sleep(0.0001)
+
+    def meldingen_bij():
+        """ Een lege wachtrij kan nog een taak in uitvoering hebben: een laatste taak erachter zetten. """
+        leeg()
+        bij = threading.Event()
+        bot.meldingen_wachtrij.zet(lambda: bij.set())
+        bij.wait()
+
+    if opties['url']:
+        klok = VersneldeKlok(start, opties['snelheid'], echte_start=opties['echte_start'])
+        bron = bot.elia.haal_laatste
+    else:
+        def wacht():
+            # Pas verder in de tijd als de pijplijn bij is; aan het einde stopt de poller hier
+            leeg()
+            if klok.tijd() >= eind:
+                klaar.set()
+                threading.Event().wait()
+
+        klok = SimulatieKlok(start, wacht)
+        reeks = Reeks.synthetisch(start, minuten, opties['zaad'])
+        fout_rng = random.Random(5)
+
+        def bron():
+            if opties['vertraging']:
+                time.sleep(opties['vertraging'])
+            if fout_rng.random() < opties['foutkans']:
+                return None, None
+            minuut = (int(klok.tijd()) - 60 - PUBLICATIE) // 60 * 60
+            prijs = reeks.prijs_op(minuut)
+            return (prijs, datetime.fromtimestamp(minuut, tz)) if prijs is not None else (None, None)
+
+    # --- Meetpunten ---
+    opgehaald = {}       # ('JJJJ-MM-DD', 'HH:MM') -> perf_counter toen de poller het record kreeg
+    per_tijd_str = {}    # 'H:MM' (zoals in de meldingen) -> idem, voor het laatste record
+    tellers = {'polls': 0}
+    persist = []
+
+    def gemeten_bron():
+        prijs, timestamp_obj = bron()
+        tellers['polls'] += 1
+        if prijs is not None:
+            sleutel = (timestamp_obj.strftime('%Y-%m-%d'), timestamp_obj.strftime('%H:%M'))
+            if sleutel not in opgehaald:
+                opgehaald[sleutel] = per_tijd_str[f"{timestamp_obj.hour}:{timestamp_obj.minute:02}"] = time.perf_counter()
+        return prijs, timestamp_obj
+
+    def latentie_van(bericht):
+        gevonden = re.search(r"<i>(\d{1,2}:\d\d)</i>", bericht)
+        if not gevonden or 'Server herstart' in bericht or gevonden.group(1) not in per_tijd_str:
+            return None
+        return time.perf_counter() - per_tijd_str[gevonden.group(1)]
+
+    opslaan = database_manager.sla_buffer_en_dag_op
+
+    def gemeten_opslaan(dag_data, minuut_buffer):
+        opslaan(dag_data, minuut_buffer)
+        klaar_op = time.perf_counter()
+        persist.extend(klaar_op - opgehaald[(datum, tijd)] for datum, tijd, _ in minuut_buffer
+                       if (datum, tijd) in opgehaald)
+
+    database_manager.sla_buffer_en_dag_op = gemeten_opslaan
+    bot.gedeelde_prijs = LaatstePrijs(gemeten_bron)
+    bot.verzender = opname = OpnameVerzender(latentie_van)
+
+    # --- Afspelen (het grafiek-proces eerst, zoals in main) ---
+    bot.grafiek_werker.start()
+    bot.grafiek_werker.pool.submit(int).result()
+    cpu_voor = resource.getrusage(resource.RUSAGE_SELF)
+    start_echt = time.perf_counter()
+    bot.start_pijplijn(klok)
+    if opties['url']:
+        while klok.tijd() < eind:
+            time.sleep(0.2)
+    else:
+        klaar.wait()
+    meldingen_bij()
+    duur = time.perf_counter() - start_echt
+    cpu_na = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (cpu_na.ru_utime - cpu_voor.ru_utime) + (cpu_na.ru_stime - cpu_voor.ru_stime)
+
+    opgeslagen = database_manager.verbinding().execute("SELECT COUNT(*) FROM metingen_detail").fetchone()[0]
+    ms = lambda waarden: ' / '.join(str(round(percentiel(waarden, p) * 1000, 2)) for p in (0.5, 0.95, 1.0)) if waarden else '-'
+    resultaat.put({
+        'Afgespeeld': f"{opties['dagen']} dag(en) in {duur:.1f}s ({minuten * 60 / duur:,.0f}x de echte tijd)",
+        'Polls / nieuwe records': f"{tellers['polls']:,} / {len(opgehaald):,}",
+        'Berichten (grafieken)': f"{opname.berichten:,} ({opname.fotos})",
+        'Prijs -> melding p50 / p95 / max (ms)': ms(opname.latenties),
+        'Poll -> SQLite p50 / p95 / max (ms)': ms(persist),
+        'Minuten in de DB (rest in de buffer)': f"{opgeslagen:,} ({len(opgehaald) - opgeslagen})",
+        'CPU (s totaal / per dag)': f"{cpu:.2f} / {cpu / opties['dagen']:.2f}",
+        'Max RSS (MB)': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+    bot.grafiek_werker.pool.shutdown()  # Anders wacht het einde van dit proces op het grafiek-proces
+
+def bench_replay(args):
+    """
+    Speelt een synthetische prijsreeks (--dagen) af door de volledige
+    pijplijn van de bot. Standaard met een gesimuleerde klok: een maand duurt
+    dan enkel zo lang als de verwerking. Met --http loopt alles via Fake_API
+    in replay-modus en een versnelde klok (--snelheid), inclusief de echte
+    EliaClient. --vertraging en --foutkans voegen latentie en fouten toe.
+    """
+    map_ = tempfile.mkdtemp(dir='.')
+    opties = {'map': map_, 'dagen': args.dagen, 'zaad': 1, 'abonnees': args.abonnees,
+              'vertraging': args.vertraging, 'foutkans': args.foutkans,
+              'snelheid': args.snelheid, 'url': None, 'echte_start': None}
+    server = None
+    try:
+        if args.http:
+            import pytz
+            import requests
+            import Fake_API
+            from werkzeug.serving import make_server
+
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            server = make_server('127.0.0.1', 0, Fake_API.app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            basis = f"http://127.0.0.1:{server.server_port}"
+            start = pytz.timezone('Europe/Brussels').localize(datetime(*REPLAY_START))
+            requests.get(f"{basis}/storing", params={'vertraging': args.vertraging, 'foutkans': args.foutkans}).raise_for_status()
+            requests.get(f"{basis}/replay", params={'bron': 'synthetisch', 'dagen': args.dagen, 'zaad': 1,
+                                                    'snelheid': args.snelheid, 'start': start.isoformat()}).raise_for_status()
+            opties.update(url=f"{basis}/testdata", echte_start=Fake_API.replay_klok.echte_start)
+
+        context = multiprocessing.get_context('spawn')
+        resultaat = context.Queue()
+        proces = context.Process(target=speel_af, args=(opties, resultaat))
+        proces.start()
+        resultaten = resultaat.get()
+        proces.join(timeout=10)
+        if proces.is_alive():
+            proces.terminate()
+    finally:
+        if server is not None:
+            server.shutdown()
+        for naam in os.listdir(map_):
+            os.remove(os.path.join(map_, naam))
+        os.rmdir(map_)
+
+    modus = f"http, {args.snelheid:g}x" if args.http else "gesimuleerde klok"
+    toon(f"Replay ({modus}, {args.abonnees} abonnees, vertraging {args.vertraging}s, foutkans {args.foutkans:.0%})",
+         resultaten)
+
+# =============================================================================
+# MAIN
+# =============================================================================
+
+BENCHMARKS = {
+    'live': bench_live,
+    'ring': bench_ring,
+    'db': bench_db,
+    'schema': bench_schema,
+    'historiek': bench_historiek,
+    'web': bench_web,
+    'verbindingen': bench_verbindingen,
+    'opstart': bench_opstart,
+    'drempels': bench_drempels,
+    'abonnees': bench_abonnees,
+    'replay': bench_replay,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks voor de onbalansprijs bot")
+    parser.add_argument('naam', nargs='*', help=f"Welke benchmark(s): {', '.join(BENCHMARKS)} (standaard alle)")
+    parser.add_argument('--aantal', type=int, default=2_000_000, help="Aantal synthetische prijzen voor 'drempels'")
+    parser.add_argument('--dagen', type=int, default=1, help="'replay': aantal dagen om af te spelen")
+    parser.add_argument('--abonnees', type=int, default=100, help="'replay': abonnees met persoonlijke alarmen")
+    parser.add_argument('--vertraging', type=float, default=0.0, help="'replay': extra latentie per poll (s)")
+    parser.add_argument('--foutkans', type=float, default=0.0, help="'replay': kans (0..1) dat een poll faalt")
+    parser.add_argument('--http', action='store_true', help="'replay': via Fake_API en de EliaClient (versnelde klok)")
+    parser.add_argument('--snelheid', type=float, default=1440, help="'replay --http': zoveel keer sneller dan de echte tijd")
+    args = parser.parse_args()
+
+    onbekend = [naam for naam in args.naam if naam not in BENCHMARKS]
+    if onbekend:
+        parser.error(f"Onbekende benchmark: {', '.join(onbekend)}")
+
+    for naam in args.naam or BENCHMARKS:
+        BENCHMARKS[naam](args)
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
@@ -0,0 +1,132 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+import metrieken
+from telegram_verzender import TokenBucket
+
+COMMANDO_WACHTTIJD = metrieken.histogram('commando_wachttijd_seconds', "Tijd tussen ontvangen en starten van een commando")
+COMMANDO_DUUR = metrieken.histogram('commando_duur_seconds', "Tijd tussen ontvangen en klaar van een commando", ('commando',))
+COMMANDO_GEWEIGERD = metrieken.teller('commando_geweigerd_total', "Genegeerde commando's (te veel van één chat)")
+
+# =============================================================================
+# COMMANDO VERDELER (WERKERPOOL MET VOLGORDE PER CHAT)
+# =============================================================================
+
+class CommandoVerdeler:
+    """
+    Voert Telegram-commando's uit in een werkerpool, zodat één traag commando
+    (bv. /price met retries naar Elia) de andere gebruikers niet laat wachten.
+
+    - Per chat blijft de volgorde behouden: een chat heeft hoogstens één
+      commando tegelijk in uitvoering, de volgende wachten in een eigen rij.
+    - Per chat is er een token bucket: wie commando's blijft spammen, wordt
+      (tijdelijk) genegeerd in plaats van de pool te bezetten.
+    """
+
+    def __init__(self, werkers=None):
+        self.pool = ThreadPoolExecutor(max_workers=werkers or config.COMMANDO_WERKERS, thread_name_prefix="commando")
+        self.lock = threading.Lock()
+        self.wachtend = {}   # chat_id -> deque van (naam, functie, ontvangen); aanwezig = er loopt er één
+        self.buckets = {}    # chat_id -> TokenBucket (weg zodra de chat stil is en de bucket weer vol)
+        self.opruim_grens = config.COMMANDO_CHAT_BUCKETS
+
+        # Tellers en recente latenties (ontvangen -> klaar, in seconden)
+        self.diepte = 0      # Wachtend + in uitvoering
+        self.uitgevoerd = 0
+        self.geweigerd = 0
+        self.fouten = 0
+        self.latenties = deque(maxlen=1000)
+
+    def _bucket_voor(self, chat_id):
+        bucket = self.buckets.get(chat_id)
+        if bucket is None:
+            if len(self.buckets) >= self.opruim_grens:
+                self._ruim_buckets_op()
+            bucket = TokenBucket(config.COMMANDO_PER_CHAT_MINUUT / 60, config.COMMANDO_BURST)
+            self.buckets[chat_id] = bucket
+        return bucket
+
+    def _ruim_buckets_op(self):
+        """
+        Buckets van chats zonder wachtende commando's die weer vol zijn (die
+        bij hun laatste commando nog niet vol waren). Een volle bucket weggooien
+        verandert niets: een nieuwe is ook vol. Gemiddeld O(1) per nieuwe chat.
+        """
+        for chat_id in [c for c, bucket in self.buckets.items() if c not in self.wachtend and bucket.is_vol()]:
+            del self.buckets[chat_id]
+        self.opruim_grens = max(config.COMMANDO_CHAT_BUCKETS, 2 * len(self.buckets))
+
+    def voeg_toe(self, chat_id, naam, functie):
+        """
+        Plant functie(chat_id) in (niet blokkerend). Geeft False terug als het
+        commando genegeerd wordt (te veel commando's van deze chat).
+        """
+        ontvangen = time.monotonic()
+        with self.lock:
+            rij = self.wachtend.get(chat_id)
+            if (rij is not None and len(rij) >= config.COMMANDO_MAX_WACHTEND) or not self._bucket_voor(chat_id).probeer():
+                self.geweigerd += 1
+                COMMANDO_GEWEIGERD.verhoog()
+                logging.warning(f"🚦 Commando {naam} van {chat_id} genegeerd (te veel commando's)")
+                return False
+
+            self.diepte += 1
+            if rij is not None:
+                rij.append((naam, functie, ontvangen))
+                return True
+            self.wachtend[chat_id] = deque()
+
+        self.pool.submit(self._voer_uit, chat_id, naam, functie, ontvangen)
+        return True
+
+    def _voer_uit(self, chat_id, naam, functie, ontvangen):
+        """ Voert de commando's van één chat na elkaar uit, tot zijn rij leeg is. """
+        while True:
+            COMMANDO_WACHTTIJD.observeer(time.monotonic() - ontvangen)
+            try:
+                functie(chat_id)
+                fout = False
+            except Exception as e:
+                logging.error(f"❌ Fout in commando {naam} van {chat_id}: {e}")
+                fout = True
+
+            duur = time.monotonic() - ontvangen
+            COMMANDO_DUUR.observeer(duur, commando=naam)
+            with self.lock:
+                self.latenties.append(duur)
+                self.diepte -= 1
+                self.uitgevoerd += 1
+                self.fouten += fout
+                rij = self.wachtend[chat_id]
+                if not rij:
+                    del self.wachtend[chat_id]
+                    # Rij leeg: de bucket mag ook weg, tenzij die de chat nog afremt (dan later)
+                    bucket = self.buckets.get(chat_id)
+                    if bucket is not None and bucket.is_vol():
+                        del self.buckets[chat_id]
+                    return
+                naam, functie, ontvangen = rij.popleft()
+
+    def tellers(self):
+        """ Wachtrij-diepte, aantallen en latenties (in milliseconden) voor /status. """
+        with self.lock:
+            waarden = sorted(self.latenties)
+            resultaat = {
+                'wachtrij': self.diepte,
+                'chats_actief': len(self.wachtend),
+                'uitgevoerd': self.uitgevoerd,
+                'geweigerd': self.geweigerd,
+                'fouten': self.fouten,
+            }
+        if waarden:
+            n = len(waarden)
+            resultaat.update({
+                'p50_ms': round(waarden[n // 2] * 1000),
+                'p95_ms': round(waarden[min(n - 1, int(n * 0.95))] * 1000),
+                'max_ms': round(waarden[-1] * 1000),
+            })
+        return resultaat
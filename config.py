@@ -5,6 +5,12 @@
 # --- DATABASE ---
 DB_BESTAND = 'onbalans_historiek.db'
 AANTAL_DAGEN_BEWAREN = 30  # Hoe lang bewaren we de minuut-details?
+DB_CACHE_KB = 8192                # SQLite page cache per verbinding (KB)
+DB_MMAP_BYTES = 64 * 1024 * 1024  # Zoveel van het DB-bestand mag SQLite in het geheugen mappen
+DB_LEES_VERBINDINGEN = 4          # Webserver: max. open read-only verbindingen, gedeeld door alle verzoeken (0 = 1 per thread)
+OPRUIM_INTERVAL = 6 * 3600        # Om de hoeveel seconden oude minuut-details samenvatten en opruimen
+OPRUIM_PAUZE = 0.05               # Pauze tussen twee batches (1 dag per batch), zodat niemand moet wachten
+OPRUIM_VACUUM_PAGINAS = 256       # Zoveel vrije pagina's per stap teruggeven aan de SD-kaart
 
 # --- GRENZEN VOOR ALARMEN (in €/MWh) ---
 GRENS_EXTREEM_LAAG = -500
@@ -17,4 +23,71 @@ GRENS_ZEER_HOOG    = 500
 
 # --- TELLERS ---
 # Boven welke prijs tellen we het als "Duur"?
-GRENS_DUUR = 100
\ No newline at end of file
+GRENS_DUUR = 100
+
+# --- TELEGRAM VERZENDING ---
+# Telegram staat ongeveer 30 berichten per seconde toe over alle chats heen,
+# en 1 bericht per seconde binnen dezelfde chat.
+TELEGRAM_WERKERS = 16              # Aantal berichten dat tegelijk onderweg mag zijn
+TELEGRAM_MAX_PER_SECONDE = 30      # Globale limiet (token bucket)
+TELEGRAM_MAX_PER_CHAT_SECONDE = 1  # Limiet per chat (token bucket)
+TELEGRAM_CHAT_BUCKETS = 1000       # Vanaf zoveel chats ruimen we de buckets van stille chats op
+
+# --- TELEGRAM COMMANDO'S ---
+# Commando's draaien in een eigen werkerpool: per chat in volgorde, chats onderling tegelijk.
+COMMANDO_WERKERS = 8               # Aantal commando's dat tegelijk mag lopen
+COMMANDO_PER_CHAT_MINUUT = 20      # Max. commando's per chat per minuut (token bucket) ...
+COMMANDO_BURST = 5                 # ... met een korte piek van zoveel commando's na elkaar
+COMMANDO_MAX_WACHTEND = 5          # Max. wachtende commando's per chat (de rest wordt genegeerd)
+COMMANDO_CHAT_BUCKETS = 1000       # Vanaf zoveel chats ruimen we de buckets van stille chats op
+
+# --- PERSOONLIJKE ALARMEN (/alarm) ---
+ALARM_MARGE = 10        # Hysteresis (€/MWh): een alarm gaat pas opnieuw af na zoveel herstel
+ALARM_MAX_PER_CHAT = 10 # Max. aantal persoonlijke alarmen per chat
+
+# --- ELIA API ---
+ELIA_STATS_INTERVAL = 240  # Om de hoeveel aanroepen loggen we de polling-statistieken (~1 uur)
+
+# --- POLL PLANNING ---
+# De poller leert wanneer in de minuut Elia een nieuwe waarde publiceert,
+# en pollt enkel snel rond dat moment.
+POLL_SNEL = 2            # Seconden tussen polls binnen het publicatievenster
+POLL_VENSTER_VOOR = 3    # Zoveel seconden VOOR het verwachte moment beginnen we
+POLL_VENSTER_NA = 20     # Zolang blijven we snel pollen als het record nog niet binnen is
+POLL_TRAAG = 10          # Daarna (record is laat): rustiger verder pollen
+POLL_OPSTART = 5         # Zolang er nog niets geleerd is
+ELIA_POLL_BUDGET = 8         # Maximale tijd (s) voor één poll, alle pogingen samen
+ELIA_RETRY_PAUZE = 1         # Pauze (s) tussen twee pogingen binnen dezelfde poll
+ELIA_HEDGE = True            # Tweede request sturen als het eerste trager is dan de p95
+ELIA_BREKER_DREMPEL = 3      # Na zoveel mislukte polls op rij: stroomonderbreker open
+ELIA_BREKER_WACHTTIJD = 30   # Om de hoeveel seconden testen we of Elia terug is
+PRIJS_MAX_LEEFTIJD = 90      # /price: zo oud (s) mag de laatste poll zijn, anders halen we zelf op
+
+# --- LIVE BUFFER (WEBSITE) ---
+LIVE_BUFFER_CAPACITEIT = 2048  # Aantal minuut-records in de ring (> 1 dag)
+LIVE_BUFFER_PAD = None         # None = /dev/shm/energy_live.ring (of energy_live.ring zonder /dev/shm)
+
+# --- LIVE STREAM (WEBSITE, SERVER-SENT EVENTS) ---
+SSE_INTERVAL = 0.5   # Om de hoeveel seconden de webserver naar nieuwe records in de ring kijkt
+SSE_PING = 15        # Stilte-bericht om verbindingen (en proxies) wakker te houden, in seconden
+SSE_WACHTRIJ = 100   # Max. aantal wachtende events per verbinding (trage kijker: oudste eruit)
+
+# --- WEBSITE CACHE ---
+WEB_CACHE_GROOTTE = 256        # Max. aantal gecachete pagina's/antwoorden (LRU)
+WEB_CACHE_MAX_AGE = 3600       # Browsercache (s) voor dagen/maanden/jaren die vóór gisteren afgesloten zijn
+
+# --- GRAFIEKEN (APART WERKERPROCES) ---
+GRAFIEK_TIMEOUT = 60  # Max. wachttijd (s) op een grafiek van het werkerproces
+
+# --- AANVULLEN (GATEN UIT DE ELIA-HISTORIEK) ---
+# Minuten die we gemist hebben (bot uit, Elia onbereikbaar) halen we achteraf op.
+AANVUL_DAGEN = AANTAL_DAGEN_BEWAREN  # Zoveel dagen terug kijken (vandaag inbegrepen)
+AANVUL_PAGINA = 100        # Records per aanroep (het maximum van de Elia API)
+AANVUL_WERKERS = 3         # Zoveel aanroepen tegelijk
+AANVUL_PER_SECONDE = 2     # Max. aanroepen per seconde (token bucket), de live poller gaat voor
+AANVUL_MARGE = 5           # Nog geen minuut van vandaag gekend: de laatste zoveel minuten laten we aan de live poller
+AANVUL_INTERVAL = 3600     # Ook zonder gat om de zoveel seconden eens kijken (laat gepubliceerde minuten)
+
+# --- METRIEKEN (PROMETHEUS-FORMAAT) ---
+METRIEKEN_POORT = 9101         # /metrics van de bot op deze poort (None = uit); de website heeft een eigen /metrics
+METRIEKEN_ADRES = '127.0.0.1'  # Enkel lokaal; '0.0.0.0' als Prometheus op een andere machine draait
@@ -0,0 +1,51 @@
+from array import array
+
+class DagReeks:
+    """
+    Compacte tijdreeks van één dag: de prijzen in een array('d') (8 bytes per
+    meting) en het tijdstip als 'minuut van de dag' in een array('H') (2 bytes).
+    Geen losse float- en datetime-objecten meer per minuut.
+    """
+
+    def __init__(self, datum=None, minuten=None, prijzen=None):
+        self.datum = datum  # datetime.date van deze reeks
+        self.minuten = minuten if minuten is not None else array('H')
+        self.prijzen = prijzen if prijzen is not None else array('d')
+
+    # --- Omzetten naar tekst ---
+
+    @staticmethod
+    def tijd_str(minuut):
+        """ Minuut van de dag -> 'HH:MM'. """
+        return f"{minuut // 60:02}:{minuut % 60:02}"
+
+    # --- Vullen ---
+
+    def voeg_toe(self, minuut, prijs):
+        self.minuten.append(minuut)
+        self.prijzen.append(prijs)
+
+    # --- Lezen ---
+
+    def __len__(self):
+        return len(self.prijzen)
+
+    def __iter__(self):
+        """ Geeft (minuut, prijs) paren. """
+        return zip(self.minuten, self.prijzen)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return DagReeks(self.datum, self.minuten[index], self.prijzen[index])
+        return self.minuten[index], self.prijzen[index]
+
+    def kwartier_punten(self):
+        """
+        Alleen de settlement-punten (xx:14, xx:29, xx:44, xx:59).
+        Staat dezelfde minuut er dubbel in, dan telt de laatste waarde.
+        """
+        unieke_punten = {}
+        for minuut, prijs in self:
+            if minuut % 15 == 14:
+                unieke_punten[minuut] = prijs
+        return DagReeks(self.datum, array('H', unieke_punten.keys()), array('d', unieke_punten.values()))
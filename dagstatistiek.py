@@ -0,0 +1,105 @@
+import heapq
+import threading
+
+import config
+
+class DagStatistiek:
+    """
+    Lopende statistieken van één dag, bijgewerkt bij elke nieuwe minuutmeting.
+    Opvragen van min/max/gemiddelde/mediaan kost daardoor geen herberekening
+    over alle metingen van de dag.
+
+    De mediaan houden we bij met twee heaps:
+    - 'lage_helft' is een max-heap (negatieve waardes) met de kleinste helft
+    - 'hoge_helft' is een min-heap met de grootste helft
+
+    De evaluatie-stap schrijft, de commando's lezen: voeg_toe en
+    momentopname nemen hetzelfde lock, zodat een lezer nooit een half
+    bijgewerkte meting ziet.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.aantal = 0
+            self.som = 0.0
+            self.laagste = None
+            self.hoogste = None
+            self.tijd_laag = None
+            self.tijd_hoog = None
+            self.aantal_negatief = 0
+            self.aantal_duur = 0
+            self.lage_helft = []
+            self.hoge_helft = []
+
+    def voeg_toe(self, prijs, tijd_str):
+        """ Verwerkt één minuutmeting (tijd_str = 'HH:MM'). O(log n). """
+        with self.lock:
+            self.aantal += 1
+            self.som += prijs
+
+            # Bij gelijke waardes blijft het EERSTE tijdstip staan
+            if self.laagste is None or prijs < self.laagste:
+                self.laagste, self.tijd_laag = prijs, tijd_str
+            if self.hoogste is None or prijs > self.hoogste:
+                self.hoogste, self.tijd_hoog = prijs, tijd_str
+
+            if prijs < config.GRENS_NEGATIEF: self.aantal_negatief += 1
+            if prijs > config.GRENS_DUUR: self.aantal_duur += 1
+
+            # Mediaan: eerst in de lage helft, grootste daarvan naar de hoge helft,
+            # en daarna de helften weer in evenwicht brengen.
+            heapq.heappush(self.lage_helft, -prijs)
+            heapq.heappush(self.hoge_helft, -heapq.heappop(self.lage_helft))
+            if len(self.hoge_helft) > len(self.lage_helft):
+                heapq.heappush(self.lage_helft, -heapq.heappop(self.hoge_helft))
+
+    def momentopname(self):
+        """
+        (aantal, laagste, hoogste, gemiddelde, aantal_negatief, aantal_duur)
+        van één en dezelfde toestand, voor lezers in een andere thread.
+        """
+        with self.lock:
+            return (self.aantal, self.laagste, self.hoogste, self.gemiddelde,
+                    self.aantal_negatief, self.aantal_duur)
+
+    @property
+    def gemiddelde(self):
+        return self.som / self.aantal if self.aantal else None
+
+    @property
+    def mediaan(self):
+        if not self.aantal:
+            return None
+        if len(self.lage_helft) > len(self.hoge_helft):
+            return -self.lage_helft[0]
+        return (-self.lage_helft[0] + self.hoge_helft[0]) / 2
+
+    def dag_data(self, datum_str):
+        """ Afgeronde samenvatting in het formaat van de tabel dagstatistieken. """
+        return {
+            'datum': datum_str,
+            'laagste': round(self.laagste), 'hoogste': round(self.hoogste),
+            'gemiddelde': round(self.gemiddelde), 'mediaan': round(self.mediaan),
+            'aantal': self.aantal,
+            'aantal_negatief': self.aantal_negatief,
+            'aantal_duur': self.aantal_duur,
+            'tijd_laag': self.tijd_laag, 'tijd_hoog': self.tijd_hoog
+        }
+
+    def als_dict(self):
+        """ Onafgeronde waardes (voor de website). """
+        return {
+            'aantal': self.aantal,
+            'gem': self.gemiddelde,
+            'min': self.laagste,
+            'max': self.hoogste,
+            'mediaan': self.mediaan,
+            'tijd_laag': self.tijd_laag,
+            'tijd_hoog': self.tijd_hoog,
+            'aantal_negatief': self.aantal_negatief,
+            'aantal_duur': self.aantal_duur,
+        }
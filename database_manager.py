@@ -1,12 +1,232 @@
+import os
+import time
+import queue
 import sqlite3
 import logging
+import threading
 from datetime import datetime, timedelta
+import pytz
 import config
+from dagstatistiek import DagStatistiek
+
+# =============================================================================
+# VERBINDINGEN (1 per thread of uit de leespool, blijven open)
+# =============================================================================
+
+_lokaal = threading.local()
+_alleen_lezen = False
+
+BELGIUM_TZ = pytz.timezone('Europe/Brussels')  # Dagen in de database zijn Belgische dagen (zoals in de bot)
+
+def zet_alleen_lezen(aan=True):
+    """
+    Zet dit proces in lees-modus (bv. de webserver): alle verbindingen worden
+    dan read-only geopend en kunnen de database nooit vergrendelen.
+    """
+    global _alleen_lezen
+    _alleen_lezen = aan
+
+def verbinding(alleen_lezen=None):
+    """
+    Geeft de (langlevende) verbinding van de huidige thread terug.
+    'alleen_lezen' = None volgt de instelling van het proces (zie zet_alleen_lezen).
+    - WAL-modus: lezers en de schrijver blokkeren elkaar niet meer
+    - synchronous=NORMAL: veilig in WAL-modus en veel minder fsyncs op de SD-kaart
+    - grotere page cache + mmap voor snellere leesopdrachten
+    - sqlite3 bewaart de voorbereide (prepared) statements per verbinding,
+      dus doordat de verbinding open blijft worden die ook hergebruikt
+    """
+    if alleen_lezen is None:
+        alleen_lezen = _alleen_lezen
+    if alleen_lezen and getattr(_lokaal, 'lenen', False):
+        # Binnen een webverzoek: een verbinding uit de leespool (bij de eerste query)
+        if getattr(_lokaal, 'geleend', None) is None:
+            _lokaal.geleend = lees_pool.neem()
+        return _lokaal.geleend
+    sleutel = 'conn_lezen' if alleen_lezen else 'conn'
+    conn = getattr(_lokaal, sleutel, None)
+    if conn is not None:
+        return conn
+
+    conn = _open_verbinding(alleen_lezen)
+    setattr(_lokaal, sleutel, conn)
+    return conn
+
+def _open_verbinding(alleen_lezen, gedeeld=False):
+    """ Nieuwe verbinding met onze PRAGMA's. 'gedeeld': mag van thread wisselen (leespool). """
+    if alleen_lezen:
+        conn = sqlite3.connect(f"file:{config.DB_BESTAND}?mode=ro", uri=True,
+                               timeout=10, cached_statements=64, check_same_thread=not gedeeld)
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(config.DB_BESTAND, timeout=10, cached_statements=64)
+        # Vóór WAL en vóór de eerste tabel: enkel dan geldt het meteen voor een nieuw bestand
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+    conn.execute(f"PRAGMA cache_size = -{config.DB_CACHE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {config.DB_MMAP_BYTES}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+class LeesPool:
+    """
+    Een klein aantal read-only verbindingen die verzoeken lenen en teruggeven.
+    De webserver maakt per verzoek een nieuwe thread (of greenlet): met één
+    verbinding per thread zou elk verzoek een verse verbinding openen (en zijn
+    page cache en voorbereide statements weggooien). Zo blijven er hoogstens
+    'grootte' verbindingen open, die steeds opnieuw gebruikt worden.
+    """
+
+    def __init__(self, grootte=None):
+        self.grootte = config.DB_LEES_VERBINDINGEN if grootte is None else grootte
+        self.vrij = queue.LifoQueue()  # Laatst teruggegeven eerst: die heeft de warmste cache
+        self.lock = threading.Lock()
+        self.geopend = 0
+        self.uitleningen = 0
+
+    def neem(self, timeout=10):
+        """ Een vrije verbinding, een nieuwe (onder 'grootte'), of wachten tot er een vrijkomt. """
+        with self.lock:
+            self.uitleningen += 1
+            try:
+                return self.vrij.get_nowait()
+            except queue.Empty:
+                nieuw = self.geopend < self.grootte
+                if nieuw:
+                    self.geopend += 1
+        if nieuw:
+            try:
+                return _open_verbinding(alleen_lezen=True, gedeeld=True)
+            except sqlite3.Error:
+                with self.lock:
+                    self.geopend -= 1
+                raise
+        try:
+            return self.vrij.get(timeout=timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Geen vrije leesverbinding na {timeout}s") from None
+
+    def geef(self, conn):
+        self.vrij.put(conn)
+
+    def sluit(self):
+        """ Sluit de vrije verbindingen (bv. als DB_BESTAND gewijzigd is). """
+        with self.lock:
+            while True:
+                try:
+                    self.vrij.get_nowait().close()
+                except queue.Empty:
+                    break
+                self.geopend -= 1
+
+    def tellers(self):
+        with self.lock:
+            return {'geopend': self.geopend, 'vrij': self.vrij.qsize(), 'uitleningen': self.uitleningen}
+
+lees_pool = LeesPool()
+
+def leen_verbinding():
+    """
+    Vanaf nu (bv. voor één webverzoek) leent verbinding() in deze thread een
+    verbinding uit de leespool, pas bij de eerste query. Verzoeken zonder
+    database (statische bestanden, de live stream) houden er zo geen bezet.
+    """
+    _lokaal.lenen = lees_pool.grootte > 0  # 0 = geen pool (één verbinding per thread)
+
+def geef_verbinding_terug():
+    """ Einde van het verzoek: de geleende verbinding (als die er is) terug in de pool. """
+    _lokaal.lenen = False
+    conn = getattr(_lokaal, 'geleend', None)
+    if conn is not None:
+        _lokaal.geleend = None
+        lees_pool.geef(conn)
+
+def sluit_verbinding():
+    """ Sluit de verbinding(en) van de huidige thread (bv. bij afsluiten). """
+    for sleutel in ('conn', 'conn_lezen'):
+        conn = getattr(_lokaal, sleutel, None)
+        if conn is not None:
+            conn.close()
+            setattr(_lokaal, sleutel, None)
+
+# =============================================================================
+# SLEUTELS VAN METINGEN_DETAIL
+# =============================================================================
+#
+# Een minuut-meting heeft als sleutel (dag, minuut):
+#   dag    = datum als getal JJJJMMDD (zelfde vorm als in de live buffer)
+#   minuut = minuut van de dag (0..1439)
+# De tabel is WITHOUT ROWID: de rijen staan fysiek gesorteerd op die sleutel,
+# dus een dag of een maand opvragen is één aaneengesloten stuk van de B-tree.
+
+def dag_van(datum_str):
+    """ '2024-05-01' -> 20240501 """
+    return int(datum_str.replace('-', ''))
+
+def minuut_van(tijd_str):
+    """ 'HH:MM' -> minuut van de dag """
+    u, m = tijd_str.split(':')
+    return int(u) * 60 + int(m)
+
+# =============================================================================
+# SCHRIJVEN (BOT)
+# =============================================================================
+
+METINGEN_DETAIL_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS metingen_detail (
+        dag INTEGER NOT NULL,
+        minuut INTEGER NOT NULL,
+        waarde REAL NOT NULL,
+        PRIMARY KEY (dag, minuut)
+    ) WITHOUT ROWID
+'''
+
+METINGEN_KWARTIER_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS metingen_kwartier (
+        dag INTEGER NOT NULL,
+        kwartier INTEGER NOT NULL,
+        open REAL,
+        laagste REAL,
+        hoogste REAL,
+        gemiddelde REAL,
+        settlement REAL,
+        aantal INTEGER,
+        PRIMARY KEY (dag, kwartier)
+    ) WITHOUT ROWID
+'''
+
+# Maand- en jaartotalen (worden bijgewerkt bij elke schrijfactie van een dag)
+AGGREGAAT_KOLOMMEN = '''
+        aantal_dagen INTEGER,
+        som_gemiddelde REAL,
+        laagste REAL,
+        hoogste REAL,
+        som_negatief INTEGER,
+        som_duur INTEGER,
+        aantal INTEGER
+'''
+
+ALARMEN_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS alarmen (
+        chat_id INTEGER,
+        richting TEXT,            -- 'onder' of 'boven'
+        grens REAL,
+        actief INTEGER DEFAULT 0, -- 1 = afgegaan, wacht op herstel (hysteresis)
+        PRIMARY KEY (chat_id, richting, grens)
+    ) WITHOUT ROWID
+'''
 
 def init_database():
     try:
-        conn = sqlite3.connect(config.DB_BESTAND)
+        conn = verbinding()
         c = conn.cursor()
+
+        # Vrijgekomen ruimte (na opruimen) stapsgewijs kunnen teruggeven. Een nieuw
+        # bestand krijgt dat al in verbinding(); een oud bestand (van vóór
+        # auto_vacuum) vraagt één keer een VACUUM.
+        vacuum_nodig = c.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
         
         # Tabel 1: Dagstatistieken (1 rij per dag)
         c.execute('''
@@ -24,69 +244,322 @@ def init_database():
             )
         ''')
 
-        # Tabel 2: Detail metingen (elke minuut een rij)
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS metingen_detail (
-                datum TEXT,
-                tijd TEXT,
-                waarde REAL
-            )
-        ''')
-        
-        c.execute('CREATE INDEX IF NOT EXISTS idx_detail_datum ON metingen_detail (datum)')
-        
+        # Tabel 2: Detail metingen (elke minuut een rij, sleutel = dag + minuut)
+        kolommen = [rij[1] for rij in c.execute("PRAGMA table_info(metingen_detail)")]
+        if 'tijd' in kolommen:
+            conn.commit()
+            migreer_metingen_detail(conn)  # Doet zelf een VACUUM
+            vacuum_nodig = False
+        else:
+            c.execute(METINGEN_DETAIL_SCHEMA)
+
+        # Tabel 3: Kwartier-samenvattingen van minuut-details ouder dan AANTAL_DAGEN_BEWAREN
+        c.execute(METINGEN_KWARTIER_SCHEMA)
+
+        # Tabel 4 en 5: Maand- en jaartotalen (voor /maand en /jaar)
+        c.execute(f"CREATE TABLE IF NOT EXISTS maandstatistieken (maand TEXT PRIMARY KEY, {AGGREGAAT_KOLOMMEN}) WITHOUT ROWID")
+        c.execute(f"CREATE TABLE IF NOT EXISTS jaarstatistieken (jaar TEXT PRIMARY KEY, {AGGREGAAT_KOLOMMEN}) WITHOUT ROWID")
+
+        # Tabel 6: Persoonlijke alarmen van de abonnees (+ of ze nu afgegaan zijn)
+        c.execute(ALARMEN_SCHEMA)
+        if (c.execute("SELECT 1 FROM dagstatistieken LIMIT 1").fetchone()
+                and not c.execute("SELECT 1 FROM maandstatistieken LIMIT 1").fetchone()):
+            # Eenmalig: de totalen opbouwen uit de bestaande dagstatistieken
+            maanden = [rij[0] for rij in c.execute("SELECT DISTINCT substr(datum, 1, 7) FROM dagstatistieken")]
+            for maand in maanden:
+                werk_totalen_bij(conn, maand + '-01')
+            logging.info(f"📊 Maand- en jaartotalen opgebouwd ({len(maanden)} maanden).")
+
         conn.commit()
-        conn.close()
+        if vacuum_nodig:
+            logging.info("🛠️ Database wordt één keer herschikt (incrementeel vacuum aanzetten)...")
+            conn.execute("VACUUM")
         logging.info("📚 Database tabellen gecontroleerd.")
     except Exception as e:
         logging.error(f"❌ Fout bij init DB: {e}")
 
+def migreer_metingen_detail(conn):
+    """
+    Eenmalige omzetting van het oude schema (datum TEXT, tijd TEXT, waarde)
+    naar het compacte schema. Dubbele minuten verdwijnen: de laatst
+    ingevoegde waarde wint. Daarna wordt het bestand gecomprimeerd (VACUUM).
+    """
+    start = time.monotonic()
+    grootte_voor = os.path.getsize(config.DB_BESTAND)
+    logging.info("🛠️ metingen_detail wordt omgezet naar het nieuwe schema...")
+
+    conn.execute("BEGIN")
+    try:
+        conn.execute("ALTER TABLE metingen_detail RENAME TO metingen_detail_oud")
+        conn.execute("DROP INDEX IF EXISTS idx_detail_datum")
+        conn.execute(METINGEN_DETAIL_SCHEMA)
+        conn.execute('''
+            INSERT INTO metingen_detail (dag, minuut, waarde)
+            SELECT CAST(replace(datum, '-', '') AS INTEGER),
+                   CAST(substr(tijd, 1, 2) AS INTEGER) * 60 + CAST(substr(tijd, 4, 2) AS INTEGER),
+                   waarde
+            FROM metingen_detail_oud WHERE waarde IS NOT NULL ORDER BY rowid
+            ON CONFLICT (dag, minuut) DO UPDATE SET waarde = excluded.waarde
+        ''')
+        conn.execute("DROP TABLE metingen_detail_oud")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    aantal = conn.execute("SELECT COUNT(*) FROM metingen_detail").fetchone()[0]
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    grootte_na = os.path.getsize(config.DB_BESTAND)
+    logging.info(f"✅ Migratie klaar: {aantal} metingen, {grootte_voor / 1e6:.1f} MB -> "
+                 f"{grootte_na / 1e6:.1f} MB in {time.monotonic() - start:.1f}s.")
+
 def sla_buffer_en_dag_op(dag_data, minuut_buffer):
     """ 
     Deze functie doet het zware werk elke 15 minuten.
     1. Hij schrijft de buffer (lijst met minuutwaardes) weg in metingen_detail.
     2. Hij update de dagstatistieken.
     """
+    conn = None
     try:
-        conn = sqlite3.connect(config.DB_BESTAND)
+        conn = verbinding()
         c = conn.cursor()
         
         # 1. Bulk insert van de buffer (de losse minuten)
         # minuut_buffer is een lijst van tuples: [('2023-10-27', '14:00', 50.5), ('2023-10-27', '14:01', 52.0), ...]
+        # Staat een minuut er al (herstart, dubbele flush), dan wordt ze overschreven.
         if minuut_buffer:
-            c.executemany('INSERT INTO metingen_detail (datum, tijd, waarde) VALUES (?, ?, ?)', minuut_buffer)
+            c.executemany('''
+                INSERT INTO metingen_detail (dag, minuut, waarde) VALUES (?, ?, ?)
+                ON CONFLICT (dag, minuut) DO UPDATE SET waarde = excluded.waarde
+            ''', [(dag_van(datum), minuut_van(tijd), waarde) for datum, tijd, waarde in minuut_buffer])
 
         # 2. Update de dagstatistieken (de samenvatting)
-        # We pakken de waardes uit de dictionary 'dag_data'
-        c.execute('''
-            INSERT OR REPLACE INTO dagstatistieken 
-            (datum, laagste, hoogste, gemiddelde, mediaan, aantal, aantal_negatief, aantal_duur, tijdstip_laagste, tijdstip_hoogste)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            dag_data['datum'], dag_data['laagste'], dag_data['hoogste'], 
-            dag_data['gemiddelde'], dag_data['mediaan'], dag_data['aantal'], 
-            dag_data['aantal_negatief'], dag_data['aantal_duur'], 
-            dag_data['tijd_laag'], dag_data['tijd_hoog']
-        ))
+        schrijf_dagstatistieken(c, dag_data)
         
+        # 3. Maand- en jaartotalen van deze dag bijwerken
+        werk_totalen_bij(conn, dag_data['datum'])
+
         conn.commit()
-        conn.close()
         logging.info(f"💾 Opslag gereed: {len(minuut_buffer)} minuut-regels weggeschreven & dagstats geüpdatet.")
     except Exception as e:
+        if conn is not None:
+            conn.rollback()
         logging.error(f"❌ Fout bij opslaan database: {e}")
 
-def haal_vandaag_op(datum_str):
+def schrijf_dagstatistieken(c, dag_data):
+    """ Eén rij in dagstatistieken (uit de dictionary 'dag_data'). Zelf geen commit. """
+    c.execute('''
+        INSERT OR REPLACE INTO dagstatistieken 
+        (datum, laagste, hoogste, gemiddelde, mediaan, aantal, aantal_negatief, aantal_duur, tijdstip_laagste, tijdstip_hoogste)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        dag_data['datum'], dag_data['laagste'], dag_data['hoogste'], 
+        dag_data['gemiddelde'], dag_data['mediaan'], dag_data['aantal'], 
+        dag_data['aantal_negatief'], dag_data['aantal_duur'], 
+        dag_data['tijd_laag'], dag_data['tijd_hoog']
+    ))
+
+def vul_dag_aan(datum_str, minuten):
     """
-    Wordt gebruikt bij OPSTARTEN.
-    Haalt alle minuut-metingen van vandaag op uit de DB om het geheugen te herstellen.
+    Aangevulde minuten van een AFGELOPEN dag wegschrijven (vandaag loopt via
+    het geheugen van de bot). minuten = [(minuut van de dag, waarde), ...].
+    Bestaande minuten blijven staan; de dagstatistieken en totalen worden
+    daarna herberekend uit alle minuten van die dag. Eén transactie.
+    Geeft het aantal nieuwe minuten terug.
     """
+    conn = None
     try:
-        conn = sqlite3.connect(config.DB_BESTAND)
+        conn = verbinding()
         c = conn.cursor()
-        c.execute("SELECT tijd, waarde FROM metingen_detail WHERE datum = ? ORDER BY tijd ASC", (datum_str,))
-        rijen = c.fetchall() # Geeft lijst terug: [('00:01', 50.0), ('00:02', 51.0)...]
-        conn.close()
-        return rijen
+        dag = dag_van(datum_str)
+        c.executemany('''
+            INSERT INTO metingen_detail (dag, minuut, waarde) VALUES (?, ?, ?)
+            ON CONFLICT (dag, minuut) DO NOTHING
+        ''', [(dag, minuut, waarde) for minuut, waarde in minuten])
+        nieuw = c.rowcount
+
+        stats = DagStatistiek()
+        for minuut, waarde in c.execute("SELECT minuut, waarde FROM metingen_detail WHERE dag = ? ORDER BY minuut", (dag,)):
+            stats.voeg_toe(waarde, f"{minuut // 60:02}:{minuut % 60:02}")
+        if stats.aantal:
+            schrijf_dagstatistieken(c, stats.dag_data(datum_str))
+            werk_totalen_bij(conn, datum_str)
+
+        conn.commit()
+        logging.info(f"🧩 Aangevuld: {nieuw} minuten op {datum_str}, dagstats herberekend.")
+        return nieuw
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        logging.error(f"❌ Fout bij aanvullen van {datum_str}: {e}")
+        return 0
+
+def werk_totalen_bij(conn, datum_str):
+    """
+    Berekent de maand- en jaartotalen opnieuw voor de maand/het jaar van
+    'datum_str'. Dat is telkens een bereik op de primaire sleutel: hoogstens
+    31 dagen voor de maand en 12 maanden voor het jaar, hoe lang de historiek
+    ook is. (Zelf geen commit: hoort bij de transactie van de oproeper.)
+    """
+    maand, jaar = datum_str[:7], datum_str[:4]
+    conn.execute('''
+        INSERT OR REPLACE INTO maandstatistieken
+        SELECT ?, COUNT(*), SUM(gemiddelde), MIN(laagste), MAX(hoogste),
+               SUM(aantal_negatief), SUM(aantal_duur), SUM(aantal)
+        FROM dagstatistieken WHERE datum BETWEEN ? AND ?
+    ''', (maand, maand + '-01', maand + '-31'))
+    conn.execute('''
+        INSERT OR REPLACE INTO jaarstatistieken
+        SELECT ?, SUM(aantal_dagen), SUM(som_gemiddelde), MIN(laagste), MAX(hoogste),
+               SUM(som_negatief), SUM(som_duur), SUM(aantal)
+        FROM maandstatistieken WHERE maand BETWEEN ? AND ?
+    ''', (jaar, jaar + '-01', jaar + '-12'))
+
+# =============================================================================
+# OPRUIMEN (MINUTEN -> KWARTIEREN -> DAGSTATISTIEKEN)
+# =============================================================================
+#
+# - Minuut-details worden AANTAL_DAGEN_BEWAREN dagen bewaard.
+# - Daarna blijft per kwartier een samenvatting over (open, laagste, hoogste,
+#   gemiddelde en de settlement-waarde op xx:14, xx:29, xx:44, xx:59).
+# - De dagstatistieken blijven altijd bewaard.
+# Er wordt telkens één dag per transactie verwerkt, met een korte pauze
+# ertussen: de bot en de website moeten nooit lang op een lock wachten.
+
+def kwartieren_van(rijen):
+    """ [(minuut, waarde), ...] (gesorteerd) -> [(kwartier, open, laagste, hoogste, gemiddelde, settlement, aantal), ...] """
+    per_kwartier = {}
+    for minuut, waarde in rijen:
+        per_kwartier.setdefault(minuut // 15, []).append((minuut, waarde))
+
+    kwartieren = []
+    for kwartier, punten in per_kwartier.items():
+        waarden = [w for _, w in punten]
+        settlement = next((w for m, w in punten if m % 15 == 14), None)
+        kwartieren.append((kwartier, waarden[0], min(waarden), max(waarden),
+                           sum(waarden) / len(waarden), settlement, len(waarden)))
+    return kwartieren
+
+def vat_dag_samen(conn, dag):
+    """ Eén dag: minuten samenvatten per kwartier en daarna verwijderen (1 transactie). """
+    try:
+        rijen = conn.execute("SELECT minuut, waarde FROM metingen_detail WHERE dag = ? ORDER BY minuut", (dag,)).fetchall()
+        conn.executemany('''
+            INSERT INTO metingen_kwartier (dag, kwartier, open, laagste, hoogste, gemiddelde, settlement, aantal)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (dag, kwartier) DO UPDATE SET
+                open = excluded.open, laagste = excluded.laagste, hoogste = excluded.hoogste,
+                gemiddelde = excluded.gemiddelde, settlement = excluded.settlement, aantal = excluded.aantal
+        ''', [(dag, *kwartier) for kwartier in kwartieren_van(rijen)])
+        conn.execute("DELETE FROM metingen_detail WHERE dag = ?", (dag,))
+        conn.commit()
+        return len(rijen)
+    except Exception:
+        conn.rollback()
+        raise
+
+def opruimen_oude_data():
+    """
+    Vat alle minuut-details ouder dan AANTAL_DAGEN_BEWAREN samen tot kwartieren,
+    verwijdert ze, en geeft de vrijgekomen ruimte stapsgewijs terug.
+    """
+    try:
+        conn = verbinding()
+        grens = dag_van((datetime.now(BELGIUM_TZ) - timedelta(days=config.AANTAL_DAGEN_BEWAREN)).strftime('%Y-%m-%d'))
+
+        aantal_dagen = aantal_minuten = 0
+        while True:
+            # Oudste dag: dankzij de primaire sleutel een directe opzoeking
+            dag = conn.execute("SELECT MIN(dag) FROM metingen_detail").fetchone()[0]
+            if dag is None or dag >= grens:
+                break
+            aantal_minuten += vat_dag_samen(conn, dag)
+            aantal_dagen += 1
+            time.sleep(config.OPRUIM_PAUZE)
+
+        # Vrije pagina's in kleine stappen teruggeven (geen lange lock)
+        vrij_voor = vrij = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        while vrij > 0:
+            conn.execute(f"PRAGMA incremental_vacuum({config.OPRUIM_VACUUM_PAGINAS})").fetchall()
+            vorige, vrij = vrij, conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if vrij >= vorige:
+                break  # Geen incrementeel vacuum mogelijk op deze database
+            time.sleep(config.OPRUIM_PAUZE)
+
+        if aantal_dagen or vrij_voor:
+            logging.info(f"🧹 Opruimen: {aantal_dagen} dagen ({aantal_minuten} minuten) samengevat tot kwartieren, "
+                         f"{vrij_voor - vrij} pagina's vrijgegeven.")
+        return aantal_dagen
+    except Exception as e:
+        logging.error(f"❌ Fout bij opruimen: {e}")
+        return 0
+
+# =============================================================================
+# LEZEN
+# =============================================================================
+
+def haal_dag_op(datum_str, na_minuut=-1):
+    """
+    Alle minuut-metingen van één dag, gesorteerd: [(minuut van de dag, waarde), ...]
+    Met 'na_minuut' enkel de minuten daarna (voor de website: enkel wat nieuw is).
+    Wordt gebruikt bij OPSTARTEN (geheugen herstellen) en door de website.
+    """
+    try:
+        c = verbinding().cursor()
+        c.execute("SELECT minuut, waarde FROM metingen_detail WHERE dag = ? AND minuut > ? ORDER BY minuut",
+                  (dag_van(datum_str), na_minuut))
+        return c.fetchall() # Geeft lijst terug: [(1, 50.0), (2, 51.0)...]
     except Exception as e:
-        logging.error(f"❌ Fout bij ophalen hersteldata: {e}")
-        return []
\ No newline at end of file
+        logging.error(f"❌ Fout bij ophalen dagdata: {e}")
+        return []
+
+def haal_kwartieren_op(datum_str):
+    """
+    Kwartier-samenvattingen van één (opgeruimde) dag:
+    [(kwartier, open, laagste, hoogste, gemiddelde, settlement), ...]
+    """
+    try:
+        c = verbinding().cursor()
+        c.execute("SELECT kwartier, open, laagste, hoogste, gemiddelde, settlement FROM metingen_kwartier "
+                  "WHERE dag = ? ORDER BY kwartier", (dag_van(datum_str),))
+        return c.fetchall()
+    except Exception as e:
+        logging.error(f"❌ Fout bij ophalen kwartieren: {e}")
+        return []
+
+# =============================================================================
+# PERSOONLIJKE ALARMEN
+# =============================================================================
+
+def haal_alarmen_op():
+    """ Alle persoonlijke alarmen: [(chat_id, richting, grens, actief), ...] (bij het opstarten). """
+    try:
+        return verbinding().execute("SELECT chat_id, richting, grens, actief FROM alarmen").fetchall()
+    except Exception as e:
+        logging.error(f"❌ Fout bij ophalen alarmen: {e}")
+        return []
+
+def sla_alarm_op(chat_id, richting, grens, actief):
+    conn = verbinding()
+    with conn:
+        conn.execute("INSERT INTO alarmen (chat_id, richting, grens, actief) VALUES (?, ?, ?, ?) "
+                     "ON CONFLICT (chat_id, richting, grens) DO UPDATE SET actief = excluded.actief",
+                     (chat_id, richting, grens, int(actief)))
+
+def verwijder_alarmen(chat_id, richting=None, grens=None):
+    """ Verwijdert één alarm, of (zonder richting/grens) alle alarmen van een chat. """
+    conn = verbinding()
+    with conn:
+        if richting is None:
+            conn.execute("DELETE FROM alarmen WHERE chat_id = ?", (chat_id,))
+        else:
+            conn.execute("DELETE FROM alarmen WHERE chat_id = ? AND richting = ? AND grens = ?",
+                         (chat_id, richting, grens))
+
+def zet_alarm_toestanden(wijzigingen):
+    """ Bewaart de hysteresis-toestand: {(chat_id, richting, grens): actief}. """
+    conn = verbinding()
+    with conn:
+        conn.executemany("UPDATE alarmen SET actief = ? WHERE chat_id = ? AND richting = ? AND grens = ?",
+                         [(int(actief), *sleutel) for sleutel, actief in wijzigingen.items()])
@@ -0,0 +1,177 @@
+import math
+from bisect import bisect_right
+
+import config
+
+# =============================================================================
+# BANDEN (WELKE ALARMEN ER ZIJN)
+# =============================================================================
+#
+# Eén band per alarm. Volgorde = voorrang: valt een prijs in twee nieuwe
+# banden tegelijk, dan geldt de eerste.
+#
+# - 'onder' : alarm als de prijs ONDER deze grens zakt (een lage band)
+# - 'boven' : alarm als de prijs BOVEN deze grens stijgt (een hoge band),
+#             of, samen met 'onder', de ondergrens van een lage band
+# - 'marge' : hysteresis; de band is pas hersteld als de prijs weer
+#             'marge' voorbij de grens is (geen 'marge' = geen herstelmelding)
+#
+# Een alarm in een lage band zet ook de mildere lage banden aan en de hoge
+# uit (en omgekeerd). Een herstel zet de band uit, samen met de strengere
+# banden in dezelfde richting die ook een herstel hebben.
+
+def standaard_banden():
+    """ De alarmen van de bot, met de grenzen uit config.py. """
+    return [
+        {'naam': 'extreem_laag', 'onder': config.GRENS_EXTREEM_LAAG, 'titel': "EXTREEM LAGE PRIJS", 'icoon': "🧊"},
+        {'naam': 'zeer_laag', 'onder': config.GRENS_ZEER_LAAG, 'titel': "ZÉÉR LAGE PRIJS", 'icoon': "❄️"},
+        {'naam': 'zeer_hoog', 'boven': config.GRENS_ZEER_HOOG, 'titel': "ZÉÉR HOGE PRIJS", 'icoon': "🚨"},
+        {'naam': 'onder_min_50', 'onder': config.GRENS_LAAG_MIN_50, 'titel': "Prijs onder -50", 'icoon': "🌟",
+         'marge': 0, 'herstel_titel': "Prijs weer boven -50", 'herstel_icoon': "☑️"},
+        {'naam': 'onder_0', 'onder': config.GRENS_NEGATIEF, 'titel': "Prijs onder 0", 'icoon': "✅",
+         'marge': 0, 'herstel_titel': "Prijs weer positief", 'herstel_icoon': "⚠️"},
+        {'naam': 'onder_50', 'onder': config.GRENS_GOEDKOOP, 'boven': config.GRENS_NEGATIEF,
+         'titel': "Prijs onder 50", 'icoon': "⚠️",
+         'marge': config.GRENS_HERSTEL - config.GRENS_GOEDKOOP, 'herstel_titel': "Prijs weer boven 50", 'herstel_icoon': "📈"},
+    ]
+
+def net_boven(waarde):
+    """ Kleinste getal > waarde: 'prijs > g' wordt zo 'prijs >= net_boven(g)' (werkt met bisect_right). """
+    return math.nextafter(waarde, math.inf)
+
+# =============================================================================
+# DREMPELMOTOR
+# =============================================================================
+
+class DrempelMotor:
+    """
+    Zet de bandentabel om in een opzoektabel:
+    - alle grenzen gesorteerd in één lijst: bisect_right geeft de 'zone'
+      waarin een prijs valt (binnen een zone gedragen alle prijzen zich gelijk)
+    - de toestand is een bitmasker van de actieve banden
+    - tabel[toestand][zone] = (nieuwe toestand, melding of None)
+
+    Voor het opzoeken krijgt elke toestand een eigen, kortere lijst grenzen:
+    enkel die waar de uitkomst in DIE toestand wijzigt (naburige zones met
+    dezelfde uitkomst zijn samengevoegd). Per meting is dat één lijst-index en
+    één bisect over een handvol grenzen. De motor zelf houdt geen toestand
+    bij, dus één motor kan voor meerdere gebruikers dienen.
+    """
+
+    begin = 0  # Geen enkel alarm actief
+
+    def __init__(self, banden=None):
+        self.banden = banden if banden is not None else standaard_banden()
+        self.namen = [band['naam'] for band in self.banden]
+        self._bereid_voor()
+
+        # Alle grenzen waar het gedrag kan wijzigen
+        grenzen = set()
+        for band in self.banden:
+            if self._is_laag(band):
+                grenzen.add(band['onder'])
+                if band.get('boven') is not None:
+                    grenzen.add(net_boven(band['boven']))
+                if band.get('marge') is not None:
+                    grenzen.add(band['onder'] + band['marge'])
+            else:
+                grenzen.add(net_boven(band['boven']))
+                if band.get('marge') is not None:
+                    grenzen.add(net_boven(band['boven'] - band['marge']))
+        self.grenzen = sorted(grenzen)
+
+        # Eén voorbeeldprijs per zone (zone 0 ligt onder de laagste grens)
+        voorbeelden = [self.grenzen[0] - 1] + self.grenzen
+
+        # Opzoektabel voor alle bereikbare toestanden
+        self.tabel = {}
+        te_doen = [self.begin]
+        while te_doen:
+            toestand = te_doen.pop()
+            if toestand in self.tabel:
+                continue
+            rij = tuple(self.stap(toestand, prijs) for prijs in voorbeelden)
+            self.tabel[toestand] = rij
+            te_doen.extend(nieuw for nieuw, _ in rij if nieuw not in self.tabel)
+
+        # Opzoeklijst: opzoek[toestand] = (grenzen van deze toestand, uitkomst per zone)
+        self.opzoek = [None] * (max(self.tabel) + 1)
+        for toestand, rij in self.tabel.items():
+            grenzen, uitkomsten = [], [rij[0]]
+            for grens, uitkomst in zip(self.grenzen, rij[1:]):
+                if uitkomst != uitkomsten[-1]:
+                    grenzen.append(grens)
+                    uitkomsten.append(uitkomst)
+            self.opzoek[toestand] = (grenzen, tuple(uitkomsten))
+
+    @staticmethod
+    def _is_laag(band):
+        return band.get('onder') is not None
+
+    def _bereid_voor(self):
+        """ Per band: welke bits een alarm of herstel aan- en uitzet, en de meldingen. """
+        laag = [i for i, band in enumerate(self.banden) if self._is_laag(band)]
+        hoog = [i for i, band in enumerate(self.banden) if not self._is_laag(band)]
+        bits = lambda indexen: sum(1 << i for i in indexen)
+
+        self.alarm_aan, self.alarm_uit, self.herstel_uit = [], [], []
+        self.alarm_melding, self.herstel_melding = [], []
+        for i, band in enumerate(self.banden):
+            if self._is_laag(band):
+                mildere = [j for j in laag if self.banden[j]['onder'] > band['onder']]
+                strengere = [j for j in laag if self.banden[j]['onder'] < band['onder']]
+                tegenover = hoog
+            else:
+                mildere = [j for j in hoog if self.banden[j]['boven'] < band['boven']]
+                strengere = [j for j in hoog if self.banden[j]['boven'] > band['boven']]
+                tegenover = laag
+            self.alarm_aan.append(bits([i] + mildere))
+            self.alarm_uit.append(bits(tegenover))
+            self.herstel_uit.append(bits([i] + [j for j in strengere if self.banden[j].get('marge') is not None]))
+
+            self.alarm_melding.append({'soort': 'alarm', 'band': band['naam'],
+                                       'titel': band['titel'], 'icoon': band['icoon']})
+            self.herstel_melding.append({'soort': 'herstel', 'band': band['naam'],
+                                         'titel': band.get('herstel_titel'), 'icoon': band.get('herstel_icoon')})
+
+        # Herstel: de mildste band eerst (zoals een prijs die terug naar normaal gaat)
+        self.herstel_volgorde = (sorted((i for i in laag if self.banden[i].get('marge') is not None),
+                                        key=lambda i: -self.banden[i]['onder']) +
+                                 sorted((i for i in hoog if self.banden[i].get('marge') is not None),
+                                        key=lambda i: self.banden[i]['boven']))
+
+    def _in_band(self, band, prijs):
+        if self._is_laag(band):
+            return prijs < band['onder'] and (band.get('boven') is None or prijs > band['boven'])
+        return prijs > band['boven']
+
+    def _hersteld(self, band, prijs):
+        if self._is_laag(band):
+            return prijs >= band['onder'] + band['marge']
+        return prijs <= band['boven'] - band['marge']
+
+    def stap(self, toestand, prijs):
+        """
+        De regels zelf, band per band (traag). Wordt enkel gebruikt om de
+        opzoektabel op te bouwen. Geeft (nieuwe toestand, melding of None).
+        """
+        # 1. Een nieuw alarm (de eerste band in de tabel gaat voor)
+        for i, band in enumerate(self.banden):
+            if not toestand & (1 << i) and self._in_band(band, prijs):
+                return (toestand | self.alarm_aan[i]) & ~self.alarm_uit[i], self.alarm_melding[i]
+
+        # 2. Anders: hoogstens één herstel
+        for i in self.herstel_volgorde:
+            if toestand & (1 << i) and self._hersteld(self.banden[i], prijs):
+                return toestand & ~self.herstel_uit[i], self.herstel_melding[i]
+
+        return toestand, None
+
+    def verwerk(self, toestand, prijs):
+        """ Eén meting: geeft (nieuwe toestand, melding of None). """
+        grenzen, uitkomsten = self.opzoek[toestand]
+        return uitkomsten[bisect_right(grenzen, prijs)]
+
+    def status(self, toestand):
+        """ Toestand als dict {band: actief} (zoals de live buffer en de website die kennen). """
+        return {naam: bool(toestand & (1 << i)) for i, naam in enumerate(self.namen)}
@@ -0,0 +1,373 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+
+import config
+import metrieken
+
+# Enkel deze velden hebben we nodig van Elia
+VELDEN = 'datetime,imbalanceprice'
+
+# Per poging (een poll kan tot 'retries' pogingen doen)
+ELIA_AANROEP = metrieken.histogram('elia_aanroep_seconds', "Duur van één poging naar Elia", ('resultaat',))
+ELIA_FOUTEN = metrieken.teller('elia_fouten_total', "Mislukte pogingen naar Elia, per poging binnen een poll", ('poging',))
+
+def minimale_url(url):
+    """
+    Past de API-URL aan zodat Elia enkel het NIEUWSTE record terugstuurt,
+    met enkel de velden die we gebruiken (Explore API v2.1 parameters).
+    """
+    delen = urlsplit(url)
+    query = dict(parse_qsl(delen.query))
+    query.update({'select': VELDEN, 'order_by': 'datetime DESC', 'limit': '1'})
+    return urlunsplit(delen._replace(query=urlencode(query)))
+
+def bereik_url(url, van, tot, offset=0):
+    """
+    Past de API-URL aan voor een stuk historiek: alle records met
+    van <= datetime < tot, oudste eerst, één pagina van AANVUL_PAGINA
+    records vanaf 'offset' (van/tot zijn tijdzone-bewuste datetimes).
+    """
+    delen = urlsplit(url)
+    query = dict(parse_qsl(delen.query))
+    query.update({
+        'select': VELDEN,
+        'where': f"datetime >= date'{van.isoformat()}' AND datetime < date'{tot.isoformat()}'",
+        'order_by': 'datetime ASC',
+        'limit': str(config.AANVUL_PAGINA),
+        'offset': str(offset),
+    })
+    return urlunsplit(delen._replace(query=urlencode(query)))
+
+# =============================================================================
+# STROOMONDERBREKER (CIRCUIT BREAKER)
+# =============================================================================
+
+class Stroomonderbreker:
+    """
+    Houdt bij of Elia bereikbaar is.
+    - 'gesloten'  : alles normaal, aanroepen gaan door
+    - 'open'      : te veel fouten op rij, aanroepen falen meteen (geen wachttijd)
+    - 'half-open' : een test-aanroep op de achtergrond kijkt of Elia terug is
+    """
+
+    def __init__(self, drempel=None):
+        self.drempel = drempel or config.ELIA_BREKER_DREMPEL
+        self.toestand = 'gesloten'
+        self.fouten_op_rij = 0
+        self.geopend_op = None
+        self.lock = threading.Lock()
+
+    def mag_aanroepen(self):
+        with self.lock:
+            return self.toestand == 'gesloten'
+
+    def succes(self):
+        with self.lock:
+            if self.toestand != 'gesloten':
+                logging.info("✅ Elia is terug bereikbaar: stroomonderbreker gesloten.")
+            self.toestand = 'gesloten'
+            self.fouten_op_rij = 0
+
+    def fout(self):
+        """ Geeft True terug als de breker hierdoor net OPEN gaat. """
+        with self.lock:
+            self.fouten_op_rij += 1
+            if self.toestand == 'gesloten' and self.fouten_op_rij >= self.drempel:
+                self.toestand = 'open'
+                self.geopend_op = time.monotonic()
+                logging.error(f"⛔ Elia {self.fouten_op_rij}x na elkaar onbereikbaar: stroomonderbreker OPEN.")
+                return True
+            if self.toestand == 'half-open':
+                self.toestand = 'open'
+            return False
+
+    def probeer(self):
+        """ Zet de breker half-open voor een test-aanroep. """
+        with self.lock:
+            if self.toestand == 'open':
+                self.toestand = 'half-open'
+
+# =============================================================================
+# ELIA CLIENT
+# =============================================================================
+
+class EliaClient:
+    """
+    Haalt de laatste onbalansprijs op bij Elia.
+    - Vraagt enkel het nieuwste record op (limit=1, select=...)
+    - Stuurt ETag / Last-Modified terug mee (HTTP 304 = niets nieuws)
+    - Onthoudt het laatste record (dat geven we terug bij een 304)
+    - Houdt tellers bij (bytes, latentie, CPU) om het effect te kunnen meten
+    - Blijft binnen een tijdsbudget per poll, stuurt bij traagheid een tweede
+      ('hedged') request, en faalt meteen als de stroomonderbreker open staat
+    """
+
+    def __init__(self, url, session, tz):
+        self.url = minimale_url(url) if url else url
+        self.session = session
+        self.tz = tz
+
+        # Validators van de server (voor conditionele requests)
+        self.etag = None
+        self.last_modified = None
+
+        # Laatste record dat we gezien hebben: (prijs, timestamp_obj)
+        self.laatste_record = None
+
+        # Tellers
+        self.aantal_aanroepen = 0
+        self.aantal_304 = 0
+        self.bytes_ontvangen = 0
+        self.totale_latentie = 0.0
+        self.totale_cpu = 0.0
+        self.aantal_hedges = 0
+        self.aantal_snel_gefaald = 0
+
+        # Robuustheid
+        self.breker = Stroomonderbreker()
+        self.latenties = deque(maxlen=100)  # Recente duur van geslaagde requests (s)
+        self.pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="elia")
+
+    def _hedge_vertraging(self):
+        """ Na hoeveel seconden sturen we een tweede request? (p95 van de recente latenties) """
+        if not config.ELIA_HEDGE or len(self.latenties) < 20:
+            return None
+        waarden = sorted(self.latenties)
+        return max(0.2, waarden[int(len(waarden) * 0.95)])
+
+    def _aanroep(self, url, headers, timeout):
+        """
+        Eén (eventueel 'hedged') GET. Is het eerste request trager dan de p95,
+        dan starten we een tweede en nemen we het antwoord dat eerst binnen is.
+        """
+        eind = time.monotonic() + timeout
+        lopend = {self.pool.submit(self.session.get, url, headers=headers, timeout=timeout)}
+
+        hedge_na = self._hedge_vertraging()
+        if hedge_na is not None and hedge_na < timeout:
+            klaar, _ = wait(lopend, timeout=hedge_na)
+            if not klaar:
+                self.aantal_hedges += 1
+                lopend.add(self.pool.submit(self.session.get, url, headers=headers, timeout=max(0.1, eind - time.monotonic())))
+
+        laatste_fout = None
+        while lopend:
+            klaar, lopend = wait(lopend, timeout=max(0, eind - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not klaar:
+                break
+            for future in klaar:
+                if future.exception() is None:
+                    return future.result()
+                laatste_fout = future.exception()
+        raise laatste_fout or requests.exceptions.Timeout("Tijdsbudget voor Elia overschreden")
+
+    def doe_http_aanroep(self, url, retries=3, timeout=10):
+        """
+        Haalt data op van de Elia API met foutafhandeling.
+        Geeft (status, data) terug: status is 'nieuw', 'ongewijzigd' (304) of 'fout'.
+        Alle pogingen samen blijven binnen ELIA_POLL_BUDGET seconden.
+        """
+        if not self.breker.mag_aanroepen():
+            self.aantal_snel_gefaald += 1
+            return 'fout', None
+
+        deadline = time.monotonic() + config.ELIA_POLL_BUDGET
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        for attempt in range(retries):
+            rest = deadline - time.monotonic()
+            if rest <= 0.1:
+                logging.warning("⏱️ Tijdsbudget voor deze poll is op.")
+                break
+
+            start = time.monotonic()
+            cpu_start = time.thread_time()
+            resultaat = 'fout'
+            try:
+                response = self._aanroep(url, headers, min(timeout, rest))
+                self.aantal_aanroepen += 1
+                self.bytes_ontvangen += len(response.content)
+                self._log_statistieken()
+
+                if response.status_code == 304:
+                    self.aantal_304 += 1
+                    self.latenties.append(time.monotonic() - start)
+                    self.breker.succes()
+                    resultaat = 'ongewijzigd'
+                    return 'ongewijzigd', None
+
+                response.raise_for_status()
+                data = response.json()
+                self.latenties.append(time.monotonic() - start)
+                self.breker.succes()
+
+                # Validators bewaren voor de volgende keer (als de server ze geeft)
+                self.etag = response.headers.get('ETag', self.etag)
+                self.last_modified = response.headers.get('Last-Modified', self.last_modified)
+                resultaat = 'nieuw'
+                return 'nieuw', data
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logging.error(f"❌ API Fout (poging {attempt+1}): {e}")
+                ELIA_FOUTEN.verhoog(poging=attempt + 1)
+                pauze = min(config.ELIA_RETRY_PAUZE, deadline - time.monotonic() - 0.1)
+                if attempt < retries - 1 and pauze > 0:
+                    time.sleep(pauze)
+            finally:
+                duur = time.monotonic() - start
+                self.totale_latentie += duur
+                self.totale_cpu += time.thread_time() - cpu_start
+                ELIA_AANROEP.observeer(duur, resultaat=resultaat)
+
+        if self.breker.fout():
+            threading.Thread(target=self._test_op_achtergrond, args=(url,), name="elia-test", daemon=True).start()
+        return 'fout', None
+
+    def _test_op_achtergrond(self, url):
+        """ Zolang de breker open staat: af en toe kijken of Elia terug is. """
+        while not self.breker.mag_aanroepen():
+            time.sleep(config.ELIA_BREKER_WACHTTIJD)
+            self.breker.probeer()
+            try:
+                response = self.session.get(url, timeout=config.ELIA_POLL_BUDGET)
+                response.raise_for_status()
+                self.breker.succes()
+            except requests.exceptions.RequestException as e:
+                logging.warning(f"🔌 Elia nog steeds onbereikbaar: {e}")
+                self.breker.fout()
+
+    def haal_laatste(self):
+        """
+        Geeft (prijs, timestamp_obj) van het nieuwste record terug.
+        Bij een 304 krijg je het record van de vorige keer terug.
+        """
+        status, data = self.doe_http_aanroep(self.url)
+
+        if status == 'ongewijzigd':
+            return self.laatste_record or (None, None)
+
+        if status == 'fout' or not data or 'results' not in data or not data['results']:
+            logging.warning("⚠️ Geen geldige data ontvangen van Elia.")
+            return None, None
+
+        laatste_data = data['results'][0]
+        prijs = laatste_data.get('imbalanceprice')
+        timestamp = laatste_data.get('datetime')
+
+        if prijs is None:
+            return None, None
+
+        timestamp_obj = datetime.fromisoformat(timestamp).astimezone(self.tz)
+        self.laatste_record = (prijs, timestamp_obj)
+        return prijs, timestamp_obj
+
+    def statistieken(self):
+        """ Tellers per aanroep (om bandbreedte en CPU per poll te vergelijken). """
+        n = self.aantal_aanroepen or 1
+        return {
+            'aanroepen': self.aantal_aanroepen,
+            'niet_gewijzigd_304': self.aantal_304,
+            'bytes_totaal': self.bytes_ontvangen,
+            'bytes_per_poll': round(self.bytes_ontvangen / n),
+            'latentie_ms_per_poll': round(self.totale_latentie / n * 1000, 1),
+            'cpu_ms_per_poll': round(self.totale_cpu / n * 1000, 2),
+        }
+
+    def status(self):
+        """ Toestand van de verbinding met Elia (voor /status en de logs). """
+        waarden = sorted(self.latenties)
+        n = len(waarden)
+        return {
+            'breker': self.breker.toestand,
+            'fouten_op_rij': self.breker.fouten_op_rij,
+            'p50_ms': round(waarden[n // 2] * 1000) if n else None,
+            'p95_ms': round(waarden[min(n - 1, int(n * 0.95))] * 1000) if n else None,
+            'hedges': self.aantal_hedges,
+            'snel_gefaald': self.aantal_snel_gefaald,
+        }
+
+    def _log_statistieken(self):
+        if self.aantal_aanroepen and self.aantal_aanroepen % config.ELIA_STATS_INTERVAL == 0:
+            logging.info(f"📶 Elia polling: {self.statistieken()}")
+
+# =============================================================================
+# LAATSTE PRIJS (GEDEELD TUSSEN POLLER EN COMMANDO'S)
+# =============================================================================
+
+class LaatstePrijs:
+    """
+    De laatst opgehaalde (prijs, timestamp_obj), thread-safe gedeeld.
+    - De poller haalt op via ververs(); /price leest via haal().
+    - Is de laatste poll ouder dan 'max_leeftijd', dan haalt haal() zelf op.
+    - Er loopt nooit meer dan één aanroep naar Elia tegelijk: wie vraagt
+      terwijl er al een loopt, wacht op datzelfde antwoord ('single flight').
+    """
+
+    def __init__(self, ophalen):
+        self.ophalen = ophalen  # Functie die (prijs, timestamp_obj) teruggeeft, bv. EliaClient.haal_laatste
+        self.record = None
+        self.opgehaald = None   # time.monotonic() van de laatste geslaagde poll
+        self.lopend = None      # Future van de aanroep die nu loopt
+        self.lock = threading.Lock()
+
+        # Tellers
+        self.uit_cache = 0
+        self.zelf_opgehaald = 0
+        self.meegelift = 0      # Gewacht op een aanroep die al liep
+
+    def _haal_op(self):
+        """ Eén gedeelde aanroep naar Elia (of aansluiten bij de lopende). """
+        with self.lock:
+            lopend = self.lopend
+            eigenaar = lopend is None
+            if eigenaar:
+                lopend = self.lopend = Future()
+            else:
+                self.meegelift += 1
+        if not eigenaar:
+            return lopend.result()
+
+        resultaat = (None, None)
+        try:
+            resultaat = self.ophalen()
+        finally:
+            with self.lock:
+                if resultaat[0] is not None:
+                    self.record, self.opgehaald = resultaat, time.monotonic()
+                self.lopend = None
+            lopend.set_result(resultaat)
+        return resultaat
+
+    def ververs(self):
+        """ Voor de poller: altijd een verse waarde (of de aanroep die al loopt). """
+        return self._haal_op()
+
+    def haal(self, max_leeftijd=None):
+        """ Voor /price: de gedeelde waarde als die recent genoeg is, anders één gedeelde aanroep. """
+        if max_leeftijd is None:
+            max_leeftijd = config.PRIJS_MAX_LEEFTIJD
+        with self.lock:
+            if self.record is not None and time.monotonic() - self.opgehaald <= max_leeftijd:
+                self.uit_cache += 1
+                return self.record
+            self.zelf_opgehaald += 1
+        return self._haal_op()
+
+    def tellers(self):
+        with self.lock:
+            return {
+                'uit_cache': self.uit_cache,
+                'zelf_opgehaald': self.zelf_opgehaald,
+                'meegelift': self.meegelift,
+                'leeftijd_s': round(time.monotonic() - self.opgehaald, 1) if self.opgehaald else None,
+            }
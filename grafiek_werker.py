@@ -0,0 +1,143 @@
+import io
+import logging
+import threading
+import multiprocessing
+from array import array
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+# =============================================================================
+# IN HET WERKERPROCES
+# =============================================================================
+#
+# matplotlib wordt ENKEL hier geïmporteerd. De bot zelf laadt het nooit, dus
+# die start sneller en een render van enkele seconden (op een Pi) houdt geen
+# enkele thread van de bot bezig (ook de GIL niet).
+
+_figuur = None  # Figuur-sjabloon, één keer opgebouwd en telkens hergebruikt
+_as = None
+_lijn = None
+
+def _start_werker():
+    """ Initializer: matplotlib laden, het figuur-sjabloon bouwen en één keer opwarmen. """
+    global _figuur, _as, _lijn
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
+    _figuur, _as = plt.subplots(figsize=(10, 5))
+    _lijn, = _as.plot([], [], color='blue', linewidth=2, marker='o', markersize=4)
+    _as.xaxis_date()
+    _as.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+    _as.set_ylabel("Prijs (€\\MWh)")
+    _as.grid(True, linestyle='--', alpha=0.7)
+    _as.axhline(0, color='red', linewidth=1, linestyle='-') # Rode lijn op 0
+
+    # Een eerste render laadt de fonts en vult de caches van matplotlib
+    teken(date.today().toordinal(), array('H', [14, 29]), array('d', [0.0, 1.0]), "")
+
+def teken(dag, minuten, prijzen, titel):
+    """
+    Tekent de punten (minuut van de dag + prijs) van dag 'dag' (ordinal)
+    in het sjabloon en geeft de PNG (bytes) terug.
+    """
+    import matplotlib.dates as mdates
+
+    middernacht = datetime.fromordinal(dag)
+    _lijn.set_data(mdates.date2num([middernacht + timedelta(minutes=m) for m in minuten]), prijzen)
+    _as.relim()
+    _as.autoscale_view()
+    _as.set_title(titel)
+    _figuur.autofmt_xdate()
+
+    buf = io.BytesIO()
+    _figuur.savefig(buf, format='png', bbox_inches='tight')
+    return buf.getvalue()
+
+# =============================================================================
+# IN DE BOT
+# =============================================================================
+
+def _proces_context():
+    """
+    Nooit 'fork': de bot heeft veel threads (poller, stappen, Telegram-pool),
+    en een kopie van een lock die net vastgehouden wordt, blijft in het kind
+    voor altijd dicht. Een forkserver start zelf als vers proces; daaruit
+    splitsen we de werkers af, met matplotlib al geladen (snelle herstart).
+    Waar er geen forkserver is (Windows): spawn.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['grafiek_werker', 'matplotlib'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+class GrafiekWerker:
+    """
+    Eén blijvend ('warm') werkerproces dat grafieken tekent. teken() geeft
+    meteen een Future terug; de punten gaan er compact naartoe als arrays.
+    Crasht het proces of blijft het hangen (zie wacht), dan start de
+    volgende aanvraag een nieuw.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        """
+        Start het werkerproces (als dat nog niet draait). Mag vanuit elke
+        thread, ook na een crash (zie _proces_context); de bot roept het al
+        bij het opstarten op zodat de eerste grafiek niet moet wachten.
+        """
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=1, mp_context=_proces_context(),
+                                                initializer=_start_werker)
+                self.pool.submit(int)  # Het proces nu al starten (en opwarmen), niet pas bij de eerste grafiek
+                logging.info("🎨 Grafiek-werker gestart")
+
+    def teken(self, dag, minuten, prijzen, titel):
+        """ Geeft een Future met de PNG (bytes). 'dag' is date.toordinal(). """
+        self.start()
+        pool = self.pool
+        try:
+            toekomst = pool.submit(teken, dag, minuten, prijzen, titel)
+        except BrokenProcessPool:
+            logging.warning("♻️ Grafiek-werker gecrasht, we starten een nieuwe")
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = None
+            self.start()
+            pool = self.pool
+            toekomst = pool.submit(teken, dag, minuten, prijzen, titel)
+        toekomst.pool = pool  # Voor wacht(): welk proces stoppen als het blijft hangen
+        return toekomst
+
+    def wacht(self, toekomst, timeout):
+        """
+        Wacht hoogstens 'timeout' seconden op de PNG van teken(). Er is maar
+        één werker: blijft die hangen (bv. in matplotlib), dan zou elke
+        volgende grafiek erachter aanschuiven. Daarom wordt het proces dan
+        gestopt en start de volgende aanvraag een vers proces.
+        """
+        try:
+            return toekomst.result(timeout=timeout)
+        except TimeoutError:
+            logging.warning(f"⏳ Grafiek-werker reageert niet na {timeout}s")
+            self.stop(toekomst.pool)
+            raise
+
+    def stop(self, pool=None):
+        """ Stopt het werkerproces (enkel als 'pool' nog de huidige is, indien gegeven). """
+        with self.lock:
+            if self.pool is None or (pool is not None and pool is not self.pool):
+                return  # Een andere thread heeft al een nieuwe gestart
+            pool, self.pool = self.pool, None
+        processen = list((pool._processes or {}).values())  # Vóór shutdown: die wist de lijst
+        pool.shutdown(wait=False, cancel_futures=True)
+        for proces in processen:
+            proces.terminate()
+        logging.info("🛑 Grafiek-werker gestopt")
@@ -0,0 +1,115 @@
+import threading
+from concurrent.futures import Future
+
+# =============================================================================
+# CACHE VOOR DE GRAFIEK (PNG + TELEGRAM FILE_ID)
+# =============================================================================
+
+class GrafiekCache:
+    """
+    Houdt de laatst getekende grafiek bij, samen met de 'file_id' die Telegram
+    teruggaf na de eerste upload. De sleutel is het laatste kwartier-punt:
+    zolang er geen nieuw settlement-punt bijkomt, is de grafiek dezelfde en
+    wordt er niet opnieuw getekend of geüpload.
+    """
+
+    def __init__(self):
+        self.sleutel = None
+        self.png = None
+        self.file_id = None
+        self.lock = threading.Lock()         # Beschermt de velden (nooit vastgehouden tijdens een render of upload)
+        self.upload_lock = threading.Lock()  # Eén upload per versie, de andere chats wachten op de file_id
+        self.bezig = {}  # Sleutel -> Future van de render die nu loopt (andere chats wachten daarop)
+
+        # Tellers (voor /status)
+        self.renders = 0
+        self.hits = 0
+        self.uploads = 0
+        self.hergebruikt = 0  # Verzonden met een bestaande file_id
+
+    def haal(self, sleutel, maak):
+        """
+        Geeft de PNG (bytes) voor deze sleutel. Enkel bij een nieuwe sleutel
+        wordt maak() opgeroepen (één keer, ook als meerdere chats tegelijk
+        vragen); geeft die None terug, dan onthouden we niets.
+        """
+        with self.lock:
+            if sleutel == self.sleutel and self.png is not None:
+                self.hits += 1
+                return self.png
+            toekomst = self.bezig.get(sleutel)
+            if toekomst is None:
+                toekomst = self.bezig[sleutel] = Future()
+                eigenaar = True
+            else:
+                self.hits += 1
+                eigenaar = False
+        if not eigenaar:
+            return toekomst.result()  # Een andere thread tekent deze versie al
+
+        # De render zelf (tot GRAFIEK_TIMEOUT) zonder lock: /status en de file_id blijven bereikbaar
+        png = None
+        try:
+            png = maak()
+        finally:
+            with self.lock:
+                self.renders += 1
+                del self.bezig[sleutel]
+                if png is not None:
+                    self.sleutel, self.png, self.file_id = sleutel, png, None
+            toekomst.set_result(png)
+        return png
+
+    def _file_id_voor(self, sleutel):
+        with self.lock:
+            return self.file_id if sleutel == self.sleutel else None
+
+    def _zet_file_id(self, sleutel, file_id):
+        with self.lock:
+            if sleutel == self.sleutel:
+                self.file_id = file_id
+
+    def stuur(self, sleutel, maak, chat_id, verzender):
+        """
+        Stuurt de grafiek naar één chat: met de file_id als die er is,
+        anders één keer de PNG uploaden en de file_id onthouden.
+        Geeft True terug bij succes.
+        """
+        png = self.haal(sleutel, maak)
+        if png is None:
+            return False
+
+        file_id = self._file_id_voor(sleutel)
+        if file_id is None:
+            with self.upload_lock:
+                # Misschien heeft een andere chat intussen al geüpload
+                file_id = self._file_id_voor(sleutel)
+                if file_id is None:
+                    resultaat = verzender.stuur_foto(png, chat_id)
+                    if resultaat:
+                        with self.lock:
+                            self.uploads += 1
+                    if isinstance(resultaat, str):
+                        self._zet_file_id(sleutel, resultaat)
+                    return bool(resultaat)
+
+        if verzender.stuur_foto(file_id, chat_id):
+            with self.lock:
+                self.hergebruikt += 1
+            return True
+
+        # De file_id werkt niet (meer): vergeten en opnieuw uploaden
+        self._zet_file_id(sleutel, None)
+        resultaat = verzender.stuur_foto(png, chat_id)
+        if isinstance(resultaat, str):
+            self._zet_file_id(sleutel, resultaat)
+        return bool(resultaat)
+
+    def tellers(self):
+        with self.lock:
+            return {
+                'renders': self.renders,
+                'hits': self.hits,
+                'uploads': self.uploads,
+                'hergebruikt': self.hergebruikt,
+            }
@@ -0,0 +1,91 @@
+import time
+import threading
+from datetime import datetime
+
+# =============================================================================
+# KLOKKEN (ECHT, VERSNELD, GESIMULEERD)
+# =============================================================================
+#
+# De poller vraagt de tijd en slaapt altijd via een klok-object. In de bot is
+# dat de echte klok; bij het afspelen van een prijsreeks (benchmark.py replay)
+# een versnelde of gesimuleerde klok, zodat een dag of een maand in enkele
+# seconden voorbij is. Elke klok heeft dezelfde vier methodes:
+# - tijd()     : wall-clock seconden (zoals time.time)
+# - monotoon() : monotone seconden (zoals time.monotonic)
+# - nu(tz)     : tijdzone-bewuste datetime
+# - slaap(s)   : s seconden (van deze klok) wachten
+
+class SysteemKlok:
+    """ De echte klok. """
+
+    def tijd(self):
+        return time.time()
+
+    def monotoon(self):
+        return time.monotonic()
+
+    def nu(self, tz=None):
+        return datetime.now(tz)
+
+    def slaap(self, seconden):
+        if seconden > 0:
+            time.sleep(seconden)
+
+class VersneldeKlok:
+    """
+    Loopt 'snelheid' keer sneller dan de echte klok, vanaf 'start' (een
+    tijdzone-bewuste datetime). Hoort bij Fake_API in replay-modus met
+    dezelfde start en snelheid: dan zien bot en API dezelfde tijd.
+    'echte_start' is het time.monotonic()-moment dat met 'start' overeenkomt
+    (standaard: nu), om twee klokken, ook in aparte processen, gelijk te zetten.
+    """
+
+    def __init__(self, start, snelheid, echte_start=None):
+        self.start = start.timestamp()
+        self.snelheid = float(snelheid)
+        self.echte_start = time.monotonic() if echte_start is None else echte_start
+
+    def monotoon(self):
+        return (time.monotonic() - self.echte_start) * self.snelheid
+
+    def tijd(self):
+        return self.start + self.monotoon()
+
+    def nu(self, tz=None):
+        return datetime.fromtimestamp(self.tijd(), tz)
+
+    def slaap(self, seconden):
+        if seconden > 0:
+            time.sleep(seconden / self.snelheid)
+
+class SimulatieKlok:
+    """
+    Virtuele tijd die enkel vooruit gaat als er geslapen wordt: slaap()
+    verzet de klok meteen, zonder echt te wachten. Een dag afspelen kost dan
+    enkel de verwerkingstijd.
+
+    'wacht' (optioneel) wordt vóór elke sprong opgeroepen, bv. om de
+    pijplijn eerst te laten leeglopen: anders loopt de poller de rest uit
+    het oog en vallen er events uit de begrensde wachtrijen.
+    """
+
+    def __init__(self, start, wacht=None):
+        self.begin = self.t = start.timestamp()
+        self.wacht = wacht
+        self.lock = threading.Lock()
+
+    def tijd(self):
+        with self.lock:
+            return self.t
+
+    def monotoon(self):
+        return self.tijd() - self.begin
+
+    def nu(self, tz=None):
+        return datetime.fromtimestamp(self.tijd(), tz)
+
+    def slaap(self, seconden):
+        if self.wacht:
+            self.wacht()
+        with self.lock:
+            self.t += max(0.0, seconden)
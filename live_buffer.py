@@ -0,0 +1,243 @@
+import os
+import mmap
+import time
+import struct
+import threading
+
+import config
+
+# =============================================================================
+# LIVE BUFFER IN GEDEELD GEHEUGEN (RING)
+# =============================================================================
+#
+# De bot schrijft elke minuut ÉÉN record bij in een bestand in /dev/shm (RAM),
+# dat zowel de bot als de webserver in het geheugen mappen (mmap).
+#
+# Indeling van het bestand:
+#   [ header (128 bytes) ][ record 0 ][ record 1 ] ... [ record capaciteit-1 ]
+#
+# Header : magic, capaciteit, recordgrootte, volgnummer (= aantal records ooit
+#          geschreven), de lopende dagstatistieken van de bot, de actieve
+#          alarmen (één bit per alarm, zie STATUS_VLAGGEN) en twee
+#          schrijf-generaties van de database (zie verhoog_generatie).
+# Record : seq, datum (JJJJMMDD), minuut van de dag, prijs, reserve.
+#
+# Geen locks tussen de processen: elk record begint met een 'seqlock'. Voor
+# record n schrijft de bot eerst seq = 2n - 1 (oneven = bezig), dan de inhoud,
+# en pas daarna seq = 2n. De lezer leest seq, dan de inhoud, dan seq opnieuw,
+# en aanvaardt het record enkel als beide keren 2n gelezen werd. Begint de bot
+# tijdens het lezen aan dit vak (de ring is rond), dan ziet de tweede lezing
+# dat; een half geschreven of intussen overschreven record wordt zo nooit
+# gelezen. De dagstatistieken in de header werken op dezelfde manier.
+
+MAGIC = b'ELR3'
+HEADER = struct.Struct('<4sII4xQQIIddd') # 64 bytes (8-byte velden op 8-byte grenzen)
+HEADER_GROOTTE = 128                     # + alarmstatus + reserve
+RECORD = struct.Struct('<QIHxxd8x')      # 32 bytes
+INHOUD = struct.Struct('<IHxxd')         # Het record zonder seq (vanaf byte 8)
+VOLGNUMMER = struct.Struct('<Q')
+STATS = struct.Struct('<IIddd')         # datum, aantal, gem, min, max
+STATUS = struct.Struct('<I')            # Bitmasker van de actieve alarmen
+GENERATIES = struct.Struct('<QQ')       # Database-generatie, historiek-generatie
+
+# Posities binnen de header
+POS_VOLGNUMMER = 16
+POS_STATS_SEQ = 24
+POS_STATS = 32
+POS_STATUS = 64
+POS_GENERATIES = 72
+
+# Volgorde van de bits in het statusmasker (sleutels van de status in de bot)
+STATUS_VLAGGEN = ('onder_50', 'onder_0', 'onder_min_50', 'zeer_laag', 'extreem_laag', 'zeer_hoog')
+
+def standaard_pad():
+    """ Op de Pi in RAM (/dev/shm), op Windows gewoon een bestandje (of LIVE_BUFFER_PAD als dat gezet is). """
+    if config.LIVE_BUFFER_PAD:
+        return config.LIVE_BUFFER_PAD
+    return '/dev/shm/energy_live.ring' if os.path.exists('/dev/shm') else 'energy_live.ring'
+
+def datum_als_getal(datum_str):
+    """ '2024-05-01' -> 20240501 """
+    return int(datum_str.replace('-', ''))
+
+class LiveBufferSchrijver:
+    """ Wordt gebruikt door de BOT (de enige schrijver). """
+
+    def __init__(self, pad=None, capaciteit=None):
+        self.pad = pad or standaard_pad()
+        self.capaciteit = capaciteit or config.LIVE_BUFFER_CAPACITEIT
+        grootte = HEADER_GROOTTE + self.capaciteit * RECORD.size
+
+        # Bestaat de buffer al (bv. na een herstart van de bot), dan gaan we
+        # verder met hetzelfde volgnummer zodat lezers niets missen.
+        bestaat = os.path.exists(self.pad) and os.path.getsize(self.pad) == grootte
+        if bestaat:
+            self.bestand = open(self.pad, 'r+b')
+        else:
+            # Een nieuwe ring NOOIT in de plaats van de oude inkorten of vergroten:
+            # een lezer die de oude nog gemapt heeft, krijgt dan een SIGBUS. We
+            # bouwen hem naast de oude op en zetten hem er met os.replace overheen;
+            # de lezer houdt zijn (geldige) oude mapping tot hij opnieuw opent.
+            tijdelijk = self.pad + '.nieuw'
+            self.bestand = open(tijdelijk, 'w+b')
+            self.bestand.truncate(grootte)
+        self.mm = mmap.mmap(self.bestand.fileno(), grootte)
+
+        magic, capaciteit, recordgrootte, volgnummer = HEADER.unpack_from(self.mm, 0)[:4]
+        if magic != MAGIC or capaciteit != self.capaciteit or recordgrootte != RECORD.size:
+            self.mm[:] = bytes(grootte)
+            HEADER.pack_into(self.mm, 0, MAGIC, self.capaciteit, RECORD.size, 0, 0, 0, 0, 0.0, 0.0, 0.0)
+            # Generaties starten bij de huidige tijd: na een herstart (lege /dev/shm)
+            # komt een oude generatie zo nooit opnieuw voor.
+            start = int(time.time())
+            GENERATIES.pack_into(self.mm, POS_GENERATIES, start, start)
+            volgnummer = 0
+        if not bestaat:
+            os.replace(tijdelijk, self.pad)
+        self.volgnummer = volgnummer
+        self.stats_seq = VOLGNUMMER.unpack_from(self.mm, POS_STATS_SEQ)[0] & ~1
+        self.generatie_lock = threading.Lock()  # Opslag- en onderhoud-thread verhogen allebei
+
+    def voeg_toe(self, datum_str, tijd_str, prijs):
+        """ Schrijft één minuut-record bij (overschrijft het oudste als de ring vol is). """
+        n = self.volgnummer + 1
+        u, m = tijd_str.split(':')
+        positie = HEADER_GROOTTE + ((n - 1) % self.capaciteit) * RECORD.size
+
+        # Eerst seq oneven (bezig), dan de inhoud, dan seq = 2n (klaar)
+        VOLGNUMMER.pack_into(self.mm, positie, 2 * n - 1)
+        INHOUD.pack_into(self.mm, positie + VOLGNUMMER.size, datum_als_getal(datum_str), int(u) * 60 + int(m), prijs)
+        VOLGNUMMER.pack_into(self.mm, positie, 2 * n)
+
+        # Pas daarna mag de lezer weten dat record n bestaat
+        self.volgnummer = n
+        VOLGNUMMER.pack_into(self.mm, POS_VOLGNUMMER, n)
+
+    def zet_stats(self, datum_str, stats):
+        """ Lopende dagstatistieken (dict van DagStatistiek.als_dict) in de header zetten. """
+        self.stats_seq += 1  # Oneven = bezig met schrijven
+        VOLGNUMMER.pack_into(self.mm, POS_STATS_SEQ, self.stats_seq)
+        STATS.pack_into(self.mm, POS_STATS, datum_als_getal(datum_str), stats['aantal'],
+                        stats['gem'] or 0.0, stats['min'] or 0.0, stats['max'] or 0.0)
+        self.stats_seq += 1
+        VOLGNUMMER.pack_into(self.mm, POS_STATS_SEQ, self.stats_seq)
+
+    def zet_status(self, status):
+        """ Actieve alarmen (dict vlag -> bool) als bitmasker in de header (één 4-byte schrijfactie). """
+        masker = sum(1 << i for i, vlag in enumerate(STATUS_VLAGGEN) if status.get(vlag))
+        STATUS.pack_into(self.mm, POS_STATUS, masker)
+
+    def verhoog_generatie(self, historiek=False):
+        """
+        Na elke schrijfactie in de database. De webserver gebruikt de generaties
+        om zijn cache ongeldig te maken:
+        - generatie           : elke schrijfactie (lopende dag/maand/jaar)
+        - historiek-generatie : enkel als afgesloten periodes wijzigen (opruimen,
+                                de laatste flush van gisteren, ...)
+        """
+        with self.generatie_lock:
+            generatie, historiek_generatie = GENERATIES.unpack_from(self.mm, POS_GENERATIES)
+            if historiek:
+                historiek_generatie += 1
+            GENERATIES.pack_into(self.mm, POS_GENERATIES, generatie + 1, historiek_generatie)
+
+    def sluit(self):
+        self.mm.close()
+        self.bestand.close()
+
+class LiveBufferLezer:
+    """
+    Wordt gebruikt door de WEBSERVER. Onthoudt welk record hij laatst gelezen
+    heeft en geeft bij elke oproep enkel de nieuwere records terug.
+    """
+
+    def __init__(self, pad=None):
+        self.pad = pad or standaard_pad()
+        self.mm = None
+        self.inode = None
+        self.capaciteit = 0
+        self.laatst_gelezen = 0
+
+    def _open(self):
+        if self.mm is not None:
+            try:
+                vervangen = os.stat(self.pad).st_ino != self.inode
+            except FileNotFoundError:
+                vervangen = False  # Even weg: de oude mapping blijft geldig
+            if not vervangen:
+                return True
+            # De bot heeft een nieuwe ring over de oude gezet (os.replace): die openen
+            self.mm.close()
+            self.mm = None
+            self.laatst_gelezen = 0
+        if not os.path.exists(self.pad) or os.path.getsize(self.pad) < HEADER_GROOTTE:
+            return False
+        with open(self.pad, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.inode = os.fstat(f.fileno()).st_ino
+        magic, self.capaciteit, recordgrootte = HEADER.unpack_from(self.mm, 0)[:3]
+        if magic != MAGIC or recordgrootte != RECORD.size:
+            self.mm.close()
+            self.mm = None
+            return False
+        return True
+
+    def nieuwe_records(self):
+        """ Lijst van (datum JJJJMMDD, minuut van de dag, prijs) sinds de vorige oproep. """
+        if not self._open():
+            return []
+
+        magic, capaciteit = HEADER.unpack_from(self.mm, 0)[:2]
+        if magic != MAGIC or capaciteit != self.capaciteit:
+            # De bot heeft de ring opnieuw aangemaakt (andere grootte of versie)
+            self.mm.close()
+            self.mm = None
+            self.laatst_gelezen = 0
+            if not self._open():
+                return []
+
+        volgnummer = VOLGNUMMER.unpack_from(self.mm, POS_VOLGNUMMER)[0]
+        if volgnummer < self.laatst_gelezen:
+            # De buffer is opnieuw aangemaakt: van voren af aan lezen
+            self.laatst_gelezen = 0
+        start = max(self.laatst_gelezen, volgnummer - self.capaciteit) + 1
+
+        records = []
+        for n in range(start, volgnummer + 1):
+            positie = HEADER_GROOTTE + ((n - 1) % self.capaciteit) * RECORD.size
+            if VOLGNUMMER.unpack_from(self.mm, positie)[0] != 2 * n:
+                continue  # Al overschreven (de lezer was te traag)
+            datum, minuut, prijs = INHOUD.unpack_from(self.mm, positie + VOLGNUMMER.size)
+            if VOLGNUMMER.unpack_from(self.mm, positie)[0] == 2 * n:
+                records.append((datum, minuut, prijs))
+        self.laatst_gelezen = volgnummer
+        return records
+
+    def stats(self):
+        """ Lopende dagstatistieken uit de header, of None. """
+        if not self._open():
+            return None
+        for _ in range(100):
+            seq1 = VOLGNUMMER.unpack_from(self.mm, POS_STATS_SEQ)[0]
+            if seq1 % 2:
+                continue  # De bot is net aan het schrijven
+            datum, aantal, gem, laagste, hoogste = STATS.unpack_from(self.mm, POS_STATS)
+            if VOLGNUMMER.unpack_from(self.mm, POS_STATS_SEQ)[0] == seq1:
+                if not aantal:
+                    return None
+                return {'datum': datum, 'aantal': aantal, 'gem': gem, 'min': laagste, 'max': hoogste}
+        return None
+
+    def status(self):
+        """ Lijst van de actieve alarmen (in de volgorde van STATUS_VLAGGEN), of None. """
+        if not self._open():
+            return None
+        masker = STATUS.unpack_from(self.mm, POS_STATUS)[0]
+        return [vlag for i, vlag in enumerate(STATUS_VLAGGEN) if masker & (1 << i)]
+
+    def versie(self):
+        """ (generatie, historiek-generatie, volgnummer) van de bot, of None zonder ring. """
+        if not self._open():
+            return None
+        generatie, historiek_generatie = GENERATIES.unpack_from(self.mm, POS_GENERATIES)
+        return generatie, historiek_generatie, VOLGNUMMER.unpack_from(self.mm, POS_VOLGNUMMER)[0]
@@ -0,0 +1,213 @@
+import os
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =============================================================================
+# METRIEKEN (PROMETHEUS-TEKSTFORMAAT, ZONDER EXTRA BIBLIOTHEEK)
+# =============================================================================
+#
+# Elk proces (de bot, de webserver) heeft één register. Een module maakt zijn
+# metrieken bij het importeren aan met teller(), meter() of histogram() en
+# werkt ze bij op het hete pad; als_tekst() geeft alles in het formaat dat
+# Prometheus (en Grafana, VictoriaMetrics, ...) rechtstreeks kan lezen.
+#
+# Labels zijn vaste namen per metriek; de waarden geef je mee als keywords:
+#     elia_aanroep.observeer(0.12, resultaat='nieuw')
+
+LATENTIE_EMMERS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SNELLE_EMMERS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 1e-2)  # Voor stappen in het geheugen
+
+def _ontsnap(waarde):
+    """ Labelwaarde zoals het tekstformaat ze wil: \\, \" en \\n ontsnapt. """
+    return str(waarde).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_tekst(namen, waarden, extra=''):
+    delen = [f'{naam}="{_ontsnap(waarde)}"' for naam, waarde in zip(namen, waarden)]
+    if extra:
+        delen.append(extra)
+    return '{' + ','.join(delen) + '}' if delen else ''
+
+def _getal(waarde):
+    if waarde == float('inf'):
+        return '+Inf'
+    return repr(float(waarde)) if isinstance(waarde, float) else str(waarde)
+
+class _Metriek:
+    """
+    Basis van een metriek. Met 'functie' wordt de waarde pas bij het
+    uitlezen berekend (bv. uit tellers die een klasse al bijhoudt): die geeft
+    een getal terug, of (met labels) een dict {tuple van labelwaarden: getal}.
+    """
+    soort = None
+
+    def __init__(self, naam, uitleg, labels=(), functie=None):
+        self.naam = naam
+        self.uitleg = uitleg
+        self.labels = tuple(labels)
+        self.functie = functie
+        self.reeksen = {}  # Tuple van labelwaarden -> waarde(s)
+        self.lock = threading.Lock()
+
+    def _sleutel(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.naam}: labels {sorted(labels)} horen {list(self.labels)} te zijn")
+        return tuple(labels[naam] for naam in self.labels)
+
+    def _waarden(self):
+        if self.functie is not None:
+            waarden = self.functie()
+            return waarden if self.labels else {(): waarden}
+        with self.lock:
+            return dict(self.reeksen)
+
+    def regels(self):
+        return [f"{self.naam}{_label_tekst(self.labels, s)} {_getal(w)}"
+                for s, w in self._waarden().items() if w is not None]
+
+    def als_tekst(self):
+        return '\n'.join([f"# HELP {self.naam} {self.uitleg}", f"# TYPE {self.naam} {self.soort}", *self.regels()])
+
+class Teller(_Metriek):
+    """ Telt enkel op (aantal aanroepen, fouten, ...). """
+    soort = 'counter'
+
+    def verhoog(self, waarde=1, **labels):
+        sleutel = self._sleutel(labels)
+        with self.lock:
+            self.reeksen[sleutel] = self.reeksen.get(sleutel, 0) + waarde
+
+class Meter(_Metriek):
+    """ Een momentopname (wachtrij-lengte, geheugen, ...). """
+    soort = 'gauge'
+
+    def zet(self, waarde, **labels):
+        sleutel = self._sleutel(labels)
+        with self.lock:
+            self.reeksen[sleutel] = waarde
+
+class Histogram(_Metriek):
+    """ Verdeling van metingen (duur, aantal rijen, ...) over vaste emmers. """
+    soort = 'histogram'
+
+    def __init__(self, naam, uitleg, labels=(), emmers=LATENTIE_EMMERS):
+        super().__init__(naam, uitleg, labels)
+        self.emmers = tuple(sorted(emmers))
+
+    def observeer(self, waarde, **labels):
+        sleutel = self._sleutel(labels)
+        index = bisect_left(self.emmers, waarde)  # Eerste emmer met grens >= waarde ('le')
+        with self.lock:
+            reeks = self.reeksen.get(sleutel)
+            if reeks is None:
+                reeks = self.reeksen[sleutel] = [[0] * (len(self.emmers) + 1), 0.0, 0]
+            reeks[0][index] += 1
+            reeks[1] += waarde
+            reeks[2] += 1
+
+    @contextmanager
+    def meet(self, **labels):
+        """ with histogram.meet(...): de duur van het blok (in seconden) wordt geobserveerd. """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observeer(time.perf_counter() - start, **labels)
+
+    def regels(self):
+        regels = []
+        with self.lock:
+            for sleutel, (aantallen, som, aantal) in self.reeksen.items():
+                cumulatief = 0
+                for grens, n in zip((*self.emmers, float('inf')), aantallen):
+                    cumulatief += n
+                    le = f'le="{_getal(grens)}"'
+                    regels.append(f"{self.naam}_bucket{_label_tekst(self.labels, sleutel, le)} {cumulatief}")
+                regels.append(f"{self.naam}_sum{_label_tekst(self.labels, sleutel)} {_getal(som)}")
+                regels.append(f"{self.naam}_count{_label_tekst(self.labels, sleutel)} {aantal}")
+        return regels
+
+# =============================================================================
+# REGISTER (ÉÉN PER PROCES)
+# =============================================================================
+
+_register = {}
+_register_lock = threading.Lock()
+
+def _registreer(metriek):
+    with _register_lock:
+        bestaand = _register.get(metriek.naam)
+        if bestaand is not None:
+            return bestaand  # Module twee keer geïmporteerd (bv. __main__): dezelfde metriek houden
+        _register[metriek.naam] = metriek
+        return metriek
+
+def teller(naam, uitleg, labels=(), functie=None):
+    return _registreer(Teller(naam, uitleg, labels, functie))
+
+def meter(naam, uitleg, labels=(), functie=None):
+    return _registreer(Meter(naam, uitleg, labels, functie))
+
+def histogram(naam, uitleg, labels=(), emmers=LATENTIE_EMMERS):
+    return _registreer(Histogram(naam, uitleg, labels, emmers))
+
+def als_tekst():
+    """ Alle metrieken van dit proces (Prometheus text format 0.0.4). """
+    with _register_lock:
+        metrieken = list(_register.values())
+    return '\n'.join(metriek.als_tekst() for metriek in metrieken) + '\n'
+
+INHOUDSTYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# --- Geheugen van het proces (elk proces) ---
+
+def rss_bytes():
+    """ Huidig werkgeheugen (Linux: /proc/self/statm), anders het maximum tot nu toe (None op Windows). """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+meter('proces_rss_bytes', "Werkgeheugen (RSS) van dit proces", functie=rss_bytes)
+teller('proces_cpu_seconds_total', "CPU-tijd (user + system) van dit proces",
+       functie=lambda: sum(os.times()[:2]))
+
+# =============================================================================
+# KLEINE HTTP-SERVER (VOOR DE BOT)
+# =============================================================================
+
+class _MetriekenHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        inhoud = als_tekst().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', INHOUDSTYPE)
+        self.send_header('Content-Length', str(len(inhoud)))
+        self.end_headers()
+        self.wfile.write(inhoud)
+
+    def log_message(self, *args):
+        pass  # Geen logregel per scrape
+
+def start_server(poort, adres='127.0.0.1'):
+    """ Start /metrics op adres:poort in een achtergrond-thread. Geeft de server terug (of None). """
+    try:
+        server = ThreadingHTTPServer((adres, poort), _MetriekenHandler)
+    except OSError as e:
+        logging.error(f"❌ Metrieken-server niet gestart op {adres}:{poort}: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrieken', daemon=True).start()
+    logging.info(f"📈 Metrieken op http://{adres}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,183 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+import config
+
+# =============================================================================
+# PERSOONLIJKE ALARMEN (GESORTEERDE INDEX)
+# =============================================================================
+
+class PersoonlijkeAlarmen:
+    """
+    De alarmen van alle abonnees ('onder -20', 'boven 300', ...) met hun
+    hysteresis-toestand, zo opgeslagen dat een nieuwe prijs enkel de alarmen
+    bekijkt waarvan een grens tussen de vorige en de nieuwe prijs ligt.
+
+    Elk alarm heeft twee punten: waar het afgaat (de grens) en waar het
+    terug klaarstaat (de grens + of - ALARM_MARGE). Die punten staan in vier
+    gesorteerde arrays (onder/boven x afgaan/herstel). Een prijsbeweging is
+    dan twee bisects per array + de k alarmen in dat bereik: O(log n + k),
+    in plaats van alle abonnees te overlopen.
+
+    De toestand (afgegaan of niet) is één byte per alarm.
+    """
+
+    def __init__(self, marge=None):
+        self.marge = config.ALARM_MARGE if marge is None else marge
+        self.lock = threading.Lock()
+        self.vorige_prijs = None  # None = de volgende prijs controleert alles (na het opstarten)
+
+        # Alarm-nummer -> (chat_id, richting, grens); vrijgekomen nummers worden hergebruikt
+        self.alarmen = []
+        self.actief = bytearray()
+        self.vrij = []
+        self.per_chat = {}  # chat_id -> {alarm-nummer, ...}
+
+        # Gesorteerde punten: (richting, soort) -> (punten, alarm-nummers)
+        self.index = {(richting, soort): (array('d'), array('q'))
+                      for richting in ('onder', 'boven') for soort in ('af', 'herstel')}
+
+    # --- Hulpjes ---
+
+    def _punten_van(self, richting, grens):
+        """ Waar het alarm afgaat en waar het terug klaarstaat. """
+        if richting == 'onder':
+            return grens, grens + self.marge
+        return grens, grens - self.marge
+
+    def _zet_in_index(self, nummer):
+        _, richting, grens = self.alarmen[nummer]
+        for soort, punt in zip(('af', 'herstel'), self._punten_van(richting, grens)):
+            punten, nummers = self.index[(richting, soort)]
+            positie = bisect_right(punten, punt)
+            punten.insert(positie, punt)
+            nummers.insert(positie, nummer)
+
+    def _haal_uit_index(self, nummer):
+        _, richting, grens = self.alarmen[nummer]
+        for soort, punt in zip(('af', 'herstel'), self._punten_van(richting, grens)):
+            punten, nummers = self.index[(richting, soort)]
+            positie = bisect_left(punten, punt)
+            while nummers[positie] != nummer:
+                positie += 1
+            del punten[positie]
+            del nummers[positie]
+
+    def _evalueer(self, nummer, prijs):
+        """ De regel voor één alarm. Geeft True (afgegaan), False (hersteld) of None (niets). """
+        _, richting, grens = self.alarmen[nummer]
+        af, herstel = self._punten_van(richting, grens)
+        if richting == 'onder':
+            if not self.actief[nummer] and prijs < af:
+                return True
+            if self.actief[nummer] and prijs >= herstel:
+                return False
+        else:
+            if not self.actief[nummer] and prijs > af:
+                return True
+            if self.actief[nummer] and prijs <= herstel:
+                return False
+        return None
+
+    @staticmethod
+    def _bereik(punten, nummers, van, tot, links):
+        """ Alarm-nummers met een punt in (van, tot] (links=False) of [van, tot) (links=True). """
+        zoek = bisect_left if links else bisect_right
+        return nummers[zoek(punten, van):zoek(punten, tot)]
+
+    # --- Beheer (vanuit de commando's) ---
+
+    def laad(self, rijen):
+        """ Bij het opstarten: [(chat_id, richting, grens, actief), ...] uit de database. """
+        for chat_id, richting, grens, actief in rijen:
+            self.voeg_toe(chat_id, richting, grens, actief=bool(actief))
+
+    def voeg_toe(self, chat_id, richting, grens, actief=None):
+        """
+        Voegt een alarm toe. Zonder 'actief' bepalen we de toestand met de
+        laatste prijs: staat die al voorbij de grens, dan is het alarm meteen
+        afgegaan. Geeft die toestand terug (None als het alarm al bestond).
+        """
+        with self.lock:
+            if self._vind(chat_id, richting, grens) is not None:
+                return None
+            if actief is None:
+                af, _ = self._punten_van(richting, grens)
+                prijs = self.vorige_prijs
+                actief = prijs is not None and (prijs < af if richting == 'onder' else prijs > af)
+
+            if self.vrij:
+                nummer = self.vrij.pop()
+                self.alarmen[nummer] = (chat_id, richting, grens)
+                self.actief[nummer] = actief
+            else:
+                nummer = len(self.alarmen)
+                self.alarmen.append((chat_id, richting, grens))
+                self.actief.append(actief)
+            self.per_chat.setdefault(chat_id, set()).add(nummer)
+            self._zet_in_index(nummer)
+            return actief
+
+    def verwijder(self, chat_id, richting=None, grens=None):
+        """ Eén alarm, of (zonder richting/grens) alle alarmen van een chat. Geeft het aantal terug. """
+        with self.lock:
+            nummers = [n for n in self.per_chat.get(chat_id, ())
+                       if richting is None or self.alarmen[n][1:] == (richting, grens)]
+            for nummer in nummers:
+                self._haal_uit_index(nummer)
+                self.per_chat[chat_id].discard(nummer)
+                self.alarmen[nummer] = None
+                self.actief[nummer] = 0
+                self.vrij.append(nummer)
+            if not self.per_chat.get(chat_id):
+                self.per_chat.pop(chat_id, None)
+            return len(nummers)
+
+    def _vind(self, chat_id, richting, grens):
+        for nummer in self.per_chat.get(chat_id, ()):
+            if self.alarmen[nummer][1:] == (richting, grens):
+                return nummer
+        return None
+
+    def van_chat(self, chat_id):
+        """ [(richting, grens, actief), ...] van één chat, gesorteerd. """
+        with self.lock:
+            return sorted((self.alarmen[n][1], self.alarmen[n][2], bool(self.actief[n]))
+                          for n in self.per_chat.get(chat_id, ()))
+
+    def __len__(self):
+        return len(self.alarmen) - len(self.vrij)
+
+    # --- Per prijs (vanuit de evaluatie-stap) ---
+
+    def verwerk(self, prijs):
+        """
+        Eén nieuwe prijs. Geeft (afgegaan, wijzigingen) terug:
+        - afgegaan    : [(chat_id, richting, grens), ...] die nu een melding krijgen
+        - wijzigingen : {(chat_id, richting, grens): actief} om te bewaren
+        """
+        with self.lock:
+            vorige, self.vorige_prijs = self.vorige_prijs, prijs
+            if vorige is None:
+                kandidaten = [n for n, alarm in enumerate(self.alarmen) if alarm is not None]
+            elif prijs < vorige:
+                # Dalend: 'onder'-alarmen kunnen afgaan, 'boven'-alarmen terug klaarstaan
+                kandidaten = [*self._bereik(*self.index[('onder', 'af')], prijs, vorige, links=False),
+                              *self._bereik(*self.index[('boven', 'herstel')], prijs, vorige, links=True)]
+            elif prijs > vorige:
+                kandidaten = [*self._bereik(*self.index[('boven', 'af')], vorige, prijs, links=True),
+                              *self._bereik(*self.index[('onder', 'herstel')], vorige, prijs, links=False)]
+            else:
+                return [], {}
+
+            afgegaan, wijzigingen = [], {}
+            for nummer in kandidaten:
+                nieuw = self._evalueer(nummer, prijs)
+                if nieuw is None:
+                    continue
+                self.actief[nummer] = nieuw
+                wijzigingen[self.alarmen[nummer]] = nieuw
+                if nieuw:
+                    afgegaan.append(self.alarmen[nummer])
+            return afgegaan, wijzigingen
@@ -0,0 +1,98 @@
+import logging
+import threading
+from collections import OrderedDict
+
+# =============================================================================
+# BEGRENSDE WACHTRIJ (MET DROP/MERGE BELEID)
+# =============================================================================
+
+class BegrensdeWachtrij:
+    """
+    Een wachtrij met een vaste maximale lengte die NOOIT blokkeert bij het
+    toevoegen. De producent (bv. de prijs-poller) mag dus nooit vertraagd worden
+    door een trage consument.
+
+    - Items met een 'sleutel' worden samengevoegd met een wachtend item met
+      dezelfde sleutel (standaard: het nieuwe item vervangt het oude).
+    - Is de wachtrij vol, dan valt het oudste item weg (en tellen we dat).
+    - Items met vast=True (bv. aangevulde minuten) vallen nooit weg en tellen
+      niet mee voor de maximale lengte. Enkel voor items waarvan de producent
+      zelf het aantal beperkt (hier: één per sleutel).
+    """
+
+    def __init__(self, naam, maxlengte=100):
+        self.naam = naam
+        self.maxlengte = maxlengte
+        self.items = OrderedDict()
+        self.vast = set()  # Sleutels van de items die nooit wegvallen
+        self.volgnummer = 0
+        self.conditie = threading.Condition()
+
+        # Tellers (handig om te zien of een stap het niet bijhoudt)
+        self.aantal_gedropt = 0
+        self.aantal_samengevoegd = 0
+
+    def zet(self, item, sleutel=None, samenvoegen=None, vast=False):
+        """
+        Voegt een item toe. 'samenvoegen(oud, nieuw)' bepaalt hoe een wachtend
+        item met dezelfde sleutel gecombineerd wordt met het nieuwe.
+        """
+        with self.conditie:
+            if sleutel is not None and sleutel in self.items:
+                oud = self.items[sleutel]
+                self.items[sleutel] = samenvoegen(oud, item) if samenvoegen else item
+                self.aantal_samengevoegd += 1
+            else:
+                if not vast and len(self.items) - len(self.vast) >= self.maxlengte:
+                    self._gooi_oudste_weg()
+                if sleutel is None:
+                    self.volgnummer += 1
+                    sleutel = ('_', self.volgnummer)
+                self.items[sleutel] = item
+            if vast:
+                self.vast.add(sleutel)
+            self.conditie.notify()
+
+    def _gooi_oudste_weg(self):
+        """ Het oudste item dat niet vast is (de wachtrij is vol). """
+        for sleutel in self.items:
+            if sleutel not in self.vast:
+                del self.items[sleutel]
+                break
+        self.aantal_gedropt += 1
+        logging.warning(f"⚠️ Wachtrij '{self.naam}' vol: oudste item weggegooid.")
+
+    def haal(self, timeout=None):
+        """ Wacht op het volgende item (FIFO). Geeft None terug bij timeout. """
+        with self.conditie:
+            if not self.items and not self.conditie.wait_for(lambda: self.items, timeout):
+                return None
+            sleutel, item = self.items.popitem(last=False)
+            self.vast.discard(sleutel)
+            return item
+
+    def __len__(self):
+        with self.conditie:
+            return len(self.items)
+
+# =============================================================================
+# STAP (EEN THREAD DIE EEN WACHTRIJ LEEGT)
+# =============================================================================
+
+def start_stap(naam, wachtrij, verwerker):
+    """
+    Start een achtergrond-thread die items uit 'wachtrij' haalt en aan
+    'verwerker' geeft. Een fout in één item stopt de stap niet.
+    """
+    def loop():
+        logging.info(f"🧩 Stap '{naam}' gestart.")
+        while True:
+            item = wachtrij.haal()
+            try:
+                verwerker(item)
+            except Exception as e:
+                logging.error(f"❌ Fout in stap '{naam}': {e}")
+
+    thread = threading.Thread(target=loop, name=naam, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,100 @@
+import time
+import logging
+import statistics
+from collections import deque
+
+import config
+
+class PollPlanner:
+    """
+    Bepaalt WANNEER de poller Elia opnieuw moet bevragen.
+
+    Elia publiceert één waarde per minuut, telkens rond hetzelfde moment in de
+    minuut. De planner leert dat moment (de 'publicatie-offset' in seconden na
+    de minuut) uit de polls waarin een nieuw record opdook, en:
+    - pollt snel (elke POLL_SNEL s) in een klein venster rond dat moment
+    - slaapt de rest van de minuut tot vlak voor het volgende venster
+
+    Alle wachttijden zijn deadlines op de monotone klok, zodat de
+    verwerkingstijd van een poll het ritme niet laat verschuiven.
+    """
+
+    def __init__(self, klok=time.time, monotone_klok=time.monotonic):
+        self.klok = klok
+        self.monotone_klok = monotone_klok
+
+        self.waarnemingen = deque(maxlen=30)  # Geleerde offsets (seconden na de minuut)
+        self.schatting = None                  # Huidige schatting van de offset
+        self.vorige_poll = None                # Wall-clock tijd van de vorige poll
+        self.laatste_nieuw = None              # Wall-clock tijd van het laatste nieuwe record
+
+    # --- Leren ---
+
+    def registreer(self, nieuw):
+        """ Na elke poll oproepen: was er een nieuw record of niet? """
+        nu = self.klok()
+        if nieuw:
+            self._leer(nu)
+            self.laatste_nieuw = nu
+        self.vorige_poll = nu
+
+    def _leer(self, nu):
+        if self.vorige_poll is None:
+            return  # Allereerste poll: het record bestond al, dat zegt niets
+
+        # Het record verscheen ergens tussen de vorige poll en nu.
+        # Is dat interval kort genoeg, dan nemen we het midden als waarneming.
+        interval = nu - self.vorige_poll
+        if interval <= max(config.POLL_OPSTART, config.POLL_TRAAG) + 0.5:
+            moment = (self.vorige_poll + nu) / 2
+        elif self.schatting is not None:
+            # Het record stond er al bij de EERSTE poll van het venster: we waren
+            # te laat. Schuif de schatting naar voren en leer opnieuw.
+            self.waarnemingen.clear()
+            moment = nu - config.POLL_VENSTER_VOOR - config.POLL_SNEL
+        else:
+            return
+
+        offset = moment % 60
+        if self.schatting is not None:
+            # 'Uitvouwen' rond de schatting, zodat 59s en 1s dicht bij elkaar liggen
+            offset += round((self.schatting - offset) / 60) * 60
+        self.waarnemingen.append(offset)
+
+        oude_schatting = self.schatting
+        self.schatting = statistics.median(self.waarnemingen) % 60
+        if oude_schatting is None:
+            logging.info(f"🕰️ Planner: Elia publiceert rond {self.schatting:.0f}s na de minuut.")
+
+    # --- Plannen ---
+
+    def volgende_deadline(self):
+        """ Monotone tijd waarop de volgende poll moet gebeuren. """
+        nu = self.klok()
+        return self.monotone_klok() + (self._volgende_poll(nu) - nu)
+
+    def _volgende_poll(self, nu):
+        if self.schatting is None:
+            # Nog niets geleerd: regelmatig pollen tot we het moment kennen
+            return nu + config.POLL_OPSTART
+
+        # Het eerstvolgende verwachte publicatiemoment dat we nog niet gezien hebben.
+        # (Twee records liggen een minuut uit elkaar: alles binnen 30s na het
+        # laatste nieuwe record hoort nog bij dat record.)
+        ondergrens = (self.laatste_nieuw or 0) + 30
+        verwacht = (nu // 60) * 60 + self.schatting - 60
+        while verwacht <= ondergrens:
+            verwacht += 60
+
+        if nu < verwacht - config.POLL_VENSTER_VOOR:
+            return verwacht - config.POLL_VENSTER_VOOR
+        if nu < verwacht + config.POLL_VENSTER_NA:
+            return nu + config.POLL_SNEL
+        # Te laat dit keer: rustiger verder pollen tot het record er toch is
+        return nu + config.POLL_TRAAG
+
+def slaap_tot(deadline, monotone_klok=time.monotonic, slaap=time.sleep):
+    """ Slaapt tot een deadline op de monotone klok (niet: een vaste duur). """
+    rest = deadline - monotone_klok()
+    if rest > 0:
+        slaap(rest)
@@ -2,25 +2,33 @@ import os
 import time
 import logging
 import threading
-import io
-import statistics
-import json
+from functools import partial
+from concurrent.futures import wait
 from datetime import datetime, date, timedelta
 
 # Externe bibliotheken
 import requests
 import pytz
-import matplotlib
 from dotenv import load_dotenv
 
 # Importeer je aparte database bestand
 import database_manager
 import config
-
-# Matplotlib instellingen (grafieken zonder scherm)
-matplotlib.use('Agg') 
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import metrieken
+from telegram_verzender import TelegramVerzender
+from commando_verdeler import CommandoVerdeler
+from pijplijn import BegrensdeWachtrij, start_stap
+from dagstatistiek import DagStatistiek
+from dagreeks import DagReeks
+from drempelmotor import DrempelMotor
+from persoonlijke_alarmen import PersoonlijkeAlarmen
+from elia_api import EliaClient, LaatstePrijs
+from aanvuller import GatenAanvuller
+from planner import PollPlanner, slaap_tot
+from klok import SysteemKlok
+from live_buffer import LiveBufferSchrijver
+from grafiekcache import GrafiekCache
+from grafiek_werker import GrafiekWerker
 
 # =============================================================================
 # 1. CONFIGURATIE & INSTELLINGEN
@@ -48,17 +56,85 @@ TELEGRAM_CHAT_IDS = [id.strip() for id in TELEGRAM_CHAT_IDS_RAW.split(",") if id
 BELGIUM_TZ = pytz.timezone('Europe/Brussels')
 session = requests.Session()
 
+# Elia: enkel het nieuwste record, met conditionele requests (ETag / Last-Modified)
+elia = EliaClient(ELIA_API_URL, session, BELGIUM_TZ)
+
+# Laatste prijs van de poller, gedeeld met /price (hoogstens één aanroep naar Elia tegelijk)
+gedeelde_prijs = LaatstePrijs(elia.haal_laatste)
+
+# Gemiste minuten (bot uit, Elia onbereikbaar) achteraf ophalen uit de Elia-historiek
+aanvuller = GatenAanvuller(elia)
+aanvullen_nodig = threading.Event()  # Gezet bij het opstarten en zodra de evaluatie een gat ziet
+
+# Uitgaande berichten lopen via een werkerpool (alle chats tegelijk, met rate limits)
+verzender = TelegramVerzender(TELEGRAM_BOT_TOKEN, session)
+
+# Inkomende commando's lopen via een eigen werkerpool (per chat in volgorde)
+commandos = CommandoVerdeler()
+
 # =============================================================================
 # 2. GLOBALE VARIABELEN (OPSLAG)
 # =============================================================================
 
 buffer_voor_db = []     # Buffer voor bulk opslag in DB
-history_prices = []     # Opslag voor prijzen (Y-as)
-history_times = []      # Opslag voor tijden (X-as)
-history_negatief_count = 0
-history_duur_count = 0
 laatste_datum = datetime.now(BELGIUM_TZ).date()
+history = DagReeks(laatste_datum)  # Minuut-prijzen van vandaag (compact: array van minuten + prijzen)
+dag_stats = DagStatistiek()  # Lopende min/max/gem/mediaan + tellers van vandaag
+werkgeheugen_lock = threading.Lock()  # history + dag_stats worden samen vervangen (zie vervang_werkgeheugen)
 dagrapport_verstuurd = False 
+drempels = DrempelMotor()  # Alarmgrenzen (bandentabel uit drempelmotor.py, grenzen uit config.py)
+persoonlijke_alarmen = PersoonlijkeAlarmen()  # /alarm van de abonnees (geladen uit de DB bij het opstarten)
+
+# --- PIJPLIJN ---
+# De poller doet niets anders dan ophalen; de rest gebeurt in aparte stappen.
+# Geen enkele wachtrij blokkeert de producent: vol = oudste item weg.
+prijs_wachtrij = BegrensdeWachtrij('prijzen', maxlengte=100)      # poller -> evaluatie
+meldingen_wachtrij = BegrensdeWachtrij('meldingen', maxlengte=50) # evaluatie -> Telegram
+opslag_wachtrij = BegrensdeWachtrij('opslag', maxlengte=10)       # evaluatie -> SQLite
+live_wachtrij = BegrensdeWachtrij('live', maxlengte=100)          # evaluatie -> RAM-buffer
+live_buffer = None  # LiveBufferSchrijver, wordt aangemaakt bij het starten van de pijplijn
+
+# Laatste grafiek (PNG + Telegram file_id), opnieuw getekend bij een nieuw kwartier-punt
+grafiek_cache = GrafiekCache()
+grafiek_werker = GrafiekWerker()  # Apart proces met matplotlib (de bot zelf laadt het niet)
+
+# --- METRIEKEN ---
+# Zie metrieken.py; de bot toont ze op METRIEKEN_POORT (/metrics).
+DB_FLUSH_DUUR = metrieken.histogram('db_flush_seconds', "Duur van sla_buffer_en_dag_op")
+DB_FLUSH_RIJEN = metrieken.histogram('db_flush_rijen', "Aantal minuten per flush naar SQLite",
+                                     emmers=(1, 5, 15, 30, 60, 120, 240, 720, 1440))
+LIVE_SCHRIJVEN = metrieken.histogram('live_buffer_schrijven_seconds', "Duur van een schrijfstap in de live buffer",
+                                     ('soort',), emmers=metrieken.SNELLE_EMMERS)
+GRAFIEK_RENDER = metrieken.histogram('grafiek_render_seconds', "Duur van een grafiek (werkerproces, heen en terug)",
+                                     emmers=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+metrieken.meter('geschiedenis_minuten', "Minuten van vandaag in het geheugen", functie=lambda: len(werkgeheugen()[0]))
+metrieken.meter('geschiedenis_bytes', "Geheugen van de arrays met de minuten van vandaag",
+                functie=lambda: (lambda reeks: len(reeks.minuten) * reeks.minuten.itemsize +
+                                 len(reeks.prijzen) * reeks.prijzen.itemsize)(werkgeheugen()[0]))
+_WACHTRIJEN = (prijs_wachtrij, meldingen_wachtrij, opslag_wachtrij, live_wachtrij)
+metrieken.meter('wachtrij_lengte', "Wachtende items per pijplijn-wachtrij", ('wachtrij',),
+                functie=lambda: {(w.naam,): len(w) for w in _WACHTRIJEN})
+metrieken.teller('wachtrij_gedropt_total', "Weggegooide items (wachtrij vol)", ('wachtrij',),
+                 functie=lambda: {(w.naam,): w.aantal_gedropt for w in _WACHTRIJEN})
+
+def werkgeheugen():
+    """
+    De reeks en de dagstats van vandaag als één paar. Lezers (commando's,
+    aanvullen, metrieken) werken met dit paar en nooit rechtstreeks met de
+    globals: die kunnen intussen door de evaluatie-stap vervangen worden.
+    """
+    with werkgeheugen_lock:
+        return history, dag_stats
+
+def vervang_werkgeheugen(reeks, stats):
+    """
+    Zet een nieuwe reeks + dagstats in één keer in de plaats van de oude
+    (nieuwe dag, aanvulling). Zo ziet een lezer nooit een halve dag of een
+    gereset dag_stats. Enkel de evaluatie-stap (en main) roepen dit op.
+    """
+    global history, dag_stats
+    with werkgeheugen_lock:
+        history, dag_stats = reeks, stats
 
 # =============================================================================
 # 3. TELEGRAM FUNCTIES
@@ -68,130 +144,122 @@ def stuur_telegram_bericht(bericht, chat_id, retries=3):
     """
     Stuurt een tekstbericht naar een specifieke Telegram-gebruiker.
     Inclusief 'retry' mechanisme als het even niet lukt.
+    Blokkeert tot het bericht weg is (handig voor antwoorden op commando's).
     """
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {"text": bericht, "chat_id": chat_id, "parse_mode": "HTML"}
-    backoff = 2
-    
-    for attempt in range(retries):
-        try:
-            # logging.debug(f"Poging {attempt+1}: Verstuur bericht naar {chat_id}")
-            response = session.post(url, json=payload, timeout=10)
-            response.raise_for_status() # Geeft een fout als de statuscode niet 200 is
-            
-            logging.info(f"✅ Bericht verzonden naar {chat_id}")
-            break
-        except requests.exceptions.RequestException as e:
-            logging.error(f"❌ Fout bij verzenden bericht (poging {attempt+1}): {e}")
-            if attempt < retries - 1:
-                time.sleep(backoff)
-                backoff *= 2
-
-def stuur_telegram_foto(photo_buffer, chat_id):
-    """ Stuurt een afbeelding (grafiek) naar Telegram """
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-    
-    # We sturen de buffer als een bestand
-    files = {'photo': ('grafiek.png', photo_buffer, 'image/png')}
-    data = {'chat_id': chat_id}
-    
-    try:
-        response = session.post(url, data=data, files=files, timeout=20)
-        response.raise_for_status()
-        logging.info(f"📸 Grafiek verzonden naar {chat_id}")
-    except requests.exceptions.RequestException as e:
-        logging.error(f"❌ Fout bij sturen foto: {e}")
+    return verzender.stuur_bericht(bericht, chat_id, retries)
+
+def stuur_naar_iedereen(bericht):
+    """ Zet een bericht voor alle chats in de meldingen-wachtrij (niet blokkerend). """
+    meldingen_wachtrij.zet(lambda: verzender.verdeel_bericht(bericht, TELEGRAM_CHAT_IDS))
+
+def verwerk_melding(taak):
+    """
+    Stap 'meldingen': voert een verzendtaak uit en wacht tot alle chats klaar
+    zijn. Zo stapelt een Telegram-storing zich op in de (begrensde) wachtrij
+    in plaats van in het geheugen van de werkerpool.
+    """
+    futures = taak()
+    if futures:
+        wait(futures)
 
 # =============================================================================
 # 4. DATA & GRAFIEK GENERATIE
 # =============================================================================
 
-def doe_http_aanroep(url, retries=3, timeout=10):
-    """ Haalt data op van de Elia API met foutafhandeling. """
-    for attempt in range(retries):
-        try:
-            response = session.get(url, timeout=timeout)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logging.error(f"❌ API Fout (poging {attempt+1}): {e}")
-            if attempt < retries - 1:
-                time.sleep(5)
-    return None
-
-def genereer_grafiek_afbeelding():
-    if len(history_prices) < 2:
-        return None
+def grafiek_versie():
+    """
+    Geeft (kwartier-punten, sleutel) voor de grafiek van vandaag. De sleutel
+    is het laatste settlement-punt: die wijzigt enkel als er een nieuw
+    kwartier bijkomt. Sleutel None = te weinig data voor een grafiek.
+    """
+    reeks, _ = werkgeheugen()
+    if len(reeks) < 2:
+        return None, None
+
+    # De strenge filter: Alleen xx:14, xx:29, xx:44, xx:59 (zonder dubbele minuten)
+    kwartieren = reeks.kwartier_punten()
+
+    # Check: Hebben we na het filteren wel genoeg punten voor een lijn?
+    if len(kwartieren) < 2:
+        logging.info(f"Grafiek: Wel data, maar na filteren nog te weinig kwartier-punten ({len(kwartieren)}). Even geduld.")
+        return kwartieren, None
+    return kwartieren, (kwartieren.datum, len(kwartieren), kwartieren.minuten[-1], kwartieren.prijzen[-1])
 
+def genereer_grafiek_afbeelding(kwartieren):
+    """
+    Laat de kwartier-punten tekenen door het grafiek-werkerproces en geeft
+    de PNG (bytes) terug. Enkel deze (aanroepende) thread wacht erop.
+    """
     try:
-        plot_times = []
-        plot_prices = []
-        
-        # We maken een tijdelijke dictionary om dubbele punten in dezelfde minuut te voorkomen
-        # Key = "14:14", Value = (tijd, prijs)
-        unieke_punten = {}
-
-        for t, p in zip(history_times, history_prices):
-            # De strenge filter: Alleen xx:14, xx:29, xx:44, xx:59
-            if t.minute % 15 == 14:
-                tijd_key = t.strftime('%H:%M')
-                unieke_punten[tijd_key] = (t, p)
-
-        # Nu de gefilterde punten weer in een lijst zetten
-        for key in unieke_punten:
-            t, p = unieke_punten[key]
-            plot_times.append(t)
-            plot_prices.append(p)
-
-        # Check: Hebben we na het filteren wel genoeg punten voor een lijn?
-        if len(plot_prices) < 2:
-            logging.info(f"Grafiek: Wel data, maar na filteren nog te weinig kwartier-punten ({len(plot_prices)}). Even geduld.")
-            return None
-        
-        # --- De rest is standaard grafiek code ---
-        plt.figure(figsize=(10, 5))
-        plt.plot(plot_times, plot_prices, color='blue', linewidth=2, marker='o', markersize=4)
-        
         titel_datum = datetime.now(BELGIUM_TZ).strftime('%d-%m-%Y')
-        plt.title(f"Settlement Prijzen ({titel_datum})")
-        plt.ylabel("Prijs (€\\MWh)")
-        plt.grid(True, linestyle='--', alpha=0.7)
-        
-        # X-as formateren (Tijd)
-        plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%H:%M', tz=BELGIUM_TZ))
-        plt.gcf().autofmt_xdate()
-        plt.axhline(0, color='red', linewidth=1, linestyle='-') # Rode lijn op 0
-
-        # Opslaan in buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', bbox_inches='tight')
-        plt.close()
-        buf.seek(0)
-        return buf
+        with GRAFIEK_RENDER.meet():
+            toekomst = grafiek_werker.teken(kwartieren.datum.toordinal(), kwartieren.minuten, kwartieren.prijzen,
+                                            f"Settlement Prijzen ({titel_datum})")
+            return grafiek_werker.wacht(toekomst, config.GRAFIEK_TIMEOUT)
 
     except Exception as e:
         logging.error(f"Fout in grafiek generatie: {e}")
         return None
 
+def stuur_grafiek(chat_id, versie=None):
+    """
+    Stuurt de grafiek naar één chat via de cache: geen nieuwe render zolang
+    er geen nieuw kwartier-punt is, en na de eerste upload enkel nog de
+    file_id van Telegram. Geeft None terug als er (nog) te weinig data is
+    voor een grafiek, anders True/False (verstuurd of niet: render of
+    Telegram mislukt).
+    """
+    kwartieren, sleutel = versie or grafiek_versie()
+    if sleutel is None:
+        return None
+    return grafiek_cache.stuur(sleutel, lambda: genereer_grafiek_afbeelding(kwartieren), chat_id, verzender)
+
 def genereer_dag_samenvatting():
-    """ Berekent statistieken (min, max, gem) voor het dagoverzicht. """
-    global history_negatief_count, history_duur_count
-    
-    if not history_prices:
+    """ Geeft de statistieken (min, max, gem) voor het dagoverzicht (uit de lopende stats). """
+    # Eén momentopname: de evaluatie-stap kan intussen een meting toevoegen
+    aantal, laagste, hoogste, gemiddelde, aantal_negatief, aantal_duur = werkgeheugen()[1].momentopname()
+    if not aantal:
         return "📉 Nog geen metingen verzameld vandaag."
     
-    laagste = round(min(history_prices))
-    hoogste = round(max(history_prices))
-    gemiddelde = round(sum(history_prices) / len(history_prices))
+    laagste = round(laagste)
+    hoogste = round(hoogste)
+    gemiddelde = round(gemiddelde)
     
     return (
         f"🏁 <b>📊 Overzicht Vandaag</b>\n\n"
         f"📉 Laagste: <b>{laagste} €\\MWh</b>\n"
         f"📈 Hoogste: <b>{hoogste} €\\MWh</b>\n"
         f"⚖️ Gemiddeld: <b>{gemiddelde} €\\MWh</b>\n\n"
-        f"⏱️ Negatief: <b>{history_negatief_count} min</b>\n"
-        f"💸 Duur (>100): <b>{history_duur_count} min</b>\n"
-        f"📊 Totaal metingen: {len(history_prices)}"
+        f"⏱️ Negatief: <b>{aantal_negatief} min</b>\n"
+        f"💸 Duur (>100): <b>{aantal_duur} min</b>\n"
+        f"📊 Totaal metingen: {aantal}"
+    )
+
+def genereer_status_bericht():
+    """ Toestand van de verbinding met Elia (stroomonderbreker + recente latenties), de grafiek-cache en Telegram. """
+    status = elia.status()
+    icoon = {'gesloten': '🟢', 'half-open': '🟡', 'open': '🔴'}.get(status['breker'], '⚪')
+    grafiek = grafiek_cache.tellers()
+    cmd = commandos.tellers()
+    prijs = gedeelde_prijs.tellers()
+    aangevuld = aanvuller.tellers()
+    telegram = verzender.latentie_overzicht()
+    return (
+        f"{icoon} <b>Elia verbinding:</b> {status['breker']}\n\n"
+        f"⏱️ Latentie p50 / p95: <b>{status['p50_ms']} / {status['p95_ms']} ms</b>\n"
+        f"❌ Fouten op rij: {status['fouten_op_rij']}\n"
+        f"🔀 Hedged requests: {status['hedges']}\n"
+        f"⚡ Snel gefaald (breker open): {status['snel_gefaald']}\n\n"
+        f"🖼️ Grafiek: {grafiek['renders']} keer getekend, {grafiek['uploads']} keer geüpload, "
+        f"{grafiek['hergebruikt']} keer hergebruikt\n"
+        f"✉️ Telegram: {telegram['aantal']} recente berichten, p50 / p95: "
+        f"{telegram.get('p50_ms', '-')} / {telegram.get('p95_ms', '-')} ms (max {telegram.get('max_ms', '-')})\n"
+        f"📨 Commando's: {cmd['uitgevoerd']} uitgevoerd, {cmd['wachtrij']} in de wachtrij, "
+        f"{cmd['geweigerd']} genegeerd, p50 / p95: {cmd.get('p50_ms', '-')} / {cmd.get('p95_ms', '-')} ms\n"
+        f"💶 /price: {prijs['uit_cache']} uit de laatste poll, {prijs['zelf_opgehaald']} zelf opgehaald, "
+        f"{prijs['meegelift']} meegelift (laatste poll {prijs['leeftijd_s']}s geleden)\n"
+        f"🔔 Persoonlijke alarmen: {len(persoonlijke_alarmen)} (van {len(persoonlijke_alarmen.per_chat)} chats)\n"
+        f"🧩 Aangevuld: {aangevuld['aangevuld']} minuten in {aangevuld['aanroepen']} aanroepen ({aangevuld['fouten']} fouten)"
     )
 
 # =============================================================================
@@ -199,26 +267,14 @@ def genereer_dag_samenvatting():
 # =============================================================================
 
 def haal_onbalansprijs_op():
-    """ Haalt de huidige prijs en tijdstip op uit de API data. """
-    data = doe_http_aanroep(ELIA_API_URL)
-    if not data or 'results' not in data or not data['results']:
-        logging.warning("⚠️ Geen geldige data ontvangen van Elia.")
-        return None, None
-    
-    laatste_data = data['results'][0]
-    prijs = laatste_data.get('imbalanceprice')
-    timestamp = laatste_data.get('datetime')
-    
-    if prijs is None: 
-        return None, None
-    
-    timestamp_obj = datetime.fromisoformat(timestamp).astimezone(BELGIUM_TZ)
-    return prijs, timestamp_obj
+    """ Haalt de huidige prijs en tijdstip op uit de API data (en deelt die met /price). """
+    return gedeelde_prijs.ververs()
 
-def beheer_prijsstatus(prijs, laatste_prijs, status, timestamp_obj):
+def beheer_prijsstatus(prijs, laatste_prijs, toestand, timestamp_obj):
     """
     Checkt of de prijs een bepaalde grens overschrijdt en stuurt alarmen.
-    Houdt de 'status' bij om te voorkomen dat we blijven spammen.
+    Houdt de 'toestand' (actieve alarmen) bij om te voorkomen dat we blijven
+    spammen: enkel een overgang naar een andere band geeft een melding.
     """
     prijs = round(prijs)
     tijd_str = f"{timestamp_obj.hour}:{timestamp_obj.minute:02}"
@@ -227,113 +283,134 @@ def beheer_prijsstatus(prijs, laatste_prijs, status, timestamp_obj):
     if prijs != laatste_prijs:
         logging.info(f"📊 Nieuwe prijs: {prijs} €\\MWh ({tijd_str})")
 
-    def meld(titel, icoon):
-        """ Helper om snel berichten te sturen naar alle chats """
-        bericht = f"{icoon} <b>{titel}:</b> {prijs} €\\MWh\n <i>{tijd_str}</i>"
-        for chat_id in TELEGRAM_CHAT_IDS:
-            stuur_telegram_bericht(bericht, chat_id)
+    toestand, melding = drempels.verwerk(toestand, prijs)
+    if melding:
+        bericht = f"{melding['icoon']} <b>{melding['titel']}:</b> {prijs} €\\MWh\n <i>{tijd_str}</i>"
+        stuur_naar_iedereen(bericht)
 
-    # --- STATUS CHECKS ---
-    
-    # 1. Extreem Laag
-    if prijs < config.GRENS_EXTREEM_LAAG and not status['extreem_laag']:
-        meld("EXTREEM LAGE PRIJS", "🧊")
-        status.update({
-            'extreem_laag': True,
-            'zeer_laag': True,
-            'onder_min_50': True,
-            'onder_0': True,
-            'onder_50': True,
-            'zeer_hoog': False
-            })
-        return prijs, status
-        
-    # 2. Zeer Laag
-    if prijs < config.GRENS_ZEER_LAAG and not status['zeer_laag']:
-        meld("ZÉÉR LAGE PRIJS", "❄️")
-        status.update({
-            'zeer_laag': True,
-            'onder_min_50': True,
-            'onder_0': True,
-            'onder_50': True,
-            'zeer_hoog': False
-        })
-        return prijs, status
-
-    # 3. Zeer Hoog
-    if prijs > config.GRENS_ZEER_HOOG and not status['zeer_hoog']:
-        meld("ZÉÉR HOGE PRIJS", "🚨")
-        status.update({
-            'zeer_hoog': True,
-            'extreem_laag': False,
-            'zeer_laag': False,
-            'onder_min_50': False,
-            'onder_0': False,
-            'onder_50': False
-        })
-        return prijs, status
-
-    # 4. Onder -50
-    if prijs < config.GRENS_LAAG_MIN_50 and not status['onder_min_50']:
-        meld("Prijs onder -50", "🌟")
-        status.update({
-            'onder_min_50': True,
-            'onder_0': True,
-            'onder_50': True,
-            'zeer_hoog': False
-        })
-        return prijs, status
-
-    # 5. Negatief (onder 0)
-    if prijs < config.GRENS_NEGATIEF and not status['onder_0']:
-        meld("Prijs onder 0", "✅")
-        status.update({
-            'onder_0': True,
-            'onder_50': True,
-            'zeer_hoog': False
-        })
-        return prijs, status
-
-    # 6. Goedkoop (onder 50)
-    if config.GRENS_NEGATIEF < prijs < config.GRENS_GOEDKOOP and not status['onder_50']:
-        meld("Prijs onder 50", "⚠️")
-        status.update({
-            'onder_50': True,
-            'zeer_hoog': False
-        })
-        return prijs, status
-
-    # --- HERSTEL MELDINGEN ---
-    
-    # Herstel boven 50
-    if prijs >= config.GRENS_HERSTEL and status['onder_50']:
-        meld("Prijs weer boven 50", "📈")
-        status.update({
-            'onder_50': False,
-            'onder_0': False,
-            'onder_min_50': False
-        })
-
-    # Herstel boven 0
-    elif prijs >= config.GRENS_NEGATIEF and status['onder_0']:
-        meld("Prijs weer positief", "⚠️")
-        status.update({
-            'onder_0': False,
-            'onder_min_50': False
-        })
-    # Herstel boven -50
-    elif prijs >= config.GRENS_LAAG_MIN_50 and status['onder_min_50']:
-        meld("Prijs weer boven -50", "☑️")
-        status.update({'onder_min_50': False})
-
-    return prijs, status
+    return prijs, toestand
+
+def beheer_persoonlijke_alarmen(prijs, timestamp_obj):
+    """
+    De /alarm-grenzen van de abonnees. Enkel de alarmen met een grens tussen
+    de vorige en deze prijs worden bekeken; elke chat krijgt één bericht.
+    De nieuwe toestanden gaan naar de opslag-stap (zodat een herstart ze kent).
+    """
+    afgegaan, wijzigingen = persoonlijke_alarmen.verwerk(prijs)
+    if wijzigingen:
+        opslag_wachtrij.zet(('alarmen', wijzigingen), sleutel='alarmen', samenvoegen=voeg_opslag_samen)
+    if not afgegaan:
+        return
+
+    tijd_str = f"{timestamp_obj.hour}:{timestamp_obj.minute:02}"
+    berichten = {}
+    for chat_id, richting, grens in afgegaan:
+        berichten.setdefault(chat_id, []).append(f"{richting} {grens:g}")
+    berichten = {chat_id: f"🔔 <b>Jouw alarm ({', '.join(grenzen)}):</b> {prijs} €\\MWh\n <i>{tijd_str}</i>"
+                 for chat_id, grenzen in berichten.items()}
+    meldingen_wachtrij.zet(lambda: verzender.verdeel(
+        berichten, lambda chat_id: verzender.stuur_bericht(berichten[chat_id], chat_id), "Persoonlijk alarm"))
 
 # =============================================================================
 # 6. HOOFD LOOPS
 # =============================================================================
 
+# --- COMMANDO'S (draaien in de werkerpool van 'commandos') ---
+
+def commando_price(chat_id, argumenten):
+    # De waarde van de poller (geen eigen aanroep naar Elia, tenzij die te oud is)
+    prijs, timestamp_obj = gedeelde_prijs.haal()
+    if prijs is not None:
+        tijd_str = f"{timestamp_obj.hour}:{timestamp_obj.minute:02}"
+        stuur_telegram_bericht(f"ℹ️ <b>Huidige prijs:</b> {round(prijs)} €\\MWh\n <i>{tijd_str}</i>", chat_id)
+    else:
+        stuur_telegram_bericht("⚠️ Kon prijs niet ophalen.", chat_id)
+
+def commando_vandaag(chat_id, argumenten):
+    stuur_telegram_bericht(genereer_dag_samenvatting(), chat_id)
+
+def commando_grafiek(chat_id, argumenten):
+    stuur_telegram_bericht("🎨 Grafiek wordt gemaakt...", chat_id)
+    verstuurd = stuur_grafiek(chat_id)
+    if verstuurd is None:
+        stuur_telegram_bericht("📉 Te weinig data voor grafiek.", chat_id)
+    elif not verstuurd:
+        stuur_telegram_bericht("⚠️ Kon grafiek niet versturen. Probeer het later opnieuw.", chat_id)
+
+def commando_status(chat_id, argumenten):
+    stuur_telegram_bericht(genereer_status_bericht(), chat_id)
+
+ALARM_UITLEG = (
+    "<b>/alarm onder -20</b> : melding als de prijs onder -20 zakt\n"
+    "<b>/alarm boven 300</b> : melding als de prijs boven 300 stijgt\n"
+    "<b>/alarm wis onder -20</b> : dat alarm wissen\n"
+    "<b>/alarm wis</b> : al je alarmen wissen"
+)
+
+def commando_alarm(chat_id, argumenten):
+    """ Persoonlijke alarmen beheren: /alarm [wis] [onder|boven <grens>] """
+    wis = argumenten[:1] == ['wis']
+    if wis:
+        argumenten = argumenten[1:]
+
+    if not argumenten:
+        if wis:
+            aantal = persoonlijke_alarmen.verwijder(chat_id)
+            database_manager.verwijder_alarmen(chat_id)
+            stuur_telegram_bericht(f"🗑️ {aantal} alarm(en) gewist.", chat_id)
+            return
+        alarmen = persoonlijke_alarmen.van_chat(chat_id)
+        lijst = "\n".join(f"• {richting} {grens:g} €\\MWh" + (" (afgegaan)" if actief else "")
+                          for richting, grens, actief in alarmen) or "Nog geen alarmen."
+        stuur_telegram_bericht(f"🔔 <b>Jouw alarmen</b>\n{lijst}\n\n{ALARM_UITLEG}", chat_id)
+        return
+
+    try:
+        richting, grens = argumenten
+        grens = float(grens.replace(',', '.'))
+        if richting not in ('onder', 'boven') or not -10000 < grens < 10000:
+            raise ValueError
+    except ValueError:
+        stuur_telegram_bericht(f"❓ Dat begrijp ik niet.\n\n{ALARM_UITLEG}", chat_id)
+        return
+
+    if wis:
+        if persoonlijke_alarmen.verwijder(chat_id, richting, grens):
+            database_manager.verwijder_alarmen(chat_id, richting, grens)
+            stuur_telegram_bericht(f"🗑️ Alarm {richting} {grens:g} gewist.", chat_id)
+        else:
+            stuur_telegram_bericht(f"❓ Je hebt geen alarm {richting} {grens:g}.", chat_id)
+        return
+
+    if len(persoonlijke_alarmen.van_chat(chat_id)) >= config.ALARM_MAX_PER_CHAT:
+        stuur_telegram_bericht(f"⚠️ Maximaal {config.ALARM_MAX_PER_CHAT} alarmen. Wis er eerst een.", chat_id)
+        return
+
+    actief = persoonlijke_alarmen.voeg_toe(chat_id, richting, grens)
+    if actief is None:
+        stuur_telegram_bericht(f"ℹ️ Je hebt al een alarm {richting} {grens:g}.", chat_id)
+        return
+    database_manager.sla_alarm_op(chat_id, richting, grens, actief)
+    if actief:
+        stuur_telegram_bericht(f"🔔 Alarm {richting} {grens:g} ingesteld. De prijs staat daar nu al: "
+                               f"je krijgt een melding zodra het opnieuw gebeurt.", chat_id)
+    else:
+        stuur_telegram_bericht(f"🔔 Alarm {richting} {grens:g} €\\MWh ingesteld.", chat_id)
+
+COMMANDOS = {
+    "/price": commando_price,
+    "/vandaag": commando_vandaag,
+    "/grafiek": commando_grafiek,
+    "/status": commando_status,
+    "/alarm": commando_alarm,
+}
+
 def monitor_telegram():
-    """ Luistert constant naar inkomende berichten van gebruikers. """
+    """
+    Luistert constant naar inkomende berichten van gebruikers (long polling).
+    Zelf voert deze loop geen commando's uit: die gaan naar de verdeler,
+    zodat getUpdates meteen verder luistert.
+    """
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getUpdates"
     last_update_id = None
     logging.info("🤖 Telegram monitor gestart...")
@@ -353,84 +430,187 @@ def monitor_telegram():
                 
                 if not chat_id: continue
 
-                # COMMANDO: /price
-                if tekst == "/price":
-                    logging.info(f"📩 Commando /price van {chat_id}")
-                    prijs, timestamp_obj = haal_onbalansprijs_op()
-                    if prijs is not None:
-                        tijd_str = f"{timestamp_obj.hour}:{timestamp_obj.minute:02}"
-                        stuur_telegram_bericht(f"ℹ️ <b>Huidige prijs:</b> {round(prijs)} €\\MWh\n <i>{tijd_str}</i>", chat_id)
-                    else:
-                        stuur_telegram_bericht("⚠️ Kon prijs niet ophalen.", chat_id)
-
-                # COMMANDO: /vandaag
-                elif tekst == "/vandaag":
-                    logging.info(f"📩 Commando /vandaag van {chat_id}")
-                    stuur_telegram_bericht(genereer_dag_samenvatting(), chat_id)
-                
-                # COMMANDO: /grafiek
-                elif tekst == "/grafiek":
-                    logging.info(f"📩 Commando /grafiek van {chat_id}")
-                    stuur_telegram_bericht("🎨 Grafiek wordt gemaakt...", chat_id)
-                    buf = genereer_grafiek_afbeelding()
-                    if buf:
-                        stuur_telegram_foto(buf, chat_id)
-                        buf.close()
-                    else:
-                        stuur_telegram_bericht("📉 Te weinig data voor grafiek.", chat_id)
-            
-            time.sleep(1)
+                naam, *argumenten = tekst.split() or ['']
+                functie = COMMANDOS.get(naam)
+                if functie:
+                    logging.info(f"📩 Commando {tekst} van {chat_id}")
+                    commandos.voeg_toe(chat_id, naam, partial(functie, argumenten=argumenten))
 
         except Exception as e:
             logging.error(f"Telegram loop fout: {e}")
             time.sleep(5)
 
-def prijscontrole_loop():
-    """ 
-    De motor van het script: haalt elke 15s de prijs op.
-    AANGEPAST: Gebruikt nu API-tijd in plaats van Systeem-tijd voor opslag.
+def bereken_dag_data():
+    """ Maakt de samenvatting van vandaag klaar voor de tabel dagstatistieken. """
+    # We gebruiken de datum van de API data voor de statistiek
+    statistiek_datum = history.datum.strftime('%Y-%m-%d')
+    return dag_stats.dag_data(statistiek_datum)
+
+def voeg_opslag_samen(oud, nieuw):
     """
-    global history_prices, history_times, buffer_voor_db, laatste_datum, dagrapport_verstuurd
-    global history_negatief_count, history_duur_count
-    
-    laatste_prijs = None
-    laatste_minuut_id = None # Om te checken of de minuut voorbij is
-    
-    # Start status (alles False)
-    status = {
-        'onder_50': False,
-        'onder_0': False,
-        'onder_min_50': False, 
-        'zeer_laag': False,
-        'extreem_laag': False,
-        'zeer_hoog': False
-    }
+    Twee wachtende items met dezelfde sleutel samenvoegen:
+    - flushes van dezelfde dag: minuten bundelen, nieuwste dagstats houden
+    - alarm-toestanden: de nieuwste toestand per alarm telt
+    """
+    if oud[0] == 'alarmen':
+        return ('alarmen', {**oud[1], **nieuw[1]})
+    return ('flush', nieuw[1], oud[2] + nieuw[2])
+
+def voeg_aanvulling_samen(oud, nieuw):
+    """ Twee wachtende aanvullingen van dezelfde dag: één lijst minuten (dubbels storen niet). """
+    return ('aanvulling', oud[1], oud[2] + nieuw[2])
+
+def vraag_aanvulling_op(datum_str, minuten):
+    """ Aangevulde minuten van een afgelopen dag naar de opslag-stap (vallen nooit weg). """
+    opslag_wachtrij.zet(('aanvulling', datum_str, minuten), sleutel=('aanvulling', datum_str),
+                        samenvoegen=voeg_aanvulling_samen, vast=True)
+
+def vraag_opslag_aan():
+    """ Geeft de buffer door aan de opslag-stap en begint een nieuwe buffer. """
+    global buffer_voor_db
+    if not buffer_voor_db or not len(history):
+        return
+    dag_data = bereken_dag_data()
+    opslag_wachtrij.zet(('flush', dag_data, buffer_voor_db), sleutel=('flush', dag_data['datum']), samenvoegen=voeg_opslag_samen)
+    buffer_voor_db = []
+
+def verwerk_opslag(item):
+    """
+    Stap 'opslag': schrijft een buffer + dagstatistieken, de toestand van de
+    alarmen of de aangevulde minuten van een afgelopen dag weg in SQLite.
+    """
+    soort, *gegevens = item
+    if soort == 'alarmen':
+        database_manager.zet_alarm_toestanden(gegevens[0])
+        return
+    if soort == 'aanvulling':
+        if database_manager.vul_dag_aan(*gegevens):
+            live_buffer.verhoog_generatie(historiek=True)
+        return
+
+    dag_data, minuut_buffer = gegevens
+    with DB_FLUSH_DUUR.meet():
+        database_manager.sla_buffer_en_dag_op(dag_data, minuut_buffer)
+    DB_FLUSH_RIJEN.observeer(len(minuut_buffer))
+    logging.info("✅ Database update succesvol.")
 
+    # De website laten weten dat haar cache voor deze periode verouderd is
+    vandaag_str = datetime.now(BELGIUM_TZ).strftime('%Y-%m-%d')
+    live_buffer.verhoog_generatie(historiek=dag_data['datum'] < vandaag_str)
+
+def schrijf_live_buffer(item):
+    """
+    Stap 'live': voegt één minuut-record toe aan de ring in gedeeld geheugen
+    (+ de lopende dagstats in de header) zodat de website die kan lezen,
+    of zet de actieve alarmen in de header.
+    Op de Pi staat die in /dev/shm/ (RAM-opslag, geen SD slijtage).
+    """
+    soort, *gegevens = item
+    try:
+        with LIVE_SCHRIJVEN.meet(soort=soort):
+            if soort == 'status':
+                live_buffer.zet_status(gegevens[0])
+            elif soort == 'stats':
+                live_buffer.zet_stats(*gegevens)
+            else:
+                datum_str, tijd_str, prijs, stats = gegevens
+                live_buffer.voeg_toe(datum_str, tijd_str, prijs)
+                live_buffer.zet_stats(datum_str, stats)
+    except Exception as e:
+        logging.error(f"Fout bij schrijven RAM-buffer: {e}")
+
+def verstuur_dagrapport(tekst):
+    """
+    Stap 'meldingen': het dagrapport naar alle chats sturen. De grafiek wordt
+    hoogstens één keer getekend en geüpload; de andere chats krijgen de file_id.
+    """
+    versie = grafiek_versie()  # Alle chats dezelfde versie, ook als er intussen een kwartier bijkomt
+
+    def stuur_rapport(chat_id):
+        # Per chat eerst de tekst, dan de grafiek (volgorde blijft behouden)
+        verzender.stuur_bericht(tekst, chat_id)
+        stuur_grafiek(chat_id, versie)
+
+    return verzender.verdeel(TELEGRAM_CHAT_IDS, stuur_rapport, "Dagrapport")
+
+def prijscontrole_loop(klok=None):
+    """ 
+    De motor van het script: haalt de prijs op volgens de PollPlanner
+    (snel rond het moment waarop Elia publiceert, rustig de rest van de minuut).
+    Doet verder NIETS zelf: elke meting gaat als event naar de evaluatie-stap,
+    zodat trage opslag of Telegram-storingen het ophalen nooit vertragen.
+    Is het record niet veranderd, dan sturen we enkel een 'tik' (voor de klok-taken).
+    'klok' (zie klok.py) is standaard de echte klok; bij het afspelen van een
+    prijsreeks een versnelde of gesimuleerde.
+    """
     logging.info("⚡ Prijscontrole gestart...")
+    klok = klok or SysteemKlok()
+    laatste_record = None
+    planner = PollPlanner(klok.tijd, klok.monotoon)
     
     # Melding bij opstarten
     prijs, timestamp_obj = haal_onbalansprijs_op()
     if prijs is not None:
         tijd_str = f"{timestamp_obj.hour}:{timestamp_obj.minute:02}"
-        for chat_id in TELEGRAM_CHAT_IDS:
-            stuur_telegram_bericht(f'🔄 <b>Server herstart</b> {round(prijs)} €\\MWh\n<i>{tijd_str}</i>', chat_id)
+        stuur_naar_iedereen(f'🔄 <b>Server herstart</b> {round(prijs)} €\\MWh\n<i>{tijd_str}</i>')
+        laatste_record = (prijs, timestamp_obj)
+        prijs_wachtrij.zet((klok.nu(BELGIUM_TZ), prijs, timestamp_obj))
 
     while True:
         try:
             # We houden 'nu' alleen nog voor systeem-taken (zoals middernacht checken)
-            nu = datetime.now(BELGIUM_TZ)
+            nu = klok.nu(BELGIUM_TZ)
             prijs, timestamp_obj = haal_onbalansprijs_op()
-            
+
+            nieuw = prijs is not None and (prijs, timestamp_obj) != laatste_record
+            if nieuw:
+                laatste_record = (prijs, timestamp_obj)
+                prijs_wachtrij.zet((nu, prijs, timestamp_obj))
+            else:
+                # Niets nieuws: enkel de klok laten doortikken. Hoogstens één tik
+                # wachtend (de oudste blijft), zodat tikken nooit prijzen verdringen.
+                prijs_wachtrij.zet((nu, None, None), sleutel='tik', samenvoegen=lambda oud, nieuw: oud)
+
+            # Volgende poll op een vaste deadline (verwerkingstijd telt niet mee)
+            planner.registreer(nieuw)
+            slaap_tot(planner.volgende_deadline(), klok.monotoon, klok.slaap)
+        except Exception as e:
+            logging.error(f"Loop fout: {e}")
+            klok.slaap(30)
+
+def prijs_evaluatie_loop():
+    """
+    Verwerkt de events van de poller: werkgeheugen bijwerken, alarmen
+    evalueren en werk doorgeven aan de meldingen-, opslag- en live-stappen.
+    AANGEPAST: Gebruikt API-tijd in plaats van Systeem-tijd voor opslag.
+    """
+    global buffer_voor_db, laatste_datum, dagrapport_verstuurd
+    
+    laatste_prijs = None
+    laatste_minuut_id = None # Om te checken of de minuut voorbij is
+    laatste_kwartier = None  # Om te checken of er een kwartier voorbij is (DB flush)
+    
+    # Start status (geen enkel alarm actief)
+    toestand = drempels.begin
+
+    while True:
+        item = prijs_wachtrij.haal()
+        if item[0] == 'aanvulling':
+            try:
+                verwerk_aanvulling(*item[1:])
+            except Exception as e:
+                logging.error(f"Fout bij verwerken aanvulling: {e}")
+            continue
+
+        nu, prijs, timestamp_obj = item
+        try:
             if prijs is not None and timestamp_obj is not None:
                 
                 # 1. Check op nieuwe dag (op basis van API tijd, dat is wel zo zuiver)
                 datum_api = timestamp_obj.date()
                 if datum_api != laatste_datum:
-                    history_prices = []
-                    history_times = []
+                    vervang_werkgeheugen(DagReeks(datum_api), DagStatistiek())
                     buffer_voor_db = [] # Buffer ook leegmaken
-                    history_negatief_count = 0
-                    history_duur_count = 0
                     laatste_datum = datum_api
                     dagrapport_verstuurd = False
                     logging.info(f"📅 Nieuwe dag ({datum_api}): tellers gereset.")
@@ -443,169 +623,224 @@ def prijscontrole_loop():
                 if huidige_minuut_id != laatste_minuut_id:
                     laatste_minuut_id = huidige_minuut_id
                     
-                    # A. Voeg toe aan live lijsten
-                    history_prices.append(prijs)
-                    history_times.append(timestamp_obj) 
+                    # A. Voeg toe aan live lijsten (een gat met de vorige minuut: laten aanvullen)
+                    minuut = timestamp_obj.hour * 60 + timestamp_obj.minute
+                    if len(history) and minuut - history.minuten[-1] > 1:
+                        aanvullen_nodig.set()
+                    history.voeg_toe(minuut, prijs)
                     
-                    # B. Update tellers
-                    if prijs < config.GRENS_NEGATIEF: history_negatief_count += 1
-                    if prijs > config.GRENS_DUUR: history_duur_count += 1
+                    # B. Update lopende statistieken (min/max/gem/mediaan + tellers)
+                    dag_stats.voeg_toe(prijs, huidige_minuut_id)
                     
                     # C. Buffer vullen
                     datum_str = timestamp_obj.strftime('%Y-%m-%d')
                     buffer_voor_db.append( (datum_str, huidige_minuut_id, prijs) )
                     
-                    # === NIEUW: SCHRIJF BUFFER NAAR RAM (GEEN SD SLIJTAGE) ===
-                    # Op Windows werkt /dev/shm niet, dus daar gebruiken we gewoon een bestandje.
-                    # Op de Pi gebruiken we /dev/shm/ voor RAM-opslag.
-                    pad = '/dev/shm/energy_live.json' if os.path.exists('/dev/shm') else 'energy_live.json'
-                    
-                    try:
-                        with open(pad, 'w') as f:
-                            # We slaan de buffer op zodat de website die kan lezen
-                            json.dump(buffer_voor_db, f)
-                    except Exception as e:
-                        logging.error(f"Fout bij schrijven RAM-buffer: {e}")
-                    # =========================================================
+                    # D. Live-buffer voor de website (één record per minuut)
+                    live_wachtrij.zet(('minuut', datum_str, huidige_minuut_id, prijs, dag_stats.als_dict()))
 
                     logging.info(f"⏱️ Minuutmeting gebufferd: {prijs} (Tijdstip: {huidige_minuut_id})")
 
                 # 3. Status updates (Alarmen mogen wel direct afgaan)
-                laatste_prijs, status = beheer_prijsstatus(prijs, laatste_prijs, status, timestamp_obj)
+                vorige_toestand = toestand
+                laatste_prijs, toestand = beheer_prijsstatus(prijs, laatste_prijs, toestand, timestamp_obj)
+                beheer_persoonlijke_alarmen(laatste_prijs, timestamp_obj)
+                if toestand != vorige_toestand:
+                    # Ook de website mag het weten (enkel de laatste status telt)
+                    live_wachtrij.zet(('status', drempels.status(toestand)), sleutel='status')
 
                 # 4. DATABASE UPDATE (Checken we wel op basis van systeemklok 'nu' om de 15 min)
-                if nu.minute % 15 == 0 and nu.second < 20:
+                kwartier = (nu.date(), nu.hour, nu.minute // 15)
+                if laatste_kwartier is None:
+                    laatste_kwartier = kwartier
+                elif kwartier != laatste_kwartier:
+                    laatste_kwartier = kwartier
                     if buffer_voor_db:
-                        logging.info("💾 15 minuten voorbij: Buffer wegschrijven naar DB...")
-                        
-                        # Bereken statistieken
-                        laagste = round(min(history_prices))
-                        hoogste = round(max(history_prices))
-                        gem = round(sum(history_prices) / len(history_prices))
-                        mediaan = round(statistics.median(history_prices))
-                        
-                        idx_laag = history_prices.index(min(history_prices))
-                        tijd_laag = history_times[idx_laag].strftime('%H:%M')
-                        idx_hoog = history_prices.index(max(history_prices))
-                        tijd_hoog = history_times[idx_hoog].strftime('%H:%M')
-                        
-                        # We gebruiken de datum van de API data voor de statistiek
-                        statistiek_datum = history_times[-1].strftime('%Y-%m-%d')
-
-                        dag_data = {
-                            'datum': statistiek_datum,
-                            'laagste': laagste, 'hoogste': hoogste,
-                            'gemiddelde': gem, 'mediaan': mediaan,
-                            'aantal': len(history_prices),
-                            'aantal_negatief': history_negatief_count,
-                            'aantal_duur': history_duur_count,
-                            'tijd_laag': tijd_laag, 'tijd_hoog': tijd_hoog
-                        }
-                        
-                        database_manager.sla_buffer_en_dag_op(dag_data, buffer_voor_db)
-                        buffer_voor_db = [] 
-                        logging.info("✅ Database update succesvol.")
-                        time.sleep(20)
+                        logging.info("💾 15 minuten voorbij: Buffer naar de opslag-stap...")
+                        vraag_opslag_aan()
 
             # 5. DAGAFSLUITING (Op basis van systeemklok, want we willen om 23:59 sturen)
             if nu.hour == 23 and nu.minute == 59 and not dagrapport_verstuurd:
                 logging.info("🕛 Tijd voor dagafsluiting!")
                 
-                if history_prices and buffer_voor_db:
-                    try:
-                        # (Zelfde logica als hierboven voor laatste save)
-                        laagste = round(min(history_prices))
-                        hoogste = round(max(history_prices))
-                        gem = round(sum(history_prices) / len(history_prices))
-                        mediaan = round(statistics.median(history_prices))
-                        idx_laag = history_prices.index(min(history_prices))
-                        tijd_laag = history_times[idx_laag].strftime('%H:%M')
-                        idx_hoog = history_prices.index(max(history_prices))
-                        tijd_hoog = history_times[idx_hoog].strftime('%H:%M')
-                        statistiek_datum = history_times[-1].strftime('%Y-%m-%d')
-
-                        dag_data = {
-                            'datum': statistiek_datum,
-                            'laagste': laagste, 'hoogste': hoogste,
-                            'gemiddelde': gem, 'mediaan': mediaan,
-                            'aantal': len(history_prices),
-                            'aantal_negatief': history_negatief_count,
-                            'aantal_duur': history_duur_count,
-                            'tijd_laag': tijd_laag, 'tijd_hoog': tijd_hoog
-                        }
-                        
-                        # Opslaan!
-                        database_manager.sla_buffer_en_dag_op(dag_data, buffer_voor_db)
-                        buffer_voor_db = [] # Buffer legen
-                    except Exception as e:
-                        logging.error(f"Save fout: {e}")
-
-                # B. Telegram Rapport Sturen
-                tekst = genereer_dag_samenvatting()
-                buf = genereer_grafiek_afbeelding()
+                # A. Laatste save van de dag
+                vraag_opslag_aan()
 
-                for chat_id in TELEGRAM_CHAT_IDS:
-                    stuur_telegram_bericht(tekst, chat_id)
-                    if buf:
-                        stuur_telegram_foto(buf, chat_id); buf.seek(0)
-                if buf: buf.close()
+                # B. Telegram Rapport Sturen (de grafiek wordt in de meldingen-stap gemaakt)
+                tekst = genereer_dag_samenvatting()
+                meldingen_wachtrij.zet(lambda: verstuur_dagrapport(tekst))
                 dagrapport_verstuurd = True
             
             # Reset vlaggetje na middernacht (00:00:xx)
             if nu.hour == 0 and dagrapport_verstuurd:
                 dagrapport_verstuurd = False
+        except Exception as e:
+            logging.error(f"Evaluatie fout: {e}")
+
+def verwerk_aanvulling(dag, minuten):
+    """
+    Evaluatie-stap: aangevulde minuten van VANDAAG in het werkgeheugen zetten.
+    De reeks en de dagstats worden in volgorde herbouwd, de nieuwe minuten
+    gaan meteen naar de opslag. Geen alarmen: dat zijn oude prijzen.
+    """
+    if dag != history.datum:
+        # Intussen een nieuwe dag begonnen: dan is het een afgelopen dag
+        vraag_aanvulling_op(dag.strftime('%Y-%m-%d'), minuten)
+        return
+
+    bestaand = set(history.minuten)
+    nieuw = [(minuut, prijs) for minuut, prijs in minuten if minuut not in bestaand]
+    if not nieuw:
+        return
 
-            time.sleep(15) # Korte slaap voor de volgende check
+    # Naast de huidige opbouwen en dan in één keer wisselen (lezers zien nooit een halve dag)
+    reeks, stats = DagReeks(dag), DagStatistiek()
+    for minuut, prijs in sorted([*history, *nieuw]):
+        reeks.voeg_toe(minuut, prijs)
+        stats.voeg_toe(prijs, DagReeks.tijd_str(minuut))
+    vervang_werkgeheugen(reeks, stats)
+
+    datum_str = dag.strftime('%Y-%m-%d')
+    buffer_voor_db.extend((datum_str, DagReeks.tijd_str(minuut), prijs) for minuut, prijs in nieuw)
+    vraag_opslag_aan()
+    live_wachtrij.zet(('stats', datum_str, dag_stats.als_dict()))  # De website toont de herrekende dagstats
+    logging.info(f"🧩 {len(nieuw)} gemiste minuten van vandaag aangevuld.")
+
+def vul_gaten_aan():
+    """
+    Eén ronde: per dag (vandaag + het bewaarvenster) de ontbrekende minuten
+    zoeken en bij Elia ophalen. Afgelopen dagen gaan naar de opslag-stap,
+    vandaag via de evaluatie-stap (die bezit het werkgeheugen).
+    """
+    nu = datetime.now(BELGIUM_TZ)
+    vandaag = nu.date()
+    dagen = min(config.AANVUL_DAGEN, config.AANTAL_DAGEN_BEWAREN)
+    aanvuller.vergeet_voor(vandaag - timedelta(days=dagen - 1))
+
+    for terug in range(dagen):
+        if not elia.breker.mag_aanroepen():
+            logging.info("🧩 Aanvullen gestopt: Elia is onbereikbaar.")
+            return
+        dag = vandaag - timedelta(days=terug)
+        datum_str = dag.strftime('%Y-%m-%d')
+
+        if dag == vandaag:
+            # Ook de minuten die nog in de buffer zitten. Tot de laatst gekende minuut:
+            # zo valt een gat dat net gezien is er zeker in; wat daarna komt, haalt de poller.
+            reeks, _ = werkgeheugen()
+            aanwezig = reeks.minuten[:] if reeks.datum == dag else ()
+            tot_minuut = max(aanwezig) if len(aanwezig) else nu.hour * 60 + nu.minute - config.AANVUL_MARGE
+            ontbrekend = aanvuller.ontbrekende_minuten(dag, aanwezig, tot_minuut)
+        else:
+            aanwezig = [minuut for minuut, _ in database_manager.haal_dag_op(datum_str)]
+            ontbrekend = aanvuller.ontbrekende_minuten(dag, aanwezig)
+        if not ontbrekend:
+            continue
+
+        gevonden = aanvuller.haal(dag, ontbrekend)
+        logging.info(f"🧩 {datum_str}: {len(ontbrekend)} minuten ontbraken, {len(gevonden)} gevonden bij Elia.")
+        if not gevonden:
+            continue
+        if dag == vandaag:
+            # Mag niet wegvallen als de poller even veel events geeft
+            prijs_wachtrij.zet(('aanvulling', dag, gevonden), sleutel=('aanvulling', dag),
+                               samenvoegen=voeg_aanvulling_samen, vast=True)
+        else:
+            vraag_aanvulling_op(datum_str, gevonden)
+
+def aanvul_loop():
+    """
+    Vult gemiste minuten aan: bij het opstarten, na een gat in de metingen
+    (storing) en verder om de AANVUL_INTERVAL seconden. Loopt volledig naast
+    de poller; de aanroepen naar Elia zitten in een eigen token bucket.
+    """
+    while True:
+        aanvullen_nodig.wait(config.AANVUL_INTERVAL)
+        aanvullen_nodig.clear()
+        try:
+            vul_gaten_aan()
         except Exception as e:
-            logging.error(f"Loop fout: {e}")
-            time.sleep(30)
+            logging.error(f"❌ Fout bij aanvullen: {e}")
+
+def onderhoud_loop():
+    """
+    Vat periodiek de minuut-details ouder dan AANTAL_DAGEN_BEWAREN samen tot
+    kwartieren (de eerste keer gebeurt dat al bij het opstarten in main).
+    """
+    while True:
+        time.sleep(config.OPRUIM_INTERVAL)
+        if database_manager.opruimen_oude_data():
+            live_buffer.verhoog_generatie(historiek=True)
+
+def start_pijplijn(klok=None):
+    """ Start alle stappen van de pijplijn (elk in een eigen thread). 'klok' gaat naar de poller. """
+    global live_buffer
+    live_buffer = LiveBufferSchrijver()
+    live_buffer.verhoog_generatie(historiek=True)  # Bij het opstarten kan de DB gewijzigd zijn (opruimen, migratie)
+    threading.Thread(target=prijs_evaluatie_loop, name='evaluatie', daemon=True).start()
+    start_stap('meldingen', meldingen_wachtrij, verwerk_melding)
+    start_stap('opslag', opslag_wachtrij, verwerk_opslag)
+    start_stap('live', live_wachtrij, schrijf_live_buffer)
+    threading.Thread(target=prijscontrole_loop, args=(klok,), name='poller', daemon=True).start()
+    threading.Thread(target=onderhoud_loop, name='onderhoud', daemon=True).start()
+    aanvullen_nodig.set()  # Meteen een eerste ronde (wat gemist is terwijl de bot uit stond)
+    threading.Thread(target=aanvul_loop, name='aanvullen', daemon=True).start()
 
 # =============================================================================
 # 7. MAIN STARTPUNT
 # =============================================================================
 
 def main():
-    global history_prices, history_times, history_negatief_count, history_duur_count
     if not TELEGRAM_BOT_TOKEN or not ELIA_API_URL:
         logging.error("⛔ STOP: .env bestand mist variabelen of bestaat niet.")
         return
+
+    # Het grafiek-proces meteen starten (en opwarmen), niet pas bij de eerste grafiek
+    grafiek_werker.start()
     
     # NIEUW: Zorg dat de database klaarstaat
     database_manager.init_database()
+    persoonlijke_alarmen.laad(database_manager.haal_alarmen_op())
+    logging.info(f"🔔 {len(persoonlijke_alarmen)} persoonlijke alarmen geladen.")
     
-    # 1. SCHOONMAAK (1 maand regel)
+    # 1. SCHOONMAAK (minuten ouder dan AANTAL_DAGEN_BEWAREN -> kwartieren)
     database_manager.opruimen_oude_data()
     
     # 2. HERSTEL (Het 16:00 probleem oplossen)
     logging.info("♻️ Data van vandaag herstellen uit DB...")
-    vandaag_str = datetime.now(BELGIUM_TZ).strftime('%Y-%m-%d')
+    vandaag = datetime.now(BELGIUM_TZ).date()
+    vandaag_str = vandaag.strftime('%Y-%m-%d')
     
-    oude_data = database_manager.haal_vandaag_op(vandaag_str)
+    oude_data = database_manager.haal_dag_op(vandaag_str)
     
     if oude_data:
         logging.info(f"🔄 {len(oude_data)} metingen gevonden. Herstellen...")
-        for tijd_str, prijs in oude_data:
-            # Herstel de lijsten
-            u, m = map(int, tijd_str.split(':'))
-            tijd_obj = datetime.now(BELGIUM_TZ).replace(hour=u, minute=m, second=0, microsecond=0)
-            
-            history_prices.append(prijs)
-            history_times.append(tijd_obj)
+        reeks, stats = DagReeks(vandaag), DagStatistiek()
+        for minuut, prijs in oude_data:
+            # Herstel de reeks (enkel minuut van de dag + prijs, geen datetime-objecten)
+            reeks.voeg_toe(minuut, prijs)
             
-            # Herstel de tellers (ongeveer)
-            if prijs < config.GRENS_NEGATIEF: history_negatief_count += 1
-            if prijs > config.GRENS_DUUR: history_duur_count += 1
+            # Herstel de lopende statistieken
+            stats.voeg_toe(prijs, DagReeks.tijd_str(minuut))
+        vervang_werkgeheugen(reeks, stats)
         
         logging.info("✅ Geheugen succesvol hersteld! Dagstatistieken lopen door.")
     else:
         logging.info("✨ Geen data van vandaag gevonden. Start blanco.")
     
-    # Start de prijscontrole in een aparte thread (zodat ze tegelijk draaien)
-    prijs_thread = threading.Thread(target=prijscontrole_loop, daemon=True)
-    prijs_thread.start()
+    # Metrieken voor Prometheus (enkel lokaal, zie config.py)
+    if config.METRIEKEN_POORT:
+        metrieken.start_server(config.METRIEKEN_POORT, config.METRIEKEN_ADRES)
+
+    # Start de prijscontrole-pijplijn in aparte threads (zodat ze tegelijk draaien)
+    start_pijplijn()
 
     # Start de Telegram luisteraar (deze houdt het script 'levend')
-    monitor_telegram()
+    try:
+        monitor_telegram()
+    finally:
+        # Bij het afsluiten (Ctrl+C, systemd stop): de verbinding van deze thread sluiten
+        database_manager.sluit_verbinding()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
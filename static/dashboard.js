@@ -19,11 +19,18 @@ function veranderDatum(input) {
 
 
 // 2. GRAFIEKEN TEKENEN
-function initGrafieken(liveData, teleData, limits) {
+let liveGrafiek = null;
+let teleGrafiek = null;
+let grenzen = null;
+let gemGisteren = null;
+
+function initGrafieken(liveData, teleData, limits, avgGisteren) {
     const canvasLive = document.getElementById('liveChart');
     if (!canvasLive) return; 
 
     const grensDuur = limits.duur;
+    grenzen = limits;
+    gemGisteren = avgGisteren;
     
     // Algemene instellingen
     const gridConfig = { color: (ctx) => (ctx.tick && ctx.tick.value === 0 ? '#FFFFFF' : '#333'), lineWidth: (ctx) => (ctx.tick && ctx.tick.value === 0 ? 2 : 1) };
@@ -45,7 +52,7 @@ function initGrafieken(liveData, teleData, limits) {
     grad.addColorStop(0, 'rgba(41, 181, 232, 0.3)');
     grad.addColorStop(1, 'rgba(41, 181, 232, 0)');
 
-    new Chart(ctxLive, {
+    liveGrafiek = new Chart(ctxLive, {
         type: 'line',
         data: {
             labels: liveData.tijden,
@@ -78,7 +85,7 @@ function initGrafieken(liveData, teleData, limits) {
     gradTele.addColorStop(0, 'rgba(0, 204, 150, 0.3)');
     gradTele.addColorStop(1, 'rgba(0, 204, 150, 0)');
 
-    new Chart(ctxTele, {
+    teleGrafiek = new Chart(ctxTele, {
         type: 'line',
         data: {
             labels: teleData.tijden,
@@ -104,23 +111,135 @@ function initGrafieken(liveData, teleData, limits) {
     });
 }
 
-// 3. AUTO REFRESH
-function startAutoRefresh(isLive) {
-    let refreshTimer;
-    const toggleBtn = document.getElementById('autoRefreshToggle');
-    
-    function startTimer() {
-        if (toggleBtn && toggleBtn.checked) {
-            refreshTimer = setTimeout(() => location.reload(), 60000); 
+// 3. NIEUWE PUNTEN TOEVOEGEN (zonder de pagina te herladen)
+const KWARTIER_MINUTEN = ['14', '29', '44', '59'];
+
+function rond(waarde) {
+    return Math.round(waarde * 100) / 100;
+}
+
+function zetDelta(id, waarde, tekst) {
+    const el = document.getElementById(id);
+    if (!el) return;
+    waarde = rond(waarde);
+    el.className = 'metric-delta ' + (waarde > 0 ? 'delta-bad' : 'delta-good');
+    el.textContent = (waarde > 0 ? '▲ +' : '▼ ') + waarde + ' ' + tekst;
+}
+
+function zetTekst(id, tekst) {
+    const el = document.getElementById(id);
+    if (el) el.textContent = tekst;
+}
+
+// Zelfde berekening als haal_live_data in webserver.py, maar op de punten in de grafieken
+function werkKaartenBij() {
+    const prijzen = liveGrafiek.data.datasets[0].data;
+    const tele = teleGrafiek.data.datasets[0].data;
+    if (!prijzen.length) return;
+
+    const gem = prijzen.reduce((a, b) => a + b, 0) / prijzen.length;
+    const huidig = prijzen[prijzen.length - 1];
+
+    const prijsEl = document.getElementById('prijsHuidig');
+    if (prijsEl) {
+        prijsEl.textContent = '€ ' + rond(huidig);
+        prijsEl.style.color = huidig < grenzen.negatief ? 'var(--accent)' : (huidig > grenzen.duur ? 'var(--red)' : 'var(--text-color)');
+    }
+    zetDelta('deltaPrijs', huidig - gem, 'vs Gem');
+    zetTekst('gemVal', '€ ' + rond(gem));
+    zetTekst('minVal', rond(Math.min(...prijzen)));
+    zetTekst('maxVal', rond(Math.max(...prijzen)));
+    if (gemGisteren !== null) zetDelta('deltaAvg', gem - gemGisteren, 'vs Gister');
+
+    if (tele.length) {
+        const teleGem = rond(tele.reduce((a, b) => a + b, 0) / tele.length);
+        zetTekst('teleGemVal', '€ ' + teleGem);
+        zetTekst('teleMinVal', rond(Math.min(...tele)));
+        zetTekst('teleMaxVal', rond(Math.max(...tele)));
+        if (gemGisteren !== null) zetDelta('deltaTele', teleGem - gemGisteren, 'vs Gister');
+    }
+}
+
+function voegPuntenToe(tijden, prijzen) {
+    if (!liveGrafiek || !tijden.length) return;
+    tijden.forEach((tijd, i) => {
+        liveGrafiek.data.labels.push(tijd);
+        liveGrafiek.data.datasets[0].data.push(prijzen[i]);
+        if (KWARTIER_MINUTEN.includes(tijd.slice(-2))) {
+            teleGrafiek.data.labels.push(tijd);
+            teleGrafiek.data.datasets[0].data.push(prijzen[i]);
         }
+    });
+    liveGrafiek.update('none');
+    teleGrafiek.update('none');
+    werkKaartenBij();
+}
+
+function laatsteTijd() {
+    const labels = liveGrafiek ? liveGrafiek.data.labels : [];
+    return labels.length ? labels[labels.length - 1] : '';
+}
+
+// 4. LIVE: nieuwe minuten en alarmen komen binnen via Server-Sent Events (/api/stream)
+const ALARM_NAMEN = {
+    extreem_laag: '🚨 Extreem laag',
+    zeer_laag: '🟢 Zeer laag',
+    onder_min_50: '⬇️ Onder -50',
+    onder_0: '💸 Negatief',
+    onder_50: '📉 Onder 50',
+    zeer_hoog: '🔥 Zeer hoog'
+};
+
+function toonAlarmen(actief) {
+    const el = document.getElementById('alarmStatus');
+    if (!el) return;
+    el.textContent = actief.length ? actief.map(vlag => ALARM_NAMEN[vlag] || vlag).join(' · ') : '';
+    el.style.display = actief.length ? 'block' : 'none';
+}
+
+// Wat we misten terwijl de verbinding weg was (of voor ze opende) ophalen via /api/live
+function haalGemistePuntenOp(datum) {
+    fetch('/api/live?datum=' + datum + '&since=' + laatsteTijd())
+        .then(r => r.json())
+        .then(data => voegPuntenToe(data.tijden, data.prijzen))
+        .catch(err => console.log('Live update mislukt:', err));
+}
+
+function startAutoRefresh(isLive, datum) {
+    let bron = null;
+    const toggleBtn = document.getElementById('autoRefreshToggle');
+
+    function verbind() {
+        if (bron || !(toggleBtn && toggleBtn.checked)) return;
+        bron = new EventSource('/api/stream');
+
+        // Ook na een herverbinding (de browser probeert dat zelf opnieuw)
+        bron.addEventListener('open', () => haalGemistePuntenOp(datum));
+
+        bron.addEventListener('minuut', e => {
+            const punt = JSON.parse(e.data);
+            if (punt.datum !== datum) {
+                // Een nieuwe dag: dan toch één keer de (nieuwe) pagina laden
+                if (punt.datum > datum) window.location.href = '/';
+                return;
+            }
+            if (punt.tijd > laatsteTijd()) voegPuntenToe([punt.tijd], [punt.prijs]);
+        });
+
+        bron.addEventListener('status', e => toonAlarmen(JSON.parse(e.data).actief));
+    }
+
+    function verbreek() {
+        if (bron) bron.close();
+        bron = null;
     }
 
-    if (isLive) startTimer();
+    if (isLive) verbind();
 
     if (toggleBtn) {
         toggleBtn.addEventListener('change', function() { 
-            if (this.checked) startTimer(); 
-            else clearTimeout(refreshTimer); 
+            if (this.checked) verbind(); 
+            else verbreek(); 
         });
     }
-}
\ No newline at end of file
+}
@@ -0,0 +1,275 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import config
+import metrieken
+
+# Per methode en soort fout, nooit per chat: het aantal reeksen groeit dan niet met de
+# abonnees, en chat-ID's (gebruikers) komen niet op /metrics
+TELEGRAM_VERZENDING = metrieken.histogram('telegram_verzending_seconds',
+                                          "Duur van een verzending naar Telegram, wachttijd en herhalingen inbegrepen",
+                                          ('methode', 'resultaat'), emmers=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+TELEGRAM_HERHALINGEN = metrieken.teller('telegram_herhalingen_total', "Herhaalde pogingen naar Telegram",
+                                        ('methode', 'reden'))
+
+# =============================================================================
+# TOKEN BUCKET (SNELHEIDSBEGRENZING)
+# =============================================================================
+
+class TokenBucket:
+    """
+    Klassieke token bucket: er komen 'snelheid' tokens per seconde bij,
+    met een maximum van 'capaciteit'. Elke API-aanroep kost 1 token.
+    """
+
+    def __init__(self, snelheid, capaciteit=None):
+        self.snelheid = float(snelheid)
+        self.capaciteit = float(capaciteit if capaciteit is not None else snelheid)
+        self.tokens = self.capaciteit
+        self.laatste = time.monotonic()
+        self.gebruikt = self.laatste  # Laatste keer dat er een token genomen werd (of aanmaak)
+        self.lock = threading.Lock()
+
+    def _bijvullen(self, nu):
+        self.tokens = min(self.capaciteit, self.tokens + (nu - self.laatste) * self.snelheid)
+        self.laatste = nu
+
+    def neem(self):
+        """ Wacht (blokkerend) tot er een token vrij is. Geeft de wachttijd terug. """
+        gewacht = 0.0
+        while True:
+            with self.lock:
+                self._bijvullen(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.gebruikt = self.laatste
+                    return gewacht
+                tekort = (1 - self.tokens) / self.snelheid
+            time.sleep(tekort)
+            gewacht += tekort
+
+    def probeer(self):
+        """ Neemt een token als er een vrij is (niet blokkerend). Geeft True/False terug. """
+        with self.lock:
+            self._bijvullen(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.gebruikt = self.laatste
+                return True
+            return False
+
+    def is_vol(self):
+        """ Volledig bijgevuld: weggooien en later opnieuw aanmaken maakt dan geen verschil. """
+        with self.lock:
+            self._bijvullen(time.monotonic())
+            return self.tokens >= self.capaciteit
+
+    def is_stil(self):
+        """
+        Vol én al langer dan één volledige bijvultijd niet gebruikt. Een net
+        aangemaakte bucket (waar een thread nog uit moet nemen) telt zo niet.
+        """
+        with self.lock:
+            nu = time.monotonic()
+            self._bijvullen(nu)
+            return self.tokens >= self.capaciteit and nu - self.gebruikt >= self.capaciteit / self.snelheid
+
+    def uitstellen(self, seconden):
+        """ Telegram vroeg ons te wachten (HTTP 429): bucket leegmaken voor die periode. """
+        with self.lock:
+            self._bijvullen(time.monotonic())
+            self.tokens = min(self.tokens, 0) - seconden * self.snelheid
+
+# =============================================================================
+# VERZENDER (WERKERPOOL)
+# =============================================================================
+
+class TelegramVerzender:
+    """
+    Verstuurt berichten naar Telegram via een vaste pool van werkers en een
+    gedeelde (gepoolde) HTTP-sessie. Zo krijgen alle chats een alarm tegelijk
+    en blijft de prijscontrole niet hangen op trage of falende verzendingen.
+    """
+
+    def __init__(self, token, session=None, werkers=None):
+        self.basis_url = f"https://api.telegram.org/bot{token}"
+        self.werkers = werkers or config.TELEGRAM_WERKERS
+        self.session = session or requests.Session()
+
+        # Genoeg open verbindingen in de pool voor alle werkers tegelijk
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.werkers)
+        self.session.mount("https://api.telegram.org", adapter)
+
+        self.pool = ThreadPoolExecutor(max_workers=self.werkers, thread_name_prefix="telegram")
+        self.globale_bucket = TokenBucket(config.TELEGRAM_MAX_PER_SECONDE)
+        self.chat_buckets = {}
+        self.opruim_grens = config.TELEGRAM_CHAT_BUCKETS
+        self.limiet_tot = {}  # chat_id -> tot wanneer (monotonic) Telegram ons liet wachten (429)
+        self.lock = threading.Lock()
+
+        # Laatste verzendtijden (in seconden) voor het latentie-overzicht
+        self.latenties = deque(maxlen=1000)
+
+    # --- Interne hulpjes ---
+
+    def _bucket_voor(self, chat_id):
+        with self.lock:
+            bucket = self.chat_buckets.get(chat_id)
+            if bucket is None:
+                if len(self.chat_buckets) >= self.opruim_grens:
+                    self._ruim_buckets_op()
+                bucket = TokenBucket(config.TELEGRAM_MAX_PER_CHAT_SECONDE, 1)
+                self.chat_buckets[chat_id] = bucket
+            return bucket
+
+    def _ruim_buckets_op(self):
+        """
+        Buckets van stille chats (weer vol en al een bijvultijd ongebruikt)
+        weggooien. De grens schuift mee met wat overblijft, zodat opruimen
+        gemiddeld O(1) per nieuwe chat kost.
+        """
+        for chat_id in [c for c, bucket in self.chat_buckets.items() if bucket.is_stil()]:
+            del self.chat_buckets[chat_id]
+        self.opruim_grens = max(config.TELEGRAM_CHAT_BUCKETS, 2 * len(self.chat_buckets))
+
+    def _limiet_bereikt(self, chat_id, chat_bucket, wacht):
+        """
+        HTTP 429: deze chat wacht 'wacht' seconden. Telegram zegt niet of het
+        de limiet van de chat of de globale limiet was; krijgt intussen ook
+        een ándere chat een 429, dan is het de globale en wacht iedereen.
+        """
+        chat_bucket.uitstellen(wacht)
+        nu = time.monotonic()
+        with self.lock:
+            for ander in [c for c, tot in self.limiet_tot.items() if tot <= nu]:
+                del self.limiet_tot[ander]
+            globaal = any(c != chat_id for c in self.limiet_tot)
+            self.limiet_tot[chat_id] = max(self.limiet_tot.get(chat_id, 0), nu + wacht)
+        if globaal:
+            logging.warning(f"⏳ Globale Telegram limiet: alle chats wachten {wacht}s")
+            self.globale_bucket.uitstellen(wacht)
+
+    def _api_aanroep(self, methode, chat_id, data, files=None, retries=3, timeout=10):
+        """
+        Eén aanroep naar de Bot API met rate limiting en retries.
+        Geeft de JSON-respons terug, of None als het niet lukte.
+        """
+        url = f"{self.basis_url}/{methode}"
+        backoff = 2
+        start = time.monotonic()
+
+        for attempt in range(retries):
+            # Bij elke poging opnieuw opzoeken: na een lange backoff kan de bucket opgeruimd zijn
+            chat_bucket = self._bucket_voor(chat_id)
+            chat_bucket.neem()
+            self.globale_bucket.neem()
+            try:
+                if files:
+                    response = self.session.post(url, data=data, files=files, timeout=timeout)
+                else:
+                    response = self.session.post(url, json=data, timeout=timeout)
+
+                if response.status_code == 429:
+                    # Telegram zegt hoe lang we moeten wachten
+                    wacht = response.json().get('parameters', {}).get('retry_after', backoff)
+                    logging.warning(f"⏳ Telegram limiet bereikt voor {chat_id}, wacht {wacht}s")
+                    self._limiet_bereikt(chat_id, chat_bucket, wacht)
+                    if attempt < retries - 1:
+                        TELEGRAM_HERHALINGEN.verhoog(methode=methode, reden='429')
+                    continue
+
+                response.raise_for_status()
+                antwoord = response.json()
+                duur = time.monotonic() - start
+                self.latenties.append(duur)
+                TELEGRAM_VERZENDING.observeer(duur, methode=methode, resultaat='ok')
+                return antwoord
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logging.error(f"❌ Fout bij {methode} naar {chat_id} (poging {attempt+1}): {e}")
+                if attempt < retries - 1:
+                    TELEGRAM_HERHALINGEN.verhoog(methode=methode, reden=type(e).__name__)
+                    time.sleep(backoff)
+                    backoff *= 2
+        TELEGRAM_VERZENDING.observeer(time.monotonic() - start, methode=methode, resultaat='mislukt')
+        return None
+
+    # --- Publieke functies ---
+
+    def stuur_bericht(self, bericht, chat_id, retries=3):
+        """ Stuurt één tekstbericht (blokkerend). Geeft True terug bij succes. """
+        payload = {"text": bericht, "chat_id": chat_id, "parse_mode": "HTML"}
+        start = time.monotonic()
+        resultaat = self._api_aanroep("sendMessage", chat_id, payload, retries=retries)
+        if resultaat is not None:
+            logging.info(f"✅ Bericht verzonden naar {chat_id} ({(time.monotonic() - start) * 1000:.0f} ms)")
+        return resultaat is not None
+
+    def stuur_foto(self, foto, chat_id):
+        """
+        Stuurt een PNG (bytes) of een eerder geüploade foto (file_id, str) naar
+        één chat (blokkerend). Geeft de file_id van Telegram terug (om de foto
+        later opnieuw te gebruiken zonder upload), of None bij een fout.
+        """
+        start = time.monotonic()
+        if isinstance(foto, str):
+            resultaat = self._api_aanroep("sendPhoto", chat_id, {'chat_id': chat_id, 'photo': foto})
+        else:
+            files = {'photo': ('grafiek.png', foto, 'image/png')}
+            resultaat = self._api_aanroep("sendPhoto", chat_id, {'chat_id': chat_id}, files=files, timeout=20)
+        if resultaat is None:
+            return None
+
+        logging.info(f"📸 Grafiek verzonden naar {chat_id} ({(time.monotonic() - start) * 1000:.0f} ms)")
+        fotos = resultaat.get('result', {}).get('photo') or [{}]
+        return fotos[-1].get('file_id', True)  # Grootste formaat staat achteraan
+
+    def verdeel(self, chat_ids, taak, omschrijving="Melding"):
+        """
+        Voert taak(chat_id) uit voor alle chats tegelijk in de werkerpool.
+        Keert meteen terug (niet blokkerend) met de lijst van futures.
+        """
+        chat_ids = list(chat_ids)
+        if not chat_ids:
+            return []
+
+        start = time.monotonic()
+        resterend = [len(chat_ids)]
+        lock = threading.Lock()
+
+        def klaar(_future):
+            with lock:
+                resterend[0] -= 1
+                laatste = resterend[0] == 0
+            if laatste:
+                duur = time.monotonic() - start
+                logging.info(f"📣 {omschrijving} naar {len(chat_ids)} chats verstuurd in {duur:.1f}s")
+
+        futures = []
+        for chat_id in chat_ids:
+            future = self.pool.submit(taak, chat_id)
+            future.add_done_callback(klaar)
+            futures.append(future)
+        return futures
+
+    def verdeel_bericht(self, bericht, chat_ids):
+        """ Stuurt hetzelfde bericht naar alle chats tegelijk (niet blokkerend). """
+        return self.verdeel(chat_ids, lambda chat_id: self.stuur_bericht(bericht, chat_id))
+
+    def latentie_overzicht(self):
+        """ Samenvatting van de recente verzendtijden (in milliseconden). """
+        waarden = sorted(self.latenties)
+        if not waarden:
+            return {'aantal': 0}
+        n = len(waarden)
+        return {
+            'aantal': n,
+            'gem_ms': round(sum(waarden) / n * 1000),
+            'p50_ms': round(waarden[n // 2] * 1000),
+            'p95_ms': round(waarden[min(n - 1, int(n * 0.95))] * 1000),
+            'max_ms': round(waarden[-1] * 1000),
+        }
@@ -0,0 +1,38 @@
+"""
+Controle van de drempelmotor tegenover de oude if-cascade (uit benchmark.py):
+voor elke prijs dezelfde melding en dezelfde status.
+
+Gebruik:
+    python3 -m pytest test_drempelmotor.py
+"""
+import random
+
+import config
+from benchmark import oude_prijsstatus, synthetische_prijzen
+from drempelmotor import DrempelMotor
+
+def speel_af(prijzen):
+    """ Elke prijs door beide; faalt bij de eerste meting waar ze verschillen. Geeft het aantal meldingen. """
+    motor = DrempelMotor()
+    status = dict.fromkeys(motor.namen, False)
+    toestand = motor.begin
+    meldingen = 0
+    for n, prijs in enumerate(prijzen):
+        oud = []
+        status = oude_prijsstatus(prijs, status, lambda titel, icoon: oud.append((titel, icoon)), config)
+        toestand, melding = motor.verwerk(toestand, prijs)
+        nieuw = [(melding['titel'], melding['icoon'])] if melding else []
+        assert oud == nieuw, f"Melding verschilt bij meting {n} (prijs {prijs})"
+        assert motor.status(toestand) == status, f"Status verschilt bij meting {n} (prijs {prijs})"
+        meldingen += bool(oud)
+    return meldingen
+
+def test_random_walk_zelfde_meldingen_en_status():
+    assert speel_af(synthetische_prijzen(200_000)) > 0
+
+def test_prijzen_op_en_rond_de_grenzen():
+    grenzen = (config.GRENS_EXTREEM_LAAG, config.GRENS_ZEER_LAAG, config.GRENS_LAAG_MIN_50,
+               config.GRENS_NEGATIEF, config.GRENS_GOEDKOOP, config.GRENS_HERSTEL, config.GRENS_ZEER_HOOG)
+    kandidaten = sorted({g + d for g in grenzen for d in (-1, -0.5, 0, 0.5, 1)})
+    rng = random.Random(3)
+    assert speel_af([rng.choice(kandidaten) for _ in range(50_000)]) > 0
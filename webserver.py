@@ -1,13 +1,123 @@
-from flask import Flask, render_template, jsonify, request
-import sqlite3
-import pandas as pd
+if __name__ == '__main__':
+    # Met gevent (indien geïnstalleerd) kost een open live-verbinding (SSE)
+    # geen eigen thread maar een lichte greenlet. Moet vóór de andere imports.
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        pass
+
+from flask import Flask, Response, render_template, jsonify, request, g
 import config
+import database_manager
+import metrieken
 import json
-import os
+import time
+import hashlib
+import threading
 from datetime import datetime, timedelta
+from live_buffer import LiveBufferLezer, datum_als_getal
+from pijplijn import BegrensdeWachtrij
+from antwoordcache import AntwoordCache
 
 app = Flask(__name__)
 
+# De website leest enkel: read-only verbindingen, per verzoek geleend uit een
+# kleine pool (zie leen_db_verbinding hieronder)
+database_manager.zet_alleen_lezen()
+
+# --- LIVE BUFFER (gedeeld geheugen met de bot) ---
+live_lezer = LiveBufferLezer()
+live_minuten = {}   # {datum JJJJMMDD: {minuut van de dag: prijs}}, opgebouwd uit de ring
+live_lock = threading.Lock()
+live_gestart = False  # Is de ring al eens (volledig) ingelezen?
+
+def ververs_live_buffer():
+    """
+    Haalt enkel de NIEUWE records uit de ring (sinds de vorige oproep), onthoudt
+    ze en geeft ze door aan de live stream.
+    """
+    global live_gestart
+    with live_lock:
+        eerste_keer = not live_gestart
+        live_gestart = True
+        records = live_lezer.nieuwe_records()
+        for datum, minuut, prijs in records:
+            live_minuten.setdefault(datum, {})[minuut] = prijs
+        # Enkel de laatste twee dagen bijhouden
+        for oud in sorted(live_minuten)[:-2]:
+            del live_minuten[oud]
+
+    # Bij de eerste keer is dat de hele ring: die kennen de kijkers al
+    if not eerste_keer:
+        for datum, minuut, prijs in records:
+            live_omroep.publiceer('minuut', {
+                'datum': f"{datum // 10000:04}-{datum // 100 % 100:02}-{datum % 100:02}",
+                'tijd': f"{minuut // 60:02}:{minuut % 60:02}",
+                'prijs': prijs,
+            })
+
+def lees_live_buffer(datum_str):
+    """ Alle gekende minuten van 'datum_str' uit de ring, samen met de dagstats van de bot. """
+    ververs_live_buffer()
+    with live_lock:
+        return dict(live_minuten.get(datum_als_getal(datum_str), {})), live_lezer.stats()
+
+# --- LIVE STREAM (SERVER-SENT EVENTS) ---
+
+class LiveOmroep:
+    """
+    Verdeelt nieuwe minuten en wijzigingen in de alarmen over alle open
+    SSE-verbindingen. Eén achtergrond-thread kijkt naar de ring (8 bytes lezen
+    als er niets nieuws is); elke verbinding heeft een eigen kleine wachtrij.
+    """
+
+    def __init__(self):
+        self.abonnees = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.status = None          # Laatst gekende actieve alarmen
+        self.status_bericht = None  # ... en het event dat een nieuwe kijker eerst krijgt
+
+    def abonneer(self):
+        wachtrij = BegrensdeWachtrij('sse', maxlengte=config.SSE_WACHTRIJ)
+        with self.lock:
+            self.abonnees.add(wachtrij)
+            if self.status_bericht:
+                wachtrij.zet(self.status_bericht)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name='sse', daemon=True)
+                self.thread.start()
+        return wachtrij
+
+    def uitschrijven(self, wachtrij):
+        with self.lock:
+            self.abonnees.discard(wachtrij)
+
+    def publiceer(self, soort, gegevens):
+        # Eén keer opmaken, daarna enkel dezelfde tekst in elke wachtrij zetten
+        bericht = f"event: {soort}\ndata: {json.dumps(gegevens)}\n\n"
+        with self.lock:
+            if soort == 'status':
+                self.status_bericht = bericht
+            for wachtrij in self.abonnees:
+                wachtrij.zet(bericht)
+
+    def _loop(self):
+        while True:
+            try:
+                ververs_live_buffer()
+                with live_lock:
+                    status = live_lezer.status()
+                if status is not None and status != self.status:
+                    self.status = status
+                    self.publiceer('status', {'actief': status})
+            except Exception as e:
+                print(f"Fout in live stream: {e}")
+            time.sleep(config.SSE_INTERVAL)
+
+live_omroep = LiveOmroep()
+
 # --- DATABANK FUNCTIES ---
 
 def haal_live_data(datum_str=None):
@@ -18,48 +128,65 @@ def haal_live_data(datum_str=None):
         gekozen_datum = datetime.strptime(datum_str, '%Y-%m-%d')
         gisteren_str = (gekozen_datum - timedelta(days=1)).strftime('%Y-%m-%d')
 
-        conn = sqlite3.connect(config.DB_BESTAND)
-        df = pd.read_sql_query("SELECT tijd, waarde FROM metingen_detail WHERE datum = ? ORDER BY tijd ASC", conn, params=(datum_str,))
-        
+        # Minuten uit de DB (elke minuut staat er hoogstens één keer in)
+        minuten = dict(database_manager.haal_dag_op(datum_str))
+        if not minuten:
+            # Oudere dag: enkel de kwartier-samenvattingen zijn nog bewaard.
+            # We tonen dan de settlement-punten (xx:14, xx:29, xx:44, xx:59).
+            minuten = {kwartier * 15 + 14: settlement
+                       for kwartier, _, _, _, _, settlement in database_manager.haal_kwartieren_op(datum_str)
+                       if settlement is not None}
+
+        conn = database_manager.verbinding()
         cursor = conn.cursor()
         cursor.execute("SELECT gemiddelde FROM dagstatistieken WHERE datum = ?", (gisteren_str,))
         row = cursor.fetchone()
         avg_gisteren = row[0] if row else None
-        conn.close()
         
-        # Buffer lezen
+        # Live buffer lezen (+ de lopende dagstatistieken die de bot al bijhoudt)
+        live_stats = None
         vandaag_str = datetime.now().strftime('%Y-%m-%d')
         if datum_str == vandaag_str:
-            pad = '/dev/shm/energy_live.json' if os.path.exists('/dev/shm') else 'energy_live.json'
-            if os.path.exists(pad):
-                try:
-                    with open(pad, 'r') as f:
-                        buffer_data = json.load(f)
-                        if buffer_data:
-                            df_buffer = pd.DataFrame(buffer_data, columns=['datum', 'tijd', 'waarde'])
-                            df_buffer = df_buffer[['tijd', 'waarde']]
-                            df = pd.concat([df, df_buffer], ignore_index=True)
-                            df = df.drop_duplicates(subset=['tijd'], keep='last')
-                except Exception as e:
-                    print(f"Kon buffer niet lezen: {e}")
-        
-        if not df.empty:
+            try:
+                ring_minuten, ring_stats = lees_live_buffer(datum_str)
+                minuten.update(ring_minuten)  # Zelfde minuut in DB en ring: de ring wint
+                if ring_stats and ring_stats['datum'] == datum_als_getal(datum_str):
+                    live_stats = ring_stats
+            except Exception as e:
+                print(f"Kon buffer niet lezen: {e}")
+
+        if minuten:
+            # Eén doorloop over de (gesorteerde) minuten: reeksen + som/min/max
+            tijden, prijzen = [], []
+            tele_tijden, tele_prijzen = [], []
+            for minuut in sorted(minuten):
+                tijd, waarde = f"{minuut // 60:02}:{minuut % 60:02}", minuten[minuut]
+                tijden.append(tijd)
+                prijzen.append(waarde)
+                if minuut % 15 == 14:  # Kwartier-punten: xx:14, xx:29, xx:44, xx:59
+                    tele_tijden.append(tijd)
+                    tele_prijzen.append(waarde)
+
             # Stats berekenen (TERUG NAAR ROUND 2, GEEN INT)
-            huidige_prijs = df.iloc[-1]['waarde']
-            gemiddelde_vandaag = df['waarde'].mean()
+            huidige_prijs = prijzen[-1]
+            if live_stats and live_stats.get('aantal'):
+                # Lopende stats van de bot: geen herberekening over de hele dag nodig
+                gemiddelde_vandaag = live_stats['gem']
+                dag_min, dag_max = live_stats['min'], live_stats['max']
+            else:
+                gemiddelde_vandaag = sum(prijzen) / len(prijzen)
+                dag_min, dag_max = min(prijzen), max(prijzen)
             delta_prijs = huidige_prijs - gemiddelde_vandaag
             
             delta_avg = 0
             if avg_gisteren is not None:
                 delta_avg = gemiddelde_vandaag - avg_gisteren
 
-            tele_df = df[df['tijd'].str.endswith(('14','29','44','59'))]
-            
             delta_tele = 0
-            if not tele_df.empty:
-                tele_gem = round(tele_df['waarde'].mean(), 2)
-                tele_min = round(tele_df['waarde'].min(), 2)
-                tele_max = round(tele_df['waarde'].max(), 2)
+            if tele_prijzen:
+                tele_gem = round(sum(tele_prijzen) / len(tele_prijzen), 2)
+                tele_min = round(min(tele_prijzen), 2)
+                tele_max = round(max(tele_prijzen), 2)
                 if avg_gisteren is not None:
                     delta_tele = tele_gem - avg_gisteren
             else:
@@ -67,13 +194,13 @@ def haal_live_data(datum_str=None):
 
             return {
                 "datum": datum_str, 
-                "full": { "tijden": df['tijd'].tolist(), "prijzen": df['waarde'].tolist() },
-                "tele": { "tijden": tele_df['tijd'].tolist(), "prijzen": tele_df['waarde'].tolist() },
-                "huidig": df.iloc[-1].to_dict(),
+                "full": { "tijden": tijden, "prijzen": prijzen },
+                "tele": { "tijden": tele_tijden, "prijzen": tele_prijzen },
+                "huidig": { "tijd": tijden[-1], "waarde": huidige_prijs },
                 "stats": { 
                     "gem": round(gemiddelde_vandaag, 2), 
-                    "min": round(df['waarde'].min(), 2), 
-                    "max": round(df['waarde'].max(), 2), 
+                    "min": round(dag_min, 2), 
+                    "max": round(dag_max, 2), 
                     "delta_prijs": round(delta_prijs, 2),
                     "delta_avg": round(delta_avg, 2),
                     "avg_gisteren": avg_gisteren,
@@ -90,90 +217,319 @@ def haal_live_data(datum_str=None):
         print(f"Fout: {e}")
         return None
 
-def haal_maand_data(gekozen_maand=None):
+def haal_live_punten(datum_str, sinds_minuut=-1):
+    """
+    Enkel de minuten NA 'sinds_minuut' (voor /api/live): uit de DB en, voor
+    vandaag, uit de live buffer. Geeft gesorteerde (minuut, prijs) paren terug.
+    """
+    minuten = dict(database_manager.haal_dag_op(datum_str, na_minuut=sinds_minuut))
+    if datum_str == datetime.now().strftime('%Y-%m-%d'):
+        ring_minuten, _ = lees_live_buffer(datum_str)
+        minuten.update((m, p) for m, p in ring_minuten.items() if m > sinds_minuut)
+    return sorted(minuten.items())
+
+def als_kolommen(cursor):
+    """ Zoals DataFrame.to_dict(orient='list'): {kolom: [waarden]}, leeg als er geen rijen zijn. """
+    rijen = cursor.fetchall()
+    if not rijen:
+        return {}
+    namen = [kolom[0] for kolom in cursor.description]
+    return {naam: list(waarden) for naam, waarden in zip(namen, zip(*rijen))}
+
+def haal_maand_data(gekozen_maand=None, sinds=None):
+    """ 'sinds' (JJJJ-MM-DD): enkel de dagen vanaf die datum (die dag zelf inbegrepen, die kan nog wijzigen). """
     try:
         if gekozen_maand is None:
             gekozen_maand = datetime.now().strftime('%Y-%m')
             
-        conn = sqlite3.connect(config.DB_BESTAND)
-        query = "SELECT * FROM dagstatistieken WHERE strftime('%Y-%m', datum) = ? ORDER BY datum ASC"
-        df = pd.read_sql_query(query, conn, params=(gekozen_maand,))
-        conn.close()
+        conn = database_manager.verbinding()
+        # 'normaal' en 'gemist' rekent SQLite meteen mee uit
+        query = """
+            SELECT *, aantal - aantal_negatief - aantal_duur AS normaal, MAX(1440 - aantal, 0) AS gemist
+            FROM dagstatistieken WHERE datum BETWEEN ? AND ? ORDER BY datum ASC
+        """
+        cursor = conn.execute(query, (max(gekozen_maand + '-01', sinds or ''), gekozen_maand + '-31'))
         
         result = {"maand": gekozen_maand}
-        
-        if not df.empty:
-            df['normaal'] = df['aantal'] - df['aantal_negatief'] - df['aantal_duur']
-            df['gemist'] = (1440 - df['aantal']).clip(lower=0)
-            # GEEN AFRONDING HIER MEER
-            result.update(df.to_dict(orient='list'))
-            return result
-            
+        result.update(als_kolommen(cursor))  # GEEN AFRONDING HIER MEER
         return result
     except Exception as e:
         print(f"Error maand: {e}")
         return None
 
-def haal_jaar_data(gekozen_jaar=None):
+def haal_jaar_data(gekozen_jaar=None, sinds=None):
     """
     Haalt data op voor de jaar-pagina.
+    'sinds' (JJJJ-MM): enkel de maanden vanaf die maand (die maand zelf inbegrepen).
     """
     try:
         if gekozen_jaar is None:
             gekozen_jaar = datetime.now().strftime('%Y')
 
-        conn = sqlite3.connect(config.DB_BESTAND)
+        # Voorberekende maandtotalen (de bot werkt ze bij bij elke opslag)
+        conn = database_manager.verbinding()
         query = """
-            SELECT strftime('%Y-%m', datum) as maand,
-                   AVG(gemiddelde) as gem_prijs, MIN(laagste) as laagste, MAX(hoogste) as hoogste,
-                   SUM(aantal_negatief) as som_negatief, SUM(aantal_duur) as som_duur
-            FROM dagstatistieken 
-            WHERE strftime('%Y', datum) = ?
-            GROUP BY maand ORDER BY maand ASC
+            SELECT maand, som_gemiddelde / aantal_dagen as gem_prijs, laagste, hoogste,
+                   som_negatief, som_duur
+            FROM maandstatistieken
+            WHERE maand BETWEEN ? AND ? AND aantal_dagen > 0
+            ORDER BY maand ASC
         """
-        df = pd.read_sql_query(query, conn, params=(gekozen_jaar,))
-        conn.close()
+        rijen = conn.execute(query, (max(gekozen_jaar + '-01', sinds or ''), gekozen_jaar + '-12')).fetchall()
         
         result = {"jaar": gekozen_jaar}
         
-        if not df.empty:
-            df['uren_negatief'] = (df['som_negatief'] / 60).round(1) # Uren mogen wel 1 decimaal houden
-            df['uren_duur'] = (df['som_duur'] / 60).round(1)
-            
-            # Prijs naar geheel getal
-            df['gem_prijs'] = df['gem_prijs'].round(0).astype(int)
-            
-            result.update(df.to_dict(orient='list'))
-            return result
-            
+        if rijen:
+            maanden, gem_prijs, laagste, hoogste, som_negatief, som_duur = (list(kolom) for kolom in zip(*rijen))
+            result.update({
+                "maand": maanden,
+                "gem_prijs": [round(p) for p in gem_prijs],  # Prijs naar geheel getal
+                "laagste": laagste,
+                "hoogste": hoogste,
+                "som_negatief": som_negatief,
+                "som_duur": som_duur,
+                "uren_negatief": [round(m / 60, 1) for m in som_negatief],  # Uren mogen wel 1 decimaal houden
+                "uren_duur": [round(m / 60, 1) for m in som_duur],
+            })
         return result
     except Exception as e: 
         print(f"Error jaar: {e}")
         return None
 
+# --- CACHE (LRU + ETag) ---
+#
+# Elk antwoord hoort bij een periode (dag, maand of jaar). De sleutel in de
+# cache bevat een 'versie' die de bot bijhoudt in de live buffer:
+# - afgesloten periodes : de historiek-generatie (wijzigt zelden)
+# - lopende periode     : de generatie (+1 bij elke flush van de bot) en, voor
+#                         de dagpagina, het volgnummer van de ring (elke minuut)
+# Zo wordt er nooit iets expliciet gewist: een nieuwe versie = een nieuwe sleutel.
+
+antwoord_cache = AntwoordCache(config.WEB_CACHE_GROOTTE)
+START_ID = str(time.time())  # Nieuwe ETags na een herstart (bv. als de templates wijzigden)
+
+def cache_versie(verleden, live=False):
+    """ Versie-deel van de cachesleutel, of None als de bot (ring) er niet is. """
+    with live_lock:
+        versie = live_lezer.versie()
+    if versie is None:
+        return None
+    generatie, historiek_generatie, volgnummer = versie
+    if verleden:
+        return ('historiek', historiek_generatie)
+    return ('lopend', generatie, volgnummer if live else None)
+
+PERIODE_FORMATEN = {10: '%Y-%m-%d', 7: '%Y-%m', 4: '%Y'}  # Lengte van de periode -> formaat
+
+def afgesloten(periode, huidige_periode):
+    """
+    Is deze periode al afgesloten vóór gisteren? De laatste minuten van gisteren
+    worden pas na middernacht weggeschreven en samengevat: tot de dag voorbij
+    is, kan een periode die gisteren eindigde nog wijzigen.
+    """
+    formaat = PERIODE_FORMATEN.get(len(huidige_periode))
+    if formaat is None:
+        return False
+    return periode < (datetime.now() - timedelta(days=1)).strftime(formaat)
+
+def gecachet_antwoord(naam, periode, huidige_periode, maak, live=False, mimetype='text/html'):
+    """
+    Geeft het antwoord voor ('naam', 'periode') uit de cache, of maakt het met
+    maak() -> (inhoud, cachebaar). Met ETag: kent de browser deze versie al,
+    dan krijgt hij een lege 304. Niet-cachebare inhoud mag een Response zijn.
+    """
+    def als_antwoord(inhoud):
+        return inhoud if isinstance(inhoud, Response) else Response(inhoud, mimetype=mimetype)
+
+    verleden = periode < huidige_periode
+    versie = cache_versie(verleden, live)
+    if versie is None:
+        return als_antwoord(maak()[0])
+
+    sleutel = (naam, periode, versie)
+    etag = hashlib.sha1(f"{START_ID}{sleutel}".encode()).hexdigest()[:20]
+
+    if request.if_none_match.contains(etag):
+        antwoord_cache.tel_niet_gewijzigd()
+        antwoord = Response(status=304)
+    else:
+        inhoud = antwoord_cache.haal(sleutel)
+        if inhoud is None:
+            inhoud, cachebaar = maak()
+            if not cachebaar:
+                return als_antwoord(inhoud)  # Bv. een fout: geen ETag
+            antwoord_cache.zet(sleutel, inhoud)
+        antwoord = Response(inhoud, mimetype=mimetype)
+
+    antwoord.set_etag(etag)
+    # Enkel wat zeker niet meer wijzigt mag de browser een tijd bijhouden;
+    # de rest (ook gisteren) vraagt hij telkens opnieuw na met de ETag (304)
+    if afgesloten(periode, huidige_periode):
+        antwoord.headers['Cache-Control'] = f'public, max-age={config.WEB_CACHE_MAX_AGE}'
+    else:
+        antwoord.headers['Cache-Control'] = 'no-cache'
+    return antwoord
+
+# --- METRIEKEN (PROMETHEUS-FORMAAT, OP /metrics) ---
+
+HTTP_VERZOEK = metrieken.histogram('http_verzoek_seconds', "Duur van een verzoek tot het antwoord klaar is",
+                                   ('route', 'methode', 'status'))
+metrieken.teller('web_cache_total', "Antwoord-cache: hits, misses en 304's", ('soort',),
+                 functie=lambda: {(soort,): antwoord_cache.tellers()[soort]
+                                  for soort in ('hits', 'misses', 'niet_gewijzigd_304')})
+metrieken.meter('db_leesverbindingen', "Verbindingen in de leespool (geopend, vrij)", ('soort',),
+                functie=lambda: {(soort,): database_manager.lees_pool.tellers()[soort] for soort in ('geopend', 'vrij')})
+metrieken.teller('db_uitleningen_total', "Uitleningen uit de leespool",
+                 functie=lambda: database_manager.lees_pool.tellers()['uitleningen'])
+metrieken.meter('sse_verbindingen', "Open live-verbindingen (/api/stream)", functie=lambda: len(live_omroep.abonnees))
+
+@app.before_request
+def start_meting():
+    g.meting_start = time.perf_counter()
+
+@app.after_request
+def stop_meting(antwoord):
+    """ Per route (het patroon, bv. /api/maand, niet de volledige URL): zo blijft het aantal reeksen beperkt. """
+    start = g.pop('meting_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'onbekend'
+        HTTP_VERZOEK.observeer(time.perf_counter() - start, route=route, methode=request.method,
+                               status=antwoord.status_code)
+    return antwoord
+
+# --- DATABASE-VERBINDING PER VERZOEK ---
+
+@app.before_request
+def leen_db_verbinding():
+    database_manager.leen_verbinding()
+
+@app.teardown_request
+def geef_db_verbinding_terug(fout=None):
+    database_manager.geef_verbinding_terug()
+
 # --- ROUTES ---
 
 @app.route('/')
 def page_vandaag():
     gekozen_datum = request.args.get('datum') 
-    data = haal_live_data(gekozen_datum)
     vandaag_str = datetime.now().strftime('%Y-%m-%d')
-    # Check of data bestaat voordat we de datum vergelijken
-    is_live = False
-    if data and 'datum' in data:
-        is_live = (data['datum'] == vandaag_str)
 
-    return render_template('index.html', active_page='vandaag', data=data, is_live=is_live)
+    def maak():
+        data = haal_live_data(gekozen_datum)
+        # Check of data bestaat voordat we de datum vergelijken
+        is_live = False
+        if data and 'datum' in data:
+            is_live = (data['datum'] == vandaag_str)
+        return render_template('index.html', active_page='vandaag', data=data, is_live=is_live), data is not None
+
+    return gecachet_antwoord('vandaag', gekozen_datum or vandaag_str, vandaag_str, maak, live=True)
 
 @app.route('/maand')
 def page_maand():
     maand = request.args.get('maand') 
-    return render_template('index.html', active_page='maand', history=haal_maand_data(maand))
+    huidige_maand = datetime.now().strftime('%Y-%m')
+
+    def maak():
+        history = haal_maand_data(maand)
+        return render_template('index.html', active_page='maand', history=history), history is not None
+
+    return gecachet_antwoord('maand', maand or huidige_maand, huidige_maand, maak)
 
 @app.route('/jaar')
 def page_jaar():
     jaar = request.args.get('jaar') 
-    return render_template('index.html', active_page='jaar', year=haal_jaar_data(jaar))
+    huidig_jaar = datetime.now().strftime('%Y')
+
+    def maak():
+        year = haal_jaar_data(jaar)
+        return render_template('index.html', active_page='jaar', year=year), year is not None
+
+    return gecachet_antwoord('jaar', jaar or huidig_jaar, huidig_jaar, maak)
+
+# --- JSON API (enkel nieuwe punten, zodat het dashboard niet hoeft te herladen) ---
+
+@app.route('/api/live')
+def api_live():
+    """ /api/live?datum=JJJJ-MM-DD&since=HH:MM -> enkel de minuten na 'since'. """
+    datum_str = request.args.get('datum') or datetime.now().strftime('%Y-%m-%d')
+    sinds = request.args.get('since')
+    try:
+        datetime.strptime(datum_str, '%Y-%m-%d')
+        sinds_minuut = database_manager.minuut_van(sinds) if sinds else -1
+    except ValueError:
+        return jsonify({"error": "Ongeldige datum of tijd"}), 400
+
+    punten = haal_live_punten(datum_str, sinds_minuut)
+    return jsonify({
+        "datum": datum_str,
+        "tijden": [f"{m // 60:02}:{m % 60:02}" for m, _ in punten],
+        "prijzen": [p for _, p in punten],
+    })
+
+@app.route('/api/maand')
+def api_maand():
+    """ /api/maand?maand=JJJJ-MM&since=JJJJ-MM-DD """
+    maand, sinds = request.args.get('maand'), request.args.get('since')
+    huidige_maand = datetime.now().strftime('%Y-%m')
+
+    def maak():
+        data = haal_maand_data(maand, sinds)
+        if data is None:
+            return Response(json.dumps({"error": "Geen data"}), status=500, mimetype='application/json'), False
+        return json.dumps(data), True
+
+    return gecachet_antwoord(f'api_maand:{sinds}', maand or huidige_maand, huidige_maand, maak, mimetype='application/json')
+
+@app.route('/api/jaar')
+def api_jaar():
+    """ /api/jaar?jaar=JJJJ&since=JJJJ-MM """
+    jaar, sinds = request.args.get('jaar'), request.args.get('since')
+    huidig_jaar = datetime.now().strftime('%Y')
+
+    def maak():
+        data = haal_jaar_data(jaar, sinds)
+        if data is None:
+            return Response(json.dumps({"error": "Geen data"}), status=500, mimetype='application/json'), False
+        return json.dumps(data), True
+
+    return gecachet_antwoord(f'api_jaar:{sinds}', jaar or huidig_jaar, huidig_jaar, maak, mimetype='application/json')
+
+@app.route('/api/cache')
+def api_cache():
+    """ Tellers van de antwoord-cache (hits, misses, 304's) om de grootte af te stellen. """
+    return jsonify(antwoord_cache.tellers())
+
+@app.route('/metrics')
+def page_metrieken():
+    """ Alle metrieken van de webserver (Prometheus-formaat). """
+    return Response(metrieken.als_tekst(), content_type=metrieken.INHOUDSTYPE)
+
+@app.route('/api/stream')
+def api_stream():
+    """ Server-Sent Events: 'minuut' (nieuwe prijs van de bot) en 'status' (actieve alarmen). """
+    wachtrij = live_omroep.abonneer()
+
+    def stroom():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                bericht = wachtrij.haal(timeout=config.SSE_PING)
+                yield bericht if bericht is not None else ": ping\n\n"
+        finally:
+            live_omroep.uitschrijven(wachtrij)
+
+    return Response(stroom(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    try:
+        try:
+            from gevent.pywsgi import WSGIServer
+            print("🌐 Webserver gestart met gevent (live-verbindingen zonder eigen thread).")
+            WSGIServer(('0.0.0.0', 5000), app).serve_forever()
+        except ImportError:
+            app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+    finally:
+        # Bij het afsluiten de leesverbindingen netjes sluiten
+        database_manager.lees_pool.sluit()
+        database_manager.sluit_verbinding()
\ No newline at end of file